@@ -0,0 +1,315 @@
+# benchmarks/run.py
+#
+# Benchmarks for the physics pipeline, cycle loading and the rendering path.
+#
+#     python -m benchmarks.run                          # full suite
+#     python -m benchmarks.run --sizes 1e3 1e4 1e5      # smaller synthetic cycles
+#     python -m benchmarks.run --only stage --repeat 5  # cases whose name contains "stage"
+#     python -m benchmarks.run --save benchmarks/baselines/my-machine.json
+#     python -m benchmarks.run --compare benchmarks/baselines/my-machine.json
+#
+# Every case reports its best wall time over --repeat runs, the throughput in
+# samples/s and the peak memory allocated during one extra run (tracemalloc,
+# which also tracks NumPy buffers). Synthetic cycles are built from the
+# shipped BMW i3 cycle, so the pipeline sees realistic data at every size.
+# --compare exits with status 1 when a case got slower (or allocates more)
+# than the baseline by more than --tolerance.
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from config.parameters import motor_specs
+from logic import physics
+from logic.cycle_store import read_cycle_csv, write_cycle, load_cycle
+from logic.kinematics import clear_kinematics_cache, CYCLE_COLUMNS
+from logic.motor_calculations import calculate_pmsm_electrical, calculate_srm_electrical
+from logic.outputs import ResultSpec
+from logic.result_cache import CACHE_ENV, default_cache
+from logic.sweep import DEFAULT_DESIGN, design_config
+
+CYCLE_CSV = os.path.join("data", "bmw_i3_pattern.csv")
+DEFAULT_SIZES = [1e3, 1e4, 1e5, 1e6, 1e7]
+BASELINE_FORMAT = "ev-benchmark"
+
+# Order of the stages inside physics.calculate_parameters
+STAGES = [
+    ("compute_resistive_forces", physics.compute_resistive_forces),
+    ("compute_required_torque", physics.compute_required_torque),
+    ("compute_power_draw", physics.compute_power_draw),
+    ("motor_temperature", physics.motor_temperature),
+    ("compute_voltage_current", physics.compute_voltage_current),
+    ("regen_energy_kwh", physics.regen_energy_kwh),
+    ("compute_soc", physics.compute_soc),
+]
+
+
+class Case:
+    """
+    One benchmark: `setup()` prepares the arguments (untimed) and
+    `run(*args)` is the timed call, processing `samples` cycle samples.
+    """
+
+    def __init__(self, name, samples, run, setup=None, group=None):
+        self.name = name
+        self.samples = samples
+        self.run = run
+        self.setup = setup or (lambda: ())
+        self.group = group
+
+
+def measure(case, repeat):
+    """Best and median wall time over `repeat` runs, and peak memory of one more run."""
+    times = []
+    for _ in range(repeat):
+        args = case.setup()
+        start = time.perf_counter()
+        case.run(*args)
+        times.append(time.perf_counter() - start)
+
+    args = case.setup()
+    tracemalloc.start()
+    case.run(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(times)
+    return {
+        "group": case.group,
+        "samples": case.samples,
+        "seconds": best,
+        "median_seconds": float(np.median(times)),
+        "samples_per_s": case.samples / best if best > 0 else float("inf"),
+        "peak_mb": peak / 2**20,
+    }
+
+
+def synthetic_cycle(source, samples):
+    """
+    A cycle of `samples` rows made by playing `source` forwards and
+    backwards (keeps speed and elevation continuous at the seams).
+    """
+    dt = float(np.median(np.diff(source["Time [s]"])))
+    columns = {"Time [s]": np.arange(samples) * dt}
+    for column in CYCLE_COLUMNS[1:]:
+        values = np.asarray(source[column], dtype=float)
+        columns[column] = np.resize(np.concatenate([values, values[::-1]]), samples)
+    return pd.DataFrame(columns)
+
+
+# ---------- cases ----------
+def pipeline_cases(cycle, config):
+    samples = len(cycle)
+
+    def fresh():
+        clear_kinematics_cache()
+        return (cycle, config)
+
+    # Only what a sweep keeps of every run, stored as float32
+    low_memory = ResultSpec(["Distance Travelled [km]", "SOC [%]", "Energy Used [kWh]"], precision="float32")
+
+    cases = [
+        Case("calculate_parameters", samples, physics.calculate_parameters, fresh, "pipeline"),
+        Case("calculate_parameters:low_memory", samples, physics.calculate_parameters,
+             lambda: (*fresh(), None, low_memory), "pipeline"),
+    ]
+
+    # Each stage on a frame prepared by the stages before it
+    prepared = physics.calculate_parameters(cycle, config)
+    for name, stage in STAGES:
+        cases.append(Case(f"stage:{name}", samples, stage, lambda: (prepared, config), "stage"))
+
+    cases.append(Case("electrical:calculate_pmsm_electrical", samples, calculate_pmsm_electrical,
+                      lambda: (prepared, config["system_voltage"]), "stage"))
+    cases.append(Case("electrical:calculate_srm_electrical", samples, calculate_srm_electrical,
+                      lambda: (prepared, config["system_voltage"]), "stage"))
+    return cases
+
+
+def motor_cases(cycle):
+    cases = []
+    for motor_type in motor_specs:
+        config, _ = design_config({**DEFAULT_DESIGN, "motor_type": motor_type})
+
+        def fresh(config=config):
+            clear_kinematics_cache()
+            return (cycle, config)
+
+        code = motor_specs[motor_type]["code"]
+        cases.append(Case(f"motor:{code}", len(cycle), physics.calculate_parameters, fresh, "motor"))
+    return cases
+
+
+def loading_cases(csv_path, cycle_dir):
+    samples = len(read_cycle_csv(csv_path))
+
+    def load_dir():
+        frame = load_cycle(cycle_dir)
+        for column in frame.columns:
+            np.add.reduce(frame[column].to_numpy())  # touch every page of the mapping
+
+    return [
+        Case("load:csv", samples, read_cycle_csv, lambda: (csv_path,), "load"),
+        Case("load:cycle_dir", samples, load_dir, None, "load"),
+    ]
+
+
+def scaling_cases(source, config, sizes):
+    cases = []
+    for size in sizes:
+        samples = int(size)
+
+        def fresh(samples=samples):
+            clear_kinematics_cache()
+            return (synthetic_cycle(source, samples), config)
+
+        cases.append(Case(f"scaling:calculate_parameters@{samples}", samples,
+                          physics.calculate_parameters, fresh, "scaling"))
+    return cases
+
+
+def render_cases(cycle, config):
+    # Streamlit calls are no-ops outside a running app ("bare mode")
+    from logic.simulator import run_simulation
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+
+    # run_simulation answers repeats from the result cache: keep it in memory
+    # (nothing written to the user's store) and empty it before every run
+    os.environ[CACHE_ENV] = "off"
+    cache = default_cache()
+    if cache.root is not None:
+        raise RuntimeError(f"result cache already opened on disk ({cache.root}), cannot benchmark run_simulation")
+
+    def fresh():
+        clear_kinematics_cache()
+        cache.clear()
+        return (cycle, config)
+
+    return [Case("render:run_simulation", len(cycle), run_simulation, fresh, "render")]
+
+
+# ---------- reporting ----------
+def scaling_exponent(results):
+    """Slope of log(time) against log(samples) over the scaling cases (1.0 = linear)."""
+    points = [(r["samples"], r["seconds"]) for r in results.values()
+              if r["group"] == "scaling" and r["samples"] >= 1e4 and r["seconds"] > 0]
+    if len(points) < 2:
+        return None
+    samples, seconds = np.log(np.array(points)).T
+    return float(np.polyfit(samples, seconds, 1)[0])
+
+
+def compare(results, baseline, tolerance):
+    """Lines describing every regression against a baseline (empty if none)."""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get("results", {}).get(name)
+        if reference is None:
+            continue
+        ratio = result["seconds"] / reference["seconds"] if reference["seconds"] > 0 else 1.0
+        if ratio > 1 + tolerance:
+            regressions.append(f"{name}: {ratio:.2f}x slower ({reference['seconds'] * 1e3:.2f} ms -> "
+                               f"{result['seconds'] * 1e3:.2f} ms)")
+        grown = result["peak_mb"] - reference["peak_mb"]
+        if grown > 1.0 and result["peak_mb"] > reference["peak_mb"] * (1 + tolerance):
+            regressions.append(f"{name}: peak memory {reference['peak_mb']:.1f} MB -> {result['peak_mb']:.1f} MB")
+    return regressions
+
+
+def print_table(results, baseline=None):
+    print(f"{'case':<46} {'samples':>10} {'best ms':>10} {'samples/s':>12} {'peak MB':>9}"
+          + (f" {'vs base':>8}" if baseline else ""))
+    for name, r in results.items():
+        line = f"{name:<46} {r['samples']:>10d} {r['seconds'] * 1e3:>10.2f} {r['samples_per_s']:>12.3g} {r['peak_mb']:>9.1f}"
+        reference = (baseline or {}).get("results", {}).get(name)
+        if reference:
+            line += f" {r['seconds'] / reference['seconds']:>7.2f}x"
+        print(line)
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "system": platform.system(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the EV simulator pipeline.")
+    parser.add_argument("--cycle", default=CYCLE_CSV, help="Drive-cycle CSV (default: %(default)s)")
+    parser.add_argument("--sizes", nargs="*", type=float, default=DEFAULT_SIZES,
+                        help="Synthetic cycle lengths in samples (default: 1e3 .. 1e7)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (best is kept)")
+    parser.add_argument("--only", help="Only run cases whose name contains this text")
+    parser.add_argument("--save", help="Write the results as a JSON baseline")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown / memory growth before a case counts as a regression")
+    args = parser.parse_args(argv)
+
+    source = read_cycle_csv(args.cycle)
+    cycle = source[CYCLE_COLUMNS].copy()
+    config, _ = design_config(DEFAULT_DESIGN)
+
+    with tempfile.TemporaryDirectory() as cycle_dir:
+        write_cycle(source, cycle_dir, source=os.path.basename(args.cycle))
+
+        cases = (loading_cases(args.cycle, cycle_dir) + pipeline_cases(cycle, config)
+                 + motor_cases(cycle) + scaling_cases(cycle, config, args.sizes)
+                 + render_cases(cycle, config))
+        if args.only:
+            cases = [case for case in cases if args.only in case.name]
+
+        results = {}
+        with np.errstate(all="ignore"):
+            for case in cases:
+                results[case.name] = measure(case, args.repeat)
+                print(f"  {case.name}: {results[case.name]['seconds'] * 1e3:.2f} ms", file=sys.stderr)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print_table(results, baseline)
+    exponent = scaling_exponent(results)
+    if exponent is not None:
+        print(f"\ncalculate_parameters scaling exponent: {exponent:.2f} (1.00 = linear)")
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"format": BASELINE_FORMAT, "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "environment": environment(), "repeat": args.repeat,
+                       "scaling_exponent": exponent, "results": results}, f, indent=2)
+        print(f"baseline written to {args.save}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print(f"\nno regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
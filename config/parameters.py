@@ -101,6 +101,26 @@ battery_data = {
                      "energy_density": 300, "diameter_mm": None, "volumetric_density": 800}
 }
 
+# Equivalent-circuit cell models (example values), per chemistry in battery_data:
+# open-circuit voltage vs SOC [%], series resistance R0 and one RC branch (R1, tau)
+battery_ecm = {
+    "Li-ion (NMC)": {"ocv_soc": [0, 5, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100],
+                     "ocv_v":   [3.00, 3.35, 3.46, 3.56, 3.62, 3.67, 3.72, 3.80, 3.89, 3.98, 4.08, 4.20],
+                     "r0_ohm": 0.022, "r1_ohm": 0.015, "tau_s": 30},
+    "Li-ion (NCA)": {"ocv_soc": [0, 5, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100],
+                     "ocv_v":   [3.00, 3.30, 3.42, 3.52, 3.59, 3.65, 3.71, 3.79, 3.88, 3.97, 4.07, 4.20],
+                     "r0_ohm": 0.025, "r1_ohm": 0.018, "tau_s": 25},
+    "Li-ion (LFP)": {"ocv_soc": [0, 5, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100],
+                     "ocv_v":   [2.50, 3.00, 3.15, 3.22, 3.25, 3.27, 3.28, 3.29, 3.30, 3.32, 3.34, 3.50],
+                     "r0_ohm": 0.015, "r1_ohm": 0.010, "tau_s": 40},
+    "LTO":          {"ocv_soc": [0, 5, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100],
+                     "ocv_v":   [1.80, 2.10, 2.20, 2.26, 2.30, 2.33, 2.36, 2.39, 2.43, 2.48, 2.55, 2.80],
+                     "r0_ohm": 0.008, "r1_ohm": 0.004, "tau_s": 20},
+    "Solid-State":  {"ocv_soc": [0, 5, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100],
+                     "ocv_v":   [3.00, 3.40, 3.52, 3.62, 3.69, 3.75, 3.81, 3.88, 3.96, 4.05, 4.15, 4.30],
+                     "r0_ohm": 0.030, "r1_ohm": 0.020, "tau_s": 60},
+}
+
 
 motor_specs = {
     "Permanent Magnet Synchronous Motor (PMSM / PSM)": {
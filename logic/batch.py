@@ -0,0 +1,255 @@
+# logic/batch.py
+#
+# Headless batch runs: every config against every drive cycle, across a
+# process pool, without Streamlit.
+#
+#     python -m logic.batch configs.jsonl --cycle data/bmw_i3_pattern.csv --out results
+#     python -m logic.batch a.json b.json --cycle city.csv --cycle highway/ --series --precision float32
+#
+# Configs are JSON (one object or a list of objects) or JSONL files with the
+# keys of the dict returned by ui.layout.render_configuration_panel, plus an
+# optional "name". Cycles are CSV files or cycle directories (see
+# logic.cycle_store), or names of cycles in data/ (see logic.cycles);
+# directories are memory-mapped, so the workers share them through the page
+# cache.
+#
+# The summary table goes to <out>/summary.csv, one row per run in input
+# order. With --series the time series of every run are stored as cycle
+# directories in <out>/series/<cycle>/<config>/ (readable with
+# logic.cycle_store.load_cycle). Runs simulated before (by a batch, the app
+# or a sweep) are answered from the result cache (logic.result_cache).
+#
+# With --service the runs go to a running job service (logic.jobs) as bulk
+# jobs instead of a local pool, so they queue behind interactive UI runs and
+# share its results.
+#
+# Exit status: 0 when every run completed or ran its battery flat,
+# 1 when a run hit a torque, current or transmission limit, 3 when a run
+# failed with an error (2 is a usage error).
+
+import argparse
+import csv
+import json
+import os
+import re
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from logic.cycle_store import load_cycle_columns, resolve_cycle_path, write_cycle
+from logic.cycles import CYCLE_DIRECTORY, CycleRegistry
+from logic.events import BATTERY_DEPLETED
+from logic.jobs import JobClient
+from logic.outputs import OUTPUT_COLUMNS, PRECISIONS, ResultSpec
+from logic.result_cache import simulate_cached
+
+DEFAULT_CYCLE = os.path.join("data", "bmw_i3_pattern.csv")
+
+EXIT_OK = 0
+EXIT_LIMIT = 1
+EXIT_ERROR = 3
+
+SUMMARY_FIELDS = ["cycle", "config", "status", "stop_reason", "stop_index", "distance_km", "final_soc",
+                  "energy_used_kwh", "energy_recovered_kwh", "range_km", "vehicle_cost", "cost_to_range",
+                  "events", "series", "error"]
+
+
+def read_configs(path):
+    """
+    Configs of a JSON or JSONL file as (name, config) pairs. Configs
+    without a "name" are named after the file and their position in it.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            configs = [json.loads(line) for line in f if line.strip()]
+        else:
+            configs = json.load(f)
+    if isinstance(configs, dict):
+        configs = [configs]
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    named = []
+    for n, config in enumerate(configs):
+        config = dict(config)
+        named.append((str(config.pop("name", f"{stem}-{n:04d}")), config))
+    return named
+
+
+def run_batch(cycles, configs, spec=None, series_dir=None, workers=None):
+    """
+    Simulate every config against every cycle across a process pool.
+
+    Parameters:
+        cycles (list[tuple]): (name, path) of each drive cycle
+        configs (list[tuple]): (name, config) of each EV configuration
+        spec (logic.outputs.ResultSpec): Stored series columns and precision
+        series_dir (str): Store the series of every run below this directory
+        workers (int): Worker processes (default: all cores)
+
+    Returns:
+        list[dict]: One SUMMARY_FIELDS row per run, cycle-major in input order
+    """
+    runs = [(cycle, config) for cycle in cycles for config in configs]
+    workers = workers or os.cpu_count() or 1
+    rows = [None] * len(runs)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        pending = iter(enumerate(runs))
+        for n, ((cycle_name, cycle_path), (config_name, config)) in pending:
+            future = pool.submit(_run_one, cycle_name, cycle_path, config_name, config, spec, series_dir)
+            futures[future] = n
+            # Keep a bounded number of runs in flight
+            if len(futures) >= 4 * workers:
+                _collect(futures, rows, wait_for_one=True)
+        _collect(futures, rows)
+    return rows
+
+
+def run_batch_service(cycles, configs, address=None, series_dir=None):
+    """
+    run_batch through a job service: every run is submitted as a bulk job.
+    Series come back as cycle directories and are copied below `series_dir`.
+    """
+    runs = [(cycle, config) for cycle in cycles for config in configs]
+    with JobClient(address) as client:
+        replies = client.run_many([(os.path.abspath(cycle_path), config) for (_, cycle_path), (_, config) in runs],
+                                  series=series_dir is not None)
+
+    rows = []
+    for ((cycle_name, _), (config_name, _)), reply in zip(runs, replies):
+        row = {field: "" for field in SUMMARY_FIELDS}
+        row.update(cycle=cycle_name, config=config_name)
+        if reply["status"] != "done":
+            row.update(status="error", error=reply["error"])
+        else:
+            _fill_row(row, reply["summary"], [event["kind"] for event in reply["events"]])
+            if series_dir is not None:
+                path = os.path.join(series_dir, _slug(cycle_name), _slug(config_name))
+                shutil.copytree(reply["series"], path, dirs_exist_ok=True)
+                row["series"] = path
+        rows.append(row)
+    return rows
+
+
+def exit_status(rows):
+    """EXIT_ERROR if a run failed, else EXIT_LIMIT if one hit a limit, else EXIT_OK."""
+    statuses = {row["status"] for row in rows}
+    if "error" in statuses:
+        return EXIT_ERROR
+    if "limit" in statuses:
+        return EXIT_LIMIT
+    return EXIT_OK
+
+
+def write_summary(rows, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run EV configs against drive cycles without the UI.")
+    parser.add_argument("configs", nargs="+", help="JSON or JSONL config files")
+    parser.add_argument("--cycle", action="append", dest="cycles",
+                        help=f"Drive-cycle CSV, cycle directory or registered cycle name, repeatable "
+                             f"(default: {DEFAULT_CYCLE})")
+    parser.add_argument("--out", default="batch_results", help="Output directory (default: %(default)s)")
+    parser.add_argument("--series", action="store_true", help="Also store the time series of every run")
+    parser.add_argument("--outputs", nargs="*", choices=OUTPUT_COLUMNS, metavar="COLUMN",
+                        help="Series columns to store (default: all)")
+    parser.add_argument("--precision", choices=list(PRECISIONS), default="float64",
+                        help="Storage precision of the series (default: %(default)s)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: all cores)")
+    parser.add_argument("--service", nargs="?", const="", metavar="HOST:PORT",
+                        help="Run on a job service (python -m logic.jobs serve) instead of a local pool")
+    args = parser.parse_args(argv)
+
+    try:
+        configs = [named for path in args.configs for named in read_configs(path)]
+    except (OSError, ValueError) as e:
+        parser.error(f"cannot read configs: {e}")
+    paths = [_cycle_path(path) for path in args.cycles or [resolve_cycle_path(DEFAULT_CYCLE)]]
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        parser.error(f"no such cycle: {', '.join(missing)}")
+    cycles = [(os.path.splitext(os.path.basename(os.path.normpath(path)))[0], path) for path in paths]
+
+    series_dir = os.path.join(args.out, "series") if args.series else None
+    spec = ResultSpec(args.outputs, args.precision)
+    if args.service is not None:
+        if args.outputs or args.precision != "float64":
+            parser.error("--outputs and --precision are not supported with --service")
+        try:
+            rows = run_batch_service(cycles, configs, args.service or None, series_dir)
+        except OSError as e:
+            parser.error(f"no job service: {e}")
+    else:
+        rows = run_batch(cycles, configs, spec, series_dir, args.workers)
+
+    summary_path = os.path.join(args.out, "summary.csv")
+    write_summary(rows, summary_path)
+
+    counts = {status: sum(row["status"] == status for row in rows) for status in ("ok", "limit", "error")}
+    print(f"{len(rows)} runs: {counts['ok']} ok, {counts['limit']} hit a limit, {counts['error']} failed "
+          f"-> {summary_path}", file=sys.stderr)
+    for row in rows:
+        if row["status"] != "ok":
+            print(f"  {row['cycle']} / {row['config']}: {row['stop_reason'] or row['error']}", file=sys.stderr)
+    return exit_status(rows)
+
+
+# ---------- worker side ----------
+_worker_cycles = {}
+
+def _run_one(cycle_name, cycle_path, config_name, config, spec, series_dir):
+    row = {field: "" for field in SUMMARY_FIELDS}
+    row.update(cycle=cycle_name, config=config_name)
+    try:
+        cycle = _worker_cycles.get(cycle_path)
+        if cycle is None:
+            cycle = _worker_cycles[cycle_path] = load_cycle_columns(cycle_path)
+
+        with np.errstate(all="ignore"):
+            result = simulate_cached(cycle, config, spec)
+        _fill_row(row, result.summary(), [event.kind for event in result.events])
+
+        if series_dir is not None:
+            path = os.path.join(series_dir, _slug(cycle_name), _slug(config_name))
+            row["series"] = write_cycle(result.series, path, source=cycle_name)
+    except Exception as e:  # one bad config must not stop the batch
+        row.update(status="error", error=f"{type(e).__name__}: {e}")
+    return row
+
+
+# ---------- helpers ----------
+def _fill_row(row, summary, events):
+    row.update(summary)
+    row["stop_reason"] = summary["stop_reason"] or ""
+    row["status"] = "ok" if summary["stop_reason"] in (None, BATTERY_DEPLETED) else "limit"
+    row["events"] = " ".join(events)
+
+def _cycle_path(path):
+    # A registered cycle name stands for its file
+    if os.path.exists(path) or not os.path.isdir(CYCLE_DIRECTORY):
+        return path
+    registry = CycleRegistry(CYCLE_DIRECTORY)
+    return registry.info(path).path if path in registry else path
+
+def _slug(name):
+    # Directory name of a cycle or config
+    return re.sub(r"[^0-9A-Za-z_.-]+", "_", name).strip("_") or "run"
+
+def _collect(futures, rows, wait_for_one=False):
+    for future in as_completed(list(futures)):
+        rows[futures.pop(future)] = future.result()
+        if wait_for_one:
+            return
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+# logic/battery.py
+#
+# Equivalent-circuit battery pack: open-circuit voltage OCV(SOC) per
+# chemistry, series resistance R0 and an optional RC branch (see battery_ecm
+# in config/parameters.py). At every step the pack current is solved from the
+# power demand,
+#
+#     P = V_t I,   V_t = OCV(SOC) - R0 I - V_rc
+#
+# The current, SOC and RC voltage depend on each other only through the
+# previous sample, so the cycle is solved as a fixed point: every iteration
+# is a handful of (K x window) array operations. Iteration stops when an
+# iteration changes nothing; each sample then depends only on the samples
+# before it, so the result is the step-by-step solution itself, not an
+# approximation of it, and solving the cycle window by window (carrying the
+# state from one window to the next) gives the same result as solving it
+# whole.
+
+import warnings
+
+import numpy as np
+
+from config.parameters import battery_data, battery_ecm
+from logic.thermal import filter_blocks, recursive_filter
+
+# "ideal" is the energy bucket of physics.compute_soc
+BATTERY_MODELS = ["ideal", "r0", "rc"]
+
+# Fixed-point iterations per window before giving up (a typical window needs 10-15)
+MAX_ITERATIONS = 100
+
+# Samples solved together; longer windows need slightly more iterations over
+# arrays that no longer fit in cache
+SOLVE_WINDOW = 8192
+
+
+def battery_model(config):
+    """Battery model of a configuration; packs without energy stay ideal."""
+    model = config.get("battery_model", "ideal")
+    return model if config["battery_capacity"] > 0 else "ideal"
+
+
+def pack_arrays(configs):
+    """
+    Pack parameters of a list of configurations as (K,) arrays.
+
+    The cell count follows from the nominal pack voltage (config
+    "pack_voltage", default the system voltage) and the pack energy; the
+    pack resistances are the cell values scaled by series / parallel cells.
+    """
+    def column(values, dtype=float):
+        return np.array(values, dtype=dtype)
+
+    models = [battery_model(c) for c in configs]
+    chemistries = [c.get("battery_chemistry", "Li-ion (NMC)") for c in configs]
+    pack_voltage = column([c.get("pack_voltage", c["system_voltage"]) for c in configs])
+    cell_voltage = column([battery_data[name]["voltage"] for name in chemistries])
+    cell_capacity = column([battery_data[name]["capacity_mAh"] / 1000.0 for name in chemistries])
+
+    series = np.maximum(1, np.round(pack_voltage / cell_voltage))
+    capacity_ah = column([c["battery_capacity"] for c in configs]) * 1000 / pack_voltage
+    scale = series * cell_capacity / np.where(capacity_ah > 0, capacity_ah, np.nan)
+
+    return {
+        "ecm": column([model != "ideal" for model in models], dtype=bool),
+        "chemistry": column(chemistries, dtype=object),
+        "pack_series": series,
+        "pack_capacity_ah": capacity_ah,
+        "pack_r0": column([battery_ecm[name]["r0_ohm"] for name in chemistries]) * scale,
+        "pack_r1": column([battery_ecm[name]["r1_ohm"] if model == "rc" else 0.0
+                           for name, model in zip(chemistries, models)]) * scale,
+        "pack_tau": column([battery_ecm[name]["tau_s"] for name in chemistries]),
+    }
+
+
+def open_circuit_voltage(soc, pack):
+    """Pack OCV [V] for (K x T) SOC [%] (clamped to the table ends)."""
+    names = np.unique(pack["chemistry"])
+    if len(names) == 1:
+        table = battery_ecm[names[0]]
+        voltage = np.interp(soc, table["ocv_soc"], table["ocv_v"])
+    else:
+        voltage = np.empty_like(soc)
+        for name in names:
+            rows = pack["chemistry"] == name
+            table = battery_ecm[name]
+            voltage[rows] = np.interp(soc[rows], table["ocv_soc"], table["ocv_v"])
+    voltage *= pack["pack_series"][:, None]
+    return voltage
+
+
+def solve_pack(power, dt, pack, initial_soc, state=None):
+    """
+    Pack current, terminal voltage and SOC over a drive cycle.
+
+    Parameters:
+        power ((K x T) array): Battery power demand [W] (negative = charging), NaN as 0
+        dt ((T,) array): Step ending at each sample [s], NaN as 0
+        pack (dict): Output of pack_arrays (K configurations)
+        initial_soc (float or (K,) array): SOC [%] the drop is counted from
+        state (dict): Cumulative SOC drop ("soc_drop") and RC filter block
+                      ("rc") left by an earlier segment of the same cycle;
+                      updated to the last sample. Pass an empty dict for the
+                      first segment.
+
+    Returns:
+        dict of (K x T) arrays: "current" [A], "voltage" [V], "soc" [%],
+        "rc" [V]; and "soc_drop", the (K,) cumulative SOC drop [%] at the
+        last sample
+    """
+    power = np.nan_to_num(np.asarray(power, dtype=float))
+    K, T = power.shape
+    dt = np.nan_to_num(np.asarray(dt, dtype=float))
+    carried = state if state is not None else {}
+
+    solved = {name: np.empty((K, T)) for name in ("current", "voltage", "soc", "rc")}
+    for begin in range(0, T, SOLVE_WINDOW):
+        end = min(T, begin + SOLVE_WINDOW)
+        window = _solve_window(power[:, begin:end], dt[begin:end], pack, initial_soc, carried)
+        for name, values in window.items():
+            solved[name][:, begin:end] = values
+
+    solved["soc_drop"] = np.broadcast_to(np.asarray(carried.get("soc_drop", 0.0), dtype=float), (K,)).copy()
+    return solved
+
+
+# ---------- helpers ----------
+def _nominal_cell_voltage(pack):
+    return np.array([battery_data[name]["voltage"] for name in pack["chemistry"]], dtype=float)
+
+def _solve_current(emf, four_r_power, two_power, two_resistance):
+    # Smaller root of R I^2 - E I + P = 0 (stable form). Demand beyond the
+    # pack's maximum power E^2 / 4R is capped at the maximum-power current.
+    root = emf * emf
+    root -= four_r_power
+    np.maximum(root, 0.0, out=root)
+    np.sqrt(root, out=root)
+    root += emf
+    current = np.divide(two_power, root, out=root)
+    np.minimum(current, emf / two_resistance, out=current)
+    return current
+
+def _solve_window(power, dt, pack, initial_soc, carried):
+    # solve_pack over one window, continuing from and updating the carried state
+    K, T = power.shape
+
+    # Per-step constants: RC decay, effective resistance, % SOC per ampere,
+    # and the terms of _solve_current that do not change between iterations
+    decay_log = dt / -pack["pack_tau"][:, None]
+    decay = np.exp(decay_log)
+    rc_gain = -np.expm1(decay_log)
+    rc_gain *= pack["pack_r1"][:, None]
+    resistance = rc_gain + pack["pack_r0"][:, None]
+    soc_per_amp = dt / (36 * pack["pack_capacity_ah"][:, None])
+    demand = (4 * resistance * power, 2 * power, 2 * resistance)
+
+    soc_start = np.broadcast_to(np.asarray(initial_soc, dtype=float), (K,))
+    drop_start = np.broadcast_to(np.asarray(carried.get("soc_drop", 0.0), dtype=float), (K,))
+
+    # The RC branch is filtered in the same blocks on every iteration, each
+    # time continuing the block carried from the previous window
+    has_rc = bool(pack["pack_r1"].any())
+    rc_carry = carried.get("rc", {})
+    rc_start = rc_carry["last"] if rc_carry else np.zeros(K)
+    blocks = filter_blocks(decay_log, (K, T), rc_carry) if has_rc else None
+
+    # First guess: the ideal energy bucket at nominal voltage
+    nominal_wh = pack["pack_capacity_ah"] * pack["pack_series"] * _nominal_cell_voltage(pack)
+    soc = np.cumsum(power * dt, axis=1)
+    soc *= -100 / (3600 * nominal_wh[:, None])
+    soc += (soc_start - drop_start)[:, None]
+
+    # EMF at the start of every step; the first step starts from the carried state
+    emf = np.empty((K, T))
+    emf[:, 0] = open_circuit_voltage((soc_start - drop_start)[:, None], pack)[:, 0]
+    emf[:, 0] -= decay[:, 0] * rc_start
+    rc = np.zeros((K, T))
+
+    for _ in range(MAX_ITERATIONS):
+        emf[:, 1:] = open_circuit_voltage(soc[:, :-1], pack)
+        if has_rc:
+            emf[:, 1:] -= decay[:, 1:] * rc[:, :-1]
+
+        current = _solve_current(emf, *demand)
+        previous_rc = rc
+        if has_rc:
+            rc_state = dict(rc_carry)
+            rc = recursive_filter(decay_log, rc_gain * current, rc_start, rc_state, blocks)
+
+        # The drop is accumulated from the carried one, as physics.compute_soc
+        # does, so a continued segment adds up exactly as the whole cycle
+        previous = soc
+        drop = current * soc_per_amp
+        drop[:, 0] += drop_start
+        np.cumsum(drop, axis=1, out=drop)
+        soc = soc_start[:, None] - drop
+        if _unchanged(soc, previous) and (not has_rc or _unchanged(rc, previous_rc)):
+            break
+    else:
+        warnings.warn(f"battery solver stopped after {MAX_ITERATIONS} iterations without converging; "
+                      f"largest SOC change in the last one {np.nanmax(np.abs(soc - previous), initial=0.0):.3g} %",
+                      RuntimeWarning, stacklevel=3)
+
+    carried["soc_drop"] = drop[:, -1]
+    if has_rc:
+        carried["rc"] = rc_state
+    return {"current": current, "voltage": emf - resistance * current, "soc": soc, "rc": rc}
+
+def _unchanged(new, old):
+    # A change anywhere almost always carries through to the last sample, so
+    # that column rules most iterations out before the full comparison
+    if not np.array_equal(new[:, -1], old[:, -1], equal_nan=True):
+        return False
+    return np.array_equal(new, old, equal_nan=True)
@@ -0,0 +1,152 @@
+# logic/cycle_store.py
+#
+# Binary columnar storage for drive cycles.
+#
+# A stored cycle is a directory holding one .npy file per column and a small
+# JSON header (cycle.json) with the column names, units, length and sample
+# rate. Columns are opened with np.load(mmap_mode="r"), so even very large
+# cycles open in milliseconds and worker processes share them through the
+# OS page cache instead of each parsing its own copy.
+#
+# Convert a CSV once with:
+#     python -m logic.cycle_store data/bmw_i3_pattern.csv [out_dir]
+
+import json
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+HEADER_FILE = "cycle.json"
+FORMAT_NAME = "ev-cycle"
+FORMAT_VERSION = 1
+
+# Mis-decoded forms of the degree sign found in exported CSV headers
+_DEGREE_VARIANTS = ["Â°", "�", "º"]
+
+
+def normalize_column_name(name):
+    """Repair mis-encoded degree symbols, e.g. 'Battery Temperature [�C]' -> '... [°C]'."""
+    name = name.strip()
+    for variant in _DEGREE_VARIANTS:
+        name = name.replace(variant, "°")
+    return name
+
+
+def column_unit(name):
+    """Unit in square brackets at the end of a column name ('' if none)."""
+    match = re.search(r"\[([^\]]*)\]\s*$", name)
+    return match.group(1) if match else ""
+
+
+def is_cycle_dir(path):
+    return os.path.isfile(os.path.join(path, HEADER_FILE))
+
+
+def read_cycle_csv(path):
+    """Parse a drive-cycle CSV (Latin-1, as exported) with repaired column names."""
+    df = pd.read_csv(path, encoding="ISO-8859-1")
+    df.columns = [normalize_column_name(column) for column in df.columns]
+    return df
+
+
+def convert_csv(csv_path, out_dir=None):
+    """
+    One-time conversion of a drive-cycle CSV into the columnar format.
+
+    Parameters:
+        csv_path (str): Source CSV
+        out_dir (str): Target directory (default: CSV path without extension)
+
+    Returns:
+        str: The cycle directory
+    """
+    if out_dir is None:
+        out_dir = os.path.splitext(csv_path)[0]
+    return write_cycle(read_cycle_csv(csv_path), out_dir, source=os.path.basename(csv_path))
+
+
+def write_cycle(df, out_dir, source=None):
+    """
+    Store a cycle DataFrame (or dict of columns) as a cycle directory.
+    float32 columns stay float32, everything else is stored as float64.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+
+    columns = []
+    for n, name in enumerate(df.keys()):
+        values = np.asarray(df[name])
+        values = np.ascontiguousarray(values, dtype=np.float32 if values.dtype == np.float32 else np.float64)
+        file_name = f"{n:02d}_{_slug(name)}.npy"
+        np.save(os.path.join(out_dir, file_name), values)
+        columns.append({"name": name, "file": file_name, "unit": column_unit(name), "dtype": values.dtype.name})
+
+    time = np.asarray(df["Time [s]"], dtype=np.float64)
+    steps = np.diff(time)
+    header = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "length": int(len(time)),
+        "sample_rate_hz": float(1.0 / np.median(steps)) if len(steps) else None,
+        "duration_s": float(time[-1] - time[0]) if len(time) else 0.0,
+        "source": source,
+        "columns": columns,
+    }
+    with open(os.path.join(out_dir, HEADER_FILE), "w", encoding="utf-8") as f:
+        json.dump(header, f, indent=2, ensure_ascii=False)
+    return out_dir
+
+
+def read_header(cycle_dir):
+    with open(os.path.join(cycle_dir, HEADER_FILE), encoding="utf-8") as f:
+        header = json.load(f)
+    if header.get("format") != FORMAT_NAME:
+        raise ValueError(f"{cycle_dir} is not a drive-cycle directory")
+    if header.get("version", 0) > FORMAT_VERSION:
+        raise ValueError(f"{cycle_dir} uses cycle format version {header['version']}, newer than supported")
+    return header
+
+
+def load_cycle_columns(path):
+    """
+    Open a cycle as a dict of column arrays.
+
+    Cycle directories are memory-mapped read-only (no data is read until it
+    is used); CSV files are parsed.
+    """
+    if os.path.isdir(path):
+        header = read_header(path)
+        return {column["name"]: np.load(os.path.join(path, column["file"]), mmap_mode="r")
+                for column in header["columns"]}
+
+    df = read_cycle_csv(path)
+    return {name: df[name].to_numpy() for name in df.columns}
+
+
+def load_cycle(path):
+    """
+    Load a drive cycle as a DataFrame from either a CSV file or a cycle
+    directory. Columns of a cycle directory stay memory-mapped.
+    """
+    if os.path.isdir(path):
+        return pd.DataFrame(load_cycle_columns(path), copy=False)
+    return read_cycle_csv(path)
+
+
+def resolve_cycle_path(csv_path):
+    """Prefer the converted cycle directory next to a CSV when one exists."""
+    converted = os.path.splitext(csv_path)[0]
+    return converted if is_cycle_dir(converted) else csv_path
+
+
+def _slug(name):
+    return re.sub(r"[^0-9A-Za-z]+", "_", name).strip("_").lower()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("usage: python -m logic.cycle_store <cycle.csv> [out_dir]")
+        sys.exit(2)
+    print(convert_csv(*sys.argv[1:]))
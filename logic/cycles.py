@@ -0,0 +1,269 @@
+# logic/cycles.py
+#
+# Registry of the drive cycles in a directory (data/ by default).
+#
+# Every CSV file and cycle directory (see logic.cycle_store) is a named
+# cycle; a CSV and its converted directory count once, the directory being
+# used. The registry is indexed when it is created: duration, sample rate
+# and length come from the cycle header (or the CSV's time column), the
+# distance from the velocity column, so indexing touches two columns per
+# cycle and loads none. Cycles are loaded on first use and kept in a small
+# LRU, so an app offering a dozen cycles holds only the ones it runs.
+#
+# An optional cycles.json in the directory adds metadata per cycle name:
+#     {"bmw_i3_pattern": {"title": "BMW i3", "source": "...", "ambient": "25°C - 35°C"}}
+#
+# run_cycles simulates one config on several cycles at once (threads; the
+# result cache is shared) and combined_summary folds the runs into one row.
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from logic.cycle_store import is_cycle_dir, load_cycle, normalize_column_name, read_header
+from logic.engine import BATTERY_DEPLETED, INITIAL_SOC, estimate_range
+from logic.result_cache import simulate_cached
+
+CYCLE_DIRECTORY = "data"
+METADATA_FILE = "cycles.json"
+DEFAULT_CYCLE = "bmw_i3_pattern"
+
+# Loaded cycles kept in memory
+LOADED_CYCLES = 4
+
+# Fields of a cycle's index entry, and of a summary row
+INFO_FIELDS = ["name", "title", "samples", "duration_s", "distance_km", "sample_rate_hz", "source", "ambient"]
+SUMMARY_FIELDS = ["cycle", "distance_km", "final_soc", "energy_used_kwh", "energy_recovered_kwh", "range_km",
+                  "cost_to_range", "stop_reason"]
+
+
+class CycleInfo:
+    """
+    Index entry of a registered cycle.
+
+    Attributes:
+        name (str): Registry name (file or directory name without extension)
+        path (str): CSV file or cycle directory
+        title, source, ambient (str): From cycles.json (title defaults to the
+                                      name, source to the file name)
+        samples (int), duration_s, distance_km, sample_rate_hz (float)
+    """
+
+    def __init__(self, name, path, samples, duration_s, distance_km, sample_rate_hz, title=None, source=None,
+                 ambient=None):
+        self.name = name
+        self.path = path
+        self.samples = samples
+        self.duration_s = duration_s
+        self.distance_km = distance_km
+        self.sample_rate_hz = sample_rate_hz
+        self.title = title or name
+        self.source = source or os.path.basename(path)
+        self.ambient = ambient
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in INFO_FIELDS}
+
+
+class CycleRegistry:
+    """
+    Named drive cycles of a directory, indexed up front and loaded lazily.
+
+    Parameters:
+        directory (str): Directory holding CSV files and cycle directories
+        loaded_cycles (int): Loaded cycles kept before the least recently
+                             used one is dropped
+    """
+
+    def __init__(self, directory=CYCLE_DIRECTORY, loaded_cycles=LOADED_CYCLES):
+        self.directory = directory
+        self.loaded_cycles = loaded_cycles
+        self._loaded = OrderedDict()
+        self._loading = {}      # name -> Future of a load in progress
+        self._lock = threading.Lock()
+
+        metadata = _read_metadata(directory)
+        self._index = {}
+        for name, path in sorted(_cycle_paths(directory).items()):
+            self._index[name] = CycleInfo(name, path, **_describe(path), **metadata.get(name, {}))
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        return iter(self._index.values())
+
+    def names(self):
+        return list(self._index)
+
+    def info(self, name):
+        """CycleInfo of a registered cycle."""
+        self._check(name)
+        return self._index[name]
+
+    def table(self):
+        """Index as a list of dicts (INFO_FIELDS), e.g. for st.dataframe."""
+        return [info.as_dict() for info in self]
+
+    def load(self, name):
+        """
+        The cycle as a DataFrame, loaded on first use. The frame is shared by
+        every caller and must not be modified.
+        """
+        self._check(name)
+        with self._lock:
+            cycle = self._loaded.get(name)
+            if cycle is not None:
+                self._loaded.move_to_end(name)
+                return cycle
+            # Concurrent requests for one cycle wait for a single load;
+            # different cycles load in parallel, outside the lock
+            pending = self._loading.get(name)
+            loading = pending is None
+            if loading:
+                pending = self._loading[name] = Future()
+        if not loading:
+            return pending.result()
+
+        try:
+            cycle = load_cycle(self._index[name].path)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[name]
+            pending.set_exception(e)
+            raise
+        with self._lock:
+            del self._loading[name]
+            self._loaded[name] = cycle
+            while len(self._loaded) > self.loaded_cycles:
+                self._loaded.popitem(last=False)
+        pending.set_result(cycle)
+        return cycle
+
+    def loaded(self):
+        """Names of the cycles currently in memory, least recently used first."""
+        with self._lock:
+            return list(self._loaded)
+
+    def _check(self, name):
+        if name not in self._index:
+            raise ValueError(f"unknown cycle [{name}], expected one of {self.names()}")
+
+
+def run_cycles(config, names, registry, spec=None, workers=None):
+    """
+    Simulate one config on several registered cycles in parallel.
+
+    Parameters:
+        config (dict): EV configuration
+        names (list[str]): Cycle names
+        registry (CycleRegistry): Where the cycles come from
+        spec (logic.outputs.ResultSpec): Stored series columns and precision
+        workers (int): Threads (default: one per cycle, up to the core count)
+
+    Returns:
+        dict: Cycle name -> SimulationResult, in the order of `names`
+    """
+    names = list(names)
+    for name in names:
+        registry.info(name)
+    if not names:
+        return {}
+
+    workers = workers or min(len(names), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda name: simulate_cached(registry.load(name), config, spec), names)
+        return dict(zip(names, results))
+
+
+def combined_summary(results, config):
+    """
+    One SUMMARY_FIELDS row per run plus a final "combined" row, which treats
+    the cycles as one trip: distances, energies and SOC used add up, and the
+    range is extrapolated from the total.
+
+    Parameters:
+        results (dict): Cycle name -> SimulationResult, as run_cycles returns
+        config (dict): The EV configuration the runs used
+    """
+    rows = []
+    for name, result in results.items():
+        row = {field: result.summary().get(field) for field in SUMMARY_FIELDS}
+        row.update(cycle=name, stop_reason=result.stop_reason or "")
+        rows.append(row)
+    if not rows:
+        return rows
+
+    distance = sum(result.distance_km for result in results.values())
+    initial_soc = config.get("initial_soc", INITIAL_SOC)
+    soc_used = sum(initial_soc - result.final_soc for result in results.values())
+    range_km = estimate_range(distance, initial_soc - soc_used, initial_soc)
+    vehicle_cost = next(iter(results.values())).vehicle_cost
+    limits = [result.stop_reason for result in results.values() if result.stop_reason not in (None, BATTERY_DEPLETED)]
+    rows.append({
+        "cycle": "combined",
+        "distance_km": distance,
+        "final_soc": None,
+        "energy_used_kwh": sum(result.energy_used_kwh for result in results.values()),
+        "energy_recovered_kwh": sum(result.energy_recovered_kwh for result in results.values()),
+        "range_km": range_km,
+        "cost_to_range": vehicle_cost / range_km if range_km else float("nan"),
+        "stop_reason": " ".join(dict.fromkeys(limits)),
+    })
+    return rows
+
+
+# ---------- helpers ----------
+def _cycle_paths(directory):
+    # name -> path; a converted cycle directory replaces its CSV
+    paths = {}
+    for entry in os.listdir(directory):
+        path = os.path.join(directory, entry)
+        name, ext = os.path.splitext(entry)
+        if os.path.isdir(path) and is_cycle_dir(path):
+            paths[entry] = path
+        elif ext.lower() == ".csv" and name not in paths:
+            paths[name] = path
+    return paths
+
+def _read_metadata(directory):
+    path = os.path.join(directory, METADATA_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        metadata = json.load(f)
+    allowed = {"title", "source", "ambient"}
+    return {name: {key: value for key, value in fields.items() if key in allowed}
+            for name, fields in metadata.items()}
+
+def _describe(path):
+    # Length, duration, sample rate and distance from the time and velocity columns only
+    if os.path.isdir(path):
+        header = read_header(path)
+        files = {column["name"]: os.path.join(path, column["file"]) for column in header["columns"]}
+        time = np.load(files["Time [s]"], mmap_mode="r")
+        velocity = np.load(files["Velocity [km/h]"], mmap_mode="r")
+    else:
+        df = pd.read_csv(path, encoding="ISO-8859-1",
+                         usecols=lambda column: normalize_column_name(column) in ("Time [s]", "Velocity [km/h]"))
+        df.columns = [normalize_column_name(column) for column in df.columns]
+        time, velocity = df["Time [s]"].to_numpy(), df["Velocity [km/h]"].to_numpy()
+
+    time = np.asarray(time, dtype=float)
+    speed = np.asarray(velocity, dtype=float) / 3.6
+    steps = np.diff(time)
+    return {
+        "samples": int(len(time)),
+        "duration_s": float(time[-1] - time[0]) if len(time) else 0.0,
+        # Trapezoidal, as logic.kinematics
+        "distance_km": float(np.nansum((speed[1:] + speed[:-1]) / 2 * steps) / 1000),
+        "sample_rate_hz": float(1.0 / np.median(steps)) if len(steps) else None,
+    }
@@ -0,0 +1,317 @@
+# logic/design.py
+#
+# Simulation configs derived from raw design inputs (the widget values of
+# ui.layout.render_configuration_panel), without Streamlit.
+#
+# derive_configs takes every input as a scalar or an array and evaluates
+# all designs in one NumPy pass: vehicle mass and aerodynamics, the pack's
+# voltage, capacity, current limit, geometry and mass from its series /
+# parallel split (or, for Solid-State, from its energy and voltage), the
+# voltage-window, size and inverter checks, and the vehicle cost. Catalog
+# choices (motor, transmission, ...) are looked up once per distinct value.
+#
+# The UI, logic.sweep.design_config and the sweep / frontier code all
+# derive their configs here.
+
+import numpy as np
+import pandas as pd
+
+from config.parameters import style_cd_map, style_mass_factor, style_cost_factor, battery_data, motor_specs
+from config.parameters import wheel_size_map, cooling_params, regen_specs, transmission_models, inverter_specs, hvac_specs
+
+# System voltage choices: nominal voltage, efficiency, cost factor on the
+# electronics and the allowed pack voltage window
+SYSTEM_VOLTAGES = {
+    "400V": {"voltage": 400, "efficiency": 1.0, "cost_factor": 1, "window_low": 300, "window_high": 450},
+    "800V": {"voltage": 800, "efficiency": 1.1, "cost_factor": 1.2, "window_low": 660, "window_high": 820},
+}
+
+SOLID_STATE = "Solid-State"
+SOLID_STATE_LAYERS = 3
+CHASSIS_BASE_COST = 350000
+
+# Problem flags, in the order their reasons are listed
+PROBLEMS = ["wheelbase", "cell_split", "pack_voltage", "pack_length", "pack_width", "pack_volume",
+            "inverter_voltage"]
+
+
+class DerivedDesigns:
+    """
+    Configs of K designs as columns.
+
+    Attributes:
+        config (dict): Config key -> (K,) array (the keys of the dict returned
+                       by ui.layout.render_configuration_panel)
+        problems (dict): PROBLEMS flag -> (K,) bool array, True where the design
+                         is not buildable for that reason
+        valid (np.ndarray): (K,) bool, no problem at all
+        details (dict): Intermediate quantities -> (K,) array: body_mass_kg,
+                        cells_parallel, pack_capacity_ah, pack_energy_wh (before
+                        any check), pack_mass_kg, pack_length_m, pack_width_m,
+                        pack_volume_m3, max_pack_length_m, max_pack_width_m,
+                        max_pack_volume_m3, battery_cost
+    """
+
+    def __init__(self, config, problems, details):
+        self.config = config
+        self.problems = problems
+        self.details = details
+        self.valid = ~np.logical_or.reduce(list(problems.values()))
+
+    def __len__(self):
+        return len(self.valid)
+
+    def config_at(self, i):
+        """Config dict of design i, with plain Python values."""
+        return {name: _plain(values[i]) for name, values in self.config.items()}
+
+    def reasons(self, i):
+        """Reasons design i is not buildable (empty when valid)."""
+        texts = {
+            "wheelbase": "wheelbase not possible for vehicle length",
+            "cell_split": "total cells not divisible by series count",
+            "pack_length": "battery length exceeds 70% of wheelbase",
+            "pack_width": "battery width exceeds 80% of vehicle width",
+            "pack_volume": "battery volume exceeds allowed volume",
+        }
+        reasons = []
+        for flag in PROBLEMS:
+            if not self.problems[flag][i]:
+                continue
+            if flag == "pack_voltage":
+                low, high = self.details["window_low"][i], self.details["window_high"][i]
+                reasons.append(f"pack voltage outside {low:g}V to {high:g}V")
+            elif flag == "inverter_voltage":
+                reasons.append(f"inverter not compatible with {self.config['system_voltage'][i]} V system")
+            else:
+                reasons.append(texts[flag])
+        return reasons
+
+
+def derive_configs(design):
+    """
+    Derive the simulation configs of many designs at once.
+
+    Parameters:
+        design (dict): Design input -> scalar or (K,) array (keys of
+                       logic.sweep.DEFAULT_DESIGN). Scalars apply to every
+                       design. total_cells / cells_series / layer_count are
+                       only read for cell packs, pack_capacity_kwh /
+                       pack_voltage only for Solid-State packs. An
+                       initial_soc input is passed through to the configs.
+
+    Returns:
+        DerivedDesigns
+    """
+    names = list(design.keys())
+    arrays = np.broadcast_arrays(*(np.atleast_1d(np.asarray(design[name], dtype=_dtype(design[name])))
+                                   for name in names))
+    columns = dict(zip(names, arrays))
+    K = len(arrays[0]) if arrays else 0
+
+    def number(name, default=np.nan):
+        values = columns.get(name)
+        return np.full(K, default) if values is None else values.astype(float)
+
+    def choice(name, default=None):
+        values = columns.get(name)
+        return _Choice(np.full(K, default, dtype=object) if values is None else values)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Vehicle
+        vehicle_width = number("vehicle_width")
+        vehicle_length = number("vehicle_length")
+        vehicle_height = number("vehicle_height")
+        wheelbase = number("wheelbase")
+        style = choice("vehicle_style")
+        tyre = choice("tyre_size")
+
+        wheelbase_bad = (wheelbase >= 0.63 * vehicle_length) | (wheelbase <= 0.56 * vehicle_length)
+        body = body_mass(columns)
+
+        # Electrical
+        system = choice("system_voltage")
+        sys_voltage = system.field(SYSTEM_VOLTAGES, "voltage", dtype=int)
+        window_low = system.field(SYSTEM_VOLTAGES, "window_low")
+        window_high = system.field(SYSTEM_VOLTAGES, "window_high")
+
+        chemistry = choice("battery_chemistry")
+        solid = chemistry.values == SOLID_STATE
+        max_c_rate = chemistry.field(battery_data, "max_c_rate")
+
+        # Cell packs: series / parallel split
+        total_cells = number("total_cells")
+        cells_series = number("cells_series")
+        split_bad = ~solid & ((cells_series > total_cells) | (np.fmod(total_cells, cells_series) != 0))
+        cells_parallel = np.where(split_bad | solid, 0, np.floor_divide(total_cells, cells_series))
+        cells = cell_pack(chemistry, cells_series, cells_parallel, number("layer_count"))
+
+        # Solid-State packs: energy and voltage, cube-root geometry
+        solid_energy = number("pack_capacity_kwh") * 1000
+        solid_voltage = number("pack_voltage")
+        pack_volume = solid_energy / chemistry.field(battery_data, "volumetric_density") / 1000
+        cube_side = np.cbrt(pack_volume)
+
+        pack_voltage = np.where(solid, solid_voltage, cells["pack_voltage"])
+        pack_capacity_ah = np.where(solid, solid_energy / solid_voltage, cells["pack_capacity_ah"])
+        pack_energy = np.where(solid, solid_energy, cells["pack_energy_wh"])
+        max_current = np.where(solid, solid_energy / solid_voltage * max_c_rate, cells["max_current_a"])
+        pack_width = np.where(solid, cube_side, cells["pack_width_m"])
+        pack_length = np.where(solid, cube_side / SOLID_STATE_LAYERS, cells["pack_length_m"])
+        pack_volume = np.where(solid, pack_volume, np.nan)
+
+        voltage_bad = ~((window_low <= pack_voltage) & (pack_voltage <= window_high))
+        usable_energy = np.where(voltage_bad, 0.0, pack_energy)
+
+        # Weight is taken before the size checks, as in the UI
+        pack_mass = usable_energy / chemistry.field(battery_data, "energy_density")
+
+        max_length = 0.7 * wheelbase
+        max_width = 0.8 * vehicle_width
+        max_volume = 0.7 * wheelbase * 0.8 * vehicle_width * 0.15
+        length_bad = pack_length > max_length
+        width_bad = pack_width > max_width
+        volume_bad = solid & (pack_volume > max_volume)
+
+        # Drivetrain and auxiliaries
+        motor = choice("motor_type")
+        transmission = choice("transmission_type")
+        hvac = choice("hvac_type")
+        coolant = choice("coolant_flow")
+        regen = choice("regen_type")
+        inverter = choice("inverter_type")
+
+        inverter_bad = ~np.where(sys_voltage == 400, inverter.field(inverter_specs, "supports_400V", dtype=bool),
+                                 inverter.field(inverter_specs, "supports_800V", dtype=bool))
+
+    problems = dict(zip(PROBLEMS, [wheelbase_bad, split_bad, voltage_bad, length_bad, width_bad, volume_bad,
+                                   inverter_bad]))
+
+    # A pack that does not fit is not fitted, as in the UI. The UI prices the
+    # pack before it checks the inverter, so an incompatible inverter still
+    # pays for the pack but leaves it no usable energy.
+    pack_bad = np.logical_or.reduce([bad for name, bad in problems.items() if name != "inverter_voltage"])
+    usable_energy = np.where(pack_bad, 0.0, usable_energy)
+
+    battery_cost = usable_energy * chemistry.field(battery_data, "cost_kW") / 1000
+    chassis_cost = CHASSIS_BASE_COST * style.field(style_cost_factor)
+    electronics_cost = (motor.field(motor_specs, "cost_inr") + regen.field(regen_specs, "cost_inr", missing=0)
+                        + inverter.field(inverter_specs, "cost_inr"))
+    total_cost = (electronics_cost * system.field(SYSTEM_VOLTAGES, "cost_factor") + battery_cost
+                  + transmission.field(transmission_models, "Cost") + tyre.field(wheel_size_map, "cost_inr")
+                  + chassis_cost + hvac.field(hvac_specs, "cost_inr"))
+
+    config = {
+        "system_voltage": sys_voltage,
+        "system_efficiency": system.field(SYSTEM_VOLTAGES, "efficiency"),
+        "battery_capacity": np.where(inverter_bad, 0.0, usable_energy) / 1000,
+        "battery_max_current": max_current,
+        "battery_chemistry": chemistry.values,
+        "battery_model": choice("battery_model", "ideal").values,
+        "pack_voltage": pack_voltage,
+        "motor_type": motor.values,
+        "efficiency_model": choice("efficiency_model", "scalar").values,
+        "motor_power": motor.field(motor_specs, "power_kw"),
+        "inverter_efficiency": inverter.field(inverter_specs, "efficiency"),
+        "regen_enabled": regen.codes >= 0,
+        "regen_mode": regen.values,
+        "vehicle_mass": body + pack_mass,
+        "drag_coefficient": style.field(style_cd_map),
+        "auxiliary_load": hvac.field(hvac_specs, "power_kw"),
+        "hvac_efficiency": hvac.field(hvac_specs, "efficiency"),
+        "frontal_area": vehicle_width * vehicle_height,
+        "tyre_type": choice("tyre_type").values,
+        "wheel_radius": tyre.field(wheel_size_map, "wheel_radius"),
+        "transmission_type": transmission.values,
+        "vehicle_cost": total_cost,
+        "coolant_power": coolant.field(cooling_params, "typical_pump_power_W") / 1000,
+        "coolant_flow": coolant.values,
+    }
+    if "initial_soc" in columns:
+        config["initial_soc"] = number("initial_soc")
+    details = {
+        "body_mass_kg": body,
+        "cells_parallel": cells_parallel,
+        "pack_capacity_ah": pack_capacity_ah,
+        "pack_energy_wh": pack_energy,
+        "pack_mass_kg": pack_mass,
+        "pack_length_m": pack_length,
+        "pack_width_m": pack_width,
+        "pack_volume_m3": pack_volume,
+        "max_pack_length_m": max_length,
+        "max_pack_width_m": max_width,
+        "max_pack_volume_m3": max_volume,
+        "window_low": window_low,
+        "window_high": window_high,
+        "battery_cost": battery_cost,
+    }
+    return DerivedDesigns(config, problems, details)
+
+
+def cell_pack(chemistry, cells_series, cells_parallel, layer_count):
+    """
+    Electrical and geometric figures of cell packs (scalars or arrays).
+
+    Parameters:
+        chemistry (str | array): Cell chemistries (keys of battery_data)
+        cells_series, cells_parallel, layer_count: The cell arrangement
+
+    Returns:
+        dict: pack_voltage, pack_capacity_ah, pack_energy_wh, max_current_a,
+        pack_length_m and pack_width_m (the longer and shorter side of the
+        footprint: cell pitch is the diameter plus 2 mm, the series strings
+        are stacked in layers)
+    """
+    if not isinstance(chemistry, _Choice):
+        chemistry = _Choice(np.atleast_1d(np.asarray(chemistry, dtype=object)))
+    cell_ah = chemistry.field(battery_data, "capacity_mAh") / 1000.0
+    pack_voltage = chemistry.field(battery_data, "voltage") * cells_series
+    cell_pitch_mm = chemistry.field(battery_data, "diameter_mm") + 2
+    length_series = (cell_pitch_mm * cells_series) / (1000 * layer_count)
+    length_parallel = (cell_pitch_mm * cells_parallel) / 1000
+    return {
+        "pack_voltage": pack_voltage,
+        "pack_capacity_ah": cell_ah * cells_parallel,
+        "pack_energy_wh": cell_ah * cells_parallel * pack_voltage,
+        "max_current_a": cell_ah * chemistry.field(battery_data, "max_c_rate") * cells_parallel,
+        "pack_length_m": np.maximum(length_series, length_parallel),
+        "pack_width_m": np.minimum(length_series, length_parallel),
+    }
+
+
+def body_mass(design):
+    """Vehicle mass [kg] without the battery pack (scalars or arrays)."""
+    style = design["vehicle_style"]
+    if isinstance(style, str):
+        style_mass = style_mass_factor[style]
+    else:
+        style_mass = _Choice(np.asarray(style, dtype=object)).field(style_mass_factor)
+    return (design["vehicle_length"] * design["vehicle_width"] * design["vehicle_height"] * 90) + (design["ground_clearance"] * 1000) + style_mass
+
+
+# ---------- helpers ----------
+class _Choice:
+    """A column of catalog keys, looked up once per distinct key (None -> code -1)."""
+
+    def __init__(self, values):
+        self.values = values
+        if len(values) == 1:
+            self.codes = np.array([-1 if values[0] is None else 0])
+            self.keys = [] if values[0] is None else [values[0]]
+        else:
+            self.codes, self.keys = pd.factorize(values)
+
+    def field(self, table, key=None, missing=np.nan, dtype=float):
+        # table[value][key] (table[value] without a key) per row, `missing` for None
+        looked = [table[value] if key is None else table[value][key] for value in self.keys]
+        if (self.codes < 0).any():
+            looked.append(missing)
+        return np.array(looked, dtype=dtype)[self.codes]
+
+def _dtype(value):
+    # Strings and None stay Python objects, numbers become float / int arrays
+    sample = value if np.ndim(value) == 0 else next(iter(np.ravel(value)), 0)
+    return object if sample is None or isinstance(sample, str) else None
+
+def _plain(value):
+    return value.item() if isinstance(value, np.generic) else value
@@ -0,0 +1,142 @@
+# logic/downsample.py
+#
+# Shape-preserving downsampling of chart traces, so a chart ships about its
+# point budget to the browser whatever the cycle length.
+#
+# - "lttb":   largest-triangle-three-buckets, for smooth traces
+# - "minmax": min/max envelope per bucket, keeps every spike of noisy traces
+#
+# Both return indices into the original arrays (always keeping the first and
+# last sample), so x and y stay paired and other columns can reuse them.
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_BUDGET = 2000
+METHODS = ["lttb", "minmax"]
+
+# Vectorized LTTB passes before the remaining buckets are settled one by one
+MAX_PASSES = 4
+
+# Downsampled cycle columns kept (see cached_indices)
+CACHE_SIZE = 64
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def downsample_indices(x, y, budget=DEFAULT_BUDGET, method="lttb"):
+    """
+    Indices of at most `budget` samples that preserve the shape of y(x).
+
+    Parameters:
+        x, y (array-like): Trace coordinates (x increasing)
+        budget (int): Maximum number of points kept
+        method (str): "lttb" or "minmax"
+
+    Returns:
+        np.ndarray: Sorted sample indices
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if budget >= n or n <= 2:
+        return np.arange(n)
+    if method == "lttb":
+        return _lttb(x, y, max(3, budget))
+    if method == "minmax":
+        return _minmax(y, max(4, budget))
+    raise ValueError(f"unknown downsampling method {method!r}, expected one of {METHODS}")
+
+
+def cached_indices(key, x, y, budget=DEFAULT_BUDGET, method="lttb"):
+    """
+    downsample_indices, memoised under `key` (e.g. a cycle fingerprint and
+    column name) in a small LRU shared across reruns.
+    """
+    cache_key = (key, budget, method)
+    with _lock:
+        index = _cache.get(cache_key)
+        if index is not None:
+            _cache.move_to_end(cache_key)
+            return index
+
+    index = downsample_indices(x, y, budget, method)
+    index.setflags(write=False)
+    with _lock:
+        _cache[cache_key] = index
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
+
+
+# ---------- helpers ----------
+def _buckets(m, count):
+    # Start of `count` nearly equal buckets over m samples, and their sizes
+    starts = (np.arange(count) * (m / count)).astype(np.intp)
+    return starts, np.diff(np.append(starts, m))
+
+def _segment_argmax(values, starts, sizes):
+    # Index of the first maximum in every segment values[starts[i]:starts[i] + sizes[i]]
+    peak = np.maximum.reduceat(values, starts)
+    candidate = np.where(values == np.repeat(peak, sizes), np.arange(len(values)), len(values))
+    return np.minimum.reduceat(candidate, starts)
+
+def _lttb(x, y, budget):
+    # The first and last samples are kept; the inner ones are bucketed
+    n = len(y)
+    px, py = x[1:-1], y[1:-1]
+    starts, sizes = _buckets(n - 2, budget - 2)
+
+    # Third vertex of every triangle: mean of the next bucket (the last
+    # sample for the final bucket)
+    valid = ~np.isnan(py)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = np.add.reduceat(px, starts) / sizes
+        mean_y = np.add.reduceat(np.where(valid, py, 0.0), starts) / np.add.reduceat(valid, starts)
+    c_x = np.repeat(np.append(mean_x[1:], x[-1]), sizes)
+    c_y = np.repeat(np.append(mean_y[1:], y[-1]), sizes)
+
+    # First vertex: the pick of the previous bucket. All buckets are picked
+    # at once, starting from the previous bucket's mean and re-picking against
+    # the previous pass's picks; once the picks settle this is exact LTTB.
+    ax = np.insert(mean_x[:-1], 0, x[0])
+    ay = np.insert(mean_y[:-1], 0, y[0])
+
+    assumed = picks = None
+    for _ in range(MAX_PASSES):
+        a_x, a_y = np.repeat(ax, sizes), np.repeat(ay, sizes)
+        area = np.abs((a_x - c_x) * (py - a_y) - (a_x - px) * (c_y - a_y))
+        area[np.isnan(area)] = -1.0
+
+        new_picks = _segment_argmax(area, starts, sizes) + 1
+        if picks is not None and np.array_equal(new_picks, picks):
+            return np.concatenate([[0], picks, [n - 1]])
+        assumed, picks = picks, new_picks
+        ax = np.insert(x[picks[:-1]], 0, x[0])
+        ay = np.insert(y[picks[:-1]], 0, y[0])
+
+    # Not settled: walk the buckets in order, re-picking only those whose
+    # previous bucket ended up different from what the last pass assumed
+    for i in range(1, len(picks)):
+        if assumed[i - 1] == picks[i - 1]:
+            continue
+        a = picks[i - 1]
+        s, e = starts[i], starts[i] + sizes[i]
+        area = np.abs((x[a] - c_x[s]) * (py[s:e] - y[a]) - (x[a] - px[s:e]) * (c_y[s] - y[a]))
+        area[np.isnan(area)] = -1.0
+        picks[i] = s + 1 + int(np.argmax(area))
+
+    return np.concatenate([[0], picks, [n - 1]])
+
+def _minmax(y, budget):
+    # Lowest and highest inner sample of every bucket, plus both ends
+    n = len(y)
+    inner = y[1:-1]
+    starts, sizes = _buckets(n - 2, (budget - 2) // 2)
+    missing = np.isnan(inner)
+    highs = _segment_argmax(np.where(missing, -np.inf, inner), starts, sizes)
+    lows = _segment_argmax(np.where(missing, -np.inf, -inner), starts, sizes)
+    return np.unique(np.concatenate([[0], lows + 1, highs + 1, [n - 1]]))
@@ -0,0 +1,138 @@
+# logic/engine.py
+
+import numpy as np
+import pandas as pd
+
+from logic.physics import calculate_parameters, INITIAL_SOC
+from logic.events import detect_events, BATTERY_DEPLETED, TORQUE_LIMIT, CURRENT_LIMIT, TRANSMISSION_LIMIT
+from logic.downsample import downsample_indices, DEFAULT_BUDGET
+from logic.instrument import stage
+
+# Columns the summary metrics and limit events are computed from
+RESULT_COLUMNS = ["Distance Travelled [km]", "SOC [%]", "Energy Used [kWh]", "Recovered_kWh",
+                  "Motor Torque [Nm]", "Invertor Current [A]"]
+
+# Usable window the range estimate is extrapolated to; INITIAL_SOC, the SOC
+# the pack starts from unless the config sets "initial_soc", lives in
+# logic.physics and is re-exported here
+USABLE_SOC_WINDOW = 85
+
+
+class SimulationResult:
+    """
+    Outcome of a single simulation run, independent of any UI.
+
+    Attributes:
+        series (dict): Column name -> np.ndarray over the whole cycle
+        events (list[LimitEvent]): Every limit crossed during the cycle, in time order
+        stop_index (int): Last sample reached by the vehicle
+        stop_reason (str | None): Kind of the first event, None if the cycle completed
+        distance_km, final_soc, energy_used_kwh, energy_recovered_kwh,
+        range_km, vehicle_cost, cost_to_range: summary metrics
+    """
+
+    def __init__(self, series, events, config):
+        self.series = series
+        self.events = events
+
+        # The vehicle stops at the first limit event
+        if events:
+            self.stop_index = events[0].index
+            self.stop_reason = events[0].kind
+        else:
+            self.stop_index = len(series["Time [s]"]) - 1
+            self.stop_reason = None
+
+        i = self.stop_index
+        self.distance_km = float(series["Distance Travelled [km]"][i])
+        self.final_soc = float(series["SOC [%]"][i])
+        self.energy_used_kwh = float(np.nansum(series["Energy Used [kWh]"][:i]))
+        self.energy_recovered_kwh = float(np.nansum(series["Recovered_kWh"][:i]))
+        self.range_km = estimate_range(self.distance_km, self.final_soc, config.get("initial_soc", INITIAL_SOC))
+        self.vehicle_cost = float(config["vehicle_cost"])
+        self.cost_to_range = self.vehicle_cost / self.range_km if self.range_km else float("nan")
+
+        # Downsampled chart indices, per (column, budget, method)
+        self._chart_indices = {}
+
+    @classmethod
+    def restore(cls, series, events, summary):
+        """Rebuild a result from its series, events and summary() (e.g. from a cache)."""
+        result = cls.__new__(cls)
+        result.series = series
+        result.events = events
+        for name, value in summary.items():
+            setattr(result, name, value)
+        result._chart_indices = {}
+        return result
+
+    @property
+    def completed(self):
+        return self.stop_reason is None
+
+    def summary(self):
+        return {
+            "distance_km": self.distance_km,
+            "final_soc": self.final_soc,
+            "energy_used_kwh": self.energy_used_kwh,
+            "energy_recovered_kwh": self.energy_recovered_kwh,
+            "range_km": self.range_km,
+            "vehicle_cost": self.vehicle_cost,
+            "cost_to_range": self.cost_to_range,
+            "stop_reason": self.stop_reason,
+            "stop_index": self.stop_index,
+        }
+
+    def to_frame(self):
+        return pd.DataFrame(self.series, copy=False)
+
+    def chart_indices(self, column, budget=DEFAULT_BUDGET, method="lttb"):
+        """
+        Sample indices (up to the stop point) that draw `column` against time
+        within `budget` points (see logic.downsample). Cached per result.
+        """
+        key = (column, budget, method)
+        if key not in self._chart_indices:
+            end = self.stop_index + 1
+            self._chart_indices[key] = downsample_indices(self.series["Time [s]"][:end],
+                                                          self.series[column][:end], budget, method)
+        return self._chart_indices[key]
+
+
+def estimate_range(distance_km, final_soc, initial_soc=INITIAL_SOC):
+    """
+    Extrapolate the distance covered to the usable SOC window.
+    Returns NaN when no charge was used (range cannot be estimated).
+    """
+    soc_used = initial_soc - final_soc
+    if not soc_used > 0:
+        return float("nan")
+    return (distance_km / soc_used) * USABLE_SOC_WINDOW
+
+
+def simulate(cycle, config, spec=None):
+    """
+    Run the vehicle physics over a drive cycle without any rendering.
+
+    Parameters:
+        cycle (pd.DataFrame | dict): Drive cycle with Time [s], Velocity [km/h], Elevation [m]
+        config (dict): EV configuration (see ui.layout.render_configuration_panel)
+        spec (logic.outputs.ResultSpec): Columns kept in result.series and their
+                                         precision (default: all, float64). The
+                                         summary and events are always computed
+                                         from float64 values.
+
+    Returns:
+        SimulationResult
+    """
+    working = None if spec is None else spec.including(RESULT_COLUMNS, precision="float64")
+    with stage("calculate_parameters"):
+        df = calculate_parameters(cycle, config, spec=working)
+    series = {column: df[column].to_numpy() for column in df.columns}
+
+    with stage("detect_events"):
+        events = detect_events(series, config)
+    result = SimulationResult(series, events, config)
+    if spec is not None:
+        result.series = spec.stored(series)
+    return result
@@ -0,0 +1,94 @@
+# logic/events.py
+
+import numpy as np
+
+from config.parameters import motor_specs, transmission_models
+
+# Limit events, in the order they are checked (ties go to the earlier one)
+BATTERY_DEPLETED = "battery_depleted"
+TORQUE_LIMIT = "torque_limit"
+CURRENT_LIMIT = "current_limit"
+TRANSMISSION_LIMIT = "transmission_limit"
+
+LIMIT_ORDER = [BATTERY_DEPLETED, TORQUE_LIMIT, CURRENT_LIMIT, TRANSMISSION_LIMIT]
+
+
+class LimitEvent:
+    """
+    First crossing of one limit during a run.
+
+    Attributes:
+        kind (str): One of LIMIT_ORDER
+        index (int): Sample index of the first crossing
+        time (float): Cycle time [s] at that sample
+        value (float): Value that crossed the limit
+        limit (float): The limit itself
+    """
+
+    def __init__(self, kind, index, time, value, limit):
+        self.kind = kind
+        self.index = index
+        self.time = time
+        self.value = value
+        self.limit = limit
+
+    def as_dict(self):
+        return {"kind": self.kind, "index": self.index, "time": self.time,
+                "value": self.value, "limit": self.limit}
+
+    def __repr__(self):
+        return f"LimitEvent({self.kind!r}, index={self.index}, time={self.time})"
+
+
+def limit_checks(series, config):
+    """
+    (kind, values, limit, mask) for every limit of a configuration, where
+    mask marks the samples beyond the limit.
+    """
+    max_motor_torque = motor_specs[config["motor_type"]]["torque_nm"]
+    max_transmission_torque = transmission_models[config["transmission_type"]]["Max Torque Capacity [Nm]"]
+    max_battery_current = config["battery_max_current"]
+
+    soc = series["SOC [%]"]
+    torque = series["Motor Torque [Nm]"]
+    current = series["Invertor Current [A]"]
+
+    return [
+        (BATTERY_DEPLETED, soc, 0, soc <= 0),
+        (TORQUE_LIMIT, torque, max_motor_torque, torque > max_motor_torque),
+        (CURRENT_LIMIT, current, max_battery_current, current > max_battery_current),
+        (TRANSMISSION_LIMIT, torque, max_transmission_torque, torque > max_transmission_torque),
+    ]
+
+
+def detect_events(series, config):
+    """
+    Find the first crossing of every limit in one vectorized pass per limit.
+
+    Parameters:
+        series (dict): Result arrays (SOC [%], Motor Torque [Nm], Invertor Current [A], Time [s])
+        config (dict): EV configuration
+
+    Returns:
+        list[LimitEvent]: Event timeline, ordered by index (ties in LIMIT_ORDER)
+    """
+    time = series["Time [s]"]
+    events = []
+    for kind, values, limit, mask in limit_checks(series, config):
+        index = int(first_true(mask))
+        if index < len(mask):
+            events.append(LimitEvent(kind, index, float(time[index]), float(values[index]), float(limit)))
+
+    events.sort(key=lambda event: (event.index, LIMIT_ORDER.index(event.kind)))
+    return events
+
+
+def first_true(mask, axis=-1):
+    """
+    Index of the first True along `axis`, or the axis length when there is none.
+    Works on (T,) masks and on batched (K x T) masks.
+    """
+    mask = np.asarray(mask)
+    index = mask.argmax(axis=axis)
+    found = np.take_along_axis(mask, np.expand_dims(index, axis), axis=axis).squeeze(axis)
+    return np.where(found, index, mask.shape[axis])
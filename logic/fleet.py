@@ -0,0 +1,162 @@
+# logic/fleet.py
+#
+# Fleet runs: every config x drive cycle x starting SOC, across a process
+# pool, with the cycles in shared memory.
+#
+# The parent derives each cycle's kinematic terms once (logic.kinematics)
+# and copies them into one multiprocessing.shared_memory block per cycle.
+# Workers attach to the blocks by name and run the batched kernel
+# (logic.kernel.simulate_terms) on read-only views, so a cycle exists once
+# in memory whatever the worker count, and no cycle is ever pickled.
+#
+# Vehicles are numbered cycle-major, then config, then starting SOC. Tasks
+# are index ranges within one cycle; a worker writes the summaries of its
+# range straight into a preallocated result table, itself a shared block,
+# and only returns the number of vehicles done.
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from logic.engine import INITIAL_SOC
+from logic.events import LIMIT_ORDER
+from logic.kernel import simulate_terms
+from logic.kinematics import CYCLE_COLUMNS, compute_kinematics
+
+# Summary fields of the result table (see logic.kernel.summarize_batch)
+FLEET_FIELDS = ["distance_km", "final_soc", "energy_used_kwh", "energy_recovered_kwh", "range_km",
+                "vehicle_cost", "cost_to_range", "peak_torque_nm", "peak_current_a", "stop_index"]
+
+# Vehicles per task
+CHUNK_SIZE = 64
+
+
+def run_fleet(cycles, configs, initial_socs=(INITIAL_SOC,), workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Simulate every config on every cycle from every starting SOC.
+
+    Parameters:
+        cycles (dict): Cycle name -> drive cycle (pd.DataFrame or dict of
+                       columns, e.g. logic.cycles.CycleRegistry.load)
+        configs (list[dict]): EV configurations
+        initial_socs (list[float]): Starting SOC values [%]
+        workers (int): Worker processes (default: all cores)
+        chunk_size (int): Vehicles per task
+
+    Returns:
+        dict: (N,) arrays, N = cycles x configs x SOCs in that order: "cycle"
+        (name), "config" (index into configs), "initial_soc", the FLEET_FIELDS
+        and "stop_reason" (None when the cycle completed)
+    """
+    names = list(cycles)
+    configs = list(configs)
+    initial_socs = np.asarray(initial_socs, dtype=float)
+    per_cycle = len(configs) * len(initial_socs)
+    N = len(names) * per_cycle
+
+    blocks = []
+    try:
+        cycle_blocks = []
+        for name in names:
+            terms = compute_kinematics(*(np.asarray(cycles[name][column]) for column in CYCLE_COLUMNS))
+            cycle_blocks.append(_SharedArrays.create(terms))
+            blocks.append(cycle_blocks[-1])
+        table = _SharedArrays.create({field: np.full(N, np.nan) for field in FLEET_FIELDS + ["stop_code"]})
+        blocks.append(table)
+
+        tasks = [(c, start, min(start + chunk_size, per_cycle))
+                 for c in range(len(names)) for start in range(0, per_cycle, chunk_size)]
+        workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+        descriptors = [block.descriptor for block in cycle_blocks]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(descriptors, table.descriptor, configs, initial_socs)) as pool:
+            for future in as_completed([pool.submit(_run_chunk, *task) for task in tasks]):
+                future.result()
+
+        result = {name: values.copy() for name, values in table.arrays.items()}
+    finally:
+        for block in blocks:
+            block.close(unlink=True)
+
+    codes = result.pop("stop_code")
+    stop_reason = np.full(N, None, dtype=object)
+    for code, reason in enumerate(LIMIT_ORDER):
+        stop_reason[codes == code] = reason
+    result["stop_index"] = result["stop_index"].astype(int)
+
+    config_index, soc_index = np.divmod(np.arange(N) % max(per_cycle, 1), max(len(initial_socs), 1))
+    return {
+        "cycle": np.repeat(np.array(names, dtype=object), per_cycle),
+        "config": config_index,
+        "initial_soc": initial_socs[soc_index] if len(initial_socs) else np.zeros(0),
+        **result,
+        "stop_reason": stop_reason,
+    }
+
+
+# ---------- worker side ----------
+_worker = {}
+
+def _init_worker(cycle_descriptors, table_descriptor, configs, initial_socs):
+    _worker["cycles"] = [_SharedArrays.attach(descriptor, writeable=False) for descriptor in cycle_descriptors]
+    _worker["table"] = _SharedArrays.attach(table_descriptor, writeable=True)
+    _worker["configs"] = configs
+    _worker["initial_socs"] = initial_socs
+
+def _run_chunk(cycle_index, start, stop):
+    configs, initial_socs = _worker["configs"], _worker["initial_socs"]
+    vehicles = [{**configs[k], "initial_soc": float(initial_socs[s])}
+                for k, s in zip(*np.divmod(np.arange(start, stop), len(initial_socs)))]
+    summary, _ = simulate_terms(_worker["cycles"][cycle_index].arrays, vehicles)
+
+    table = _worker["table"].arrays
+    rows = slice(cycle_index * len(configs) * len(initial_socs) + start,
+                 cycle_index * len(configs) * len(initial_socs) + stop)
+    for field in FLEET_FIELDS:
+        table[field][rows] = summary[field]
+    codes = np.array([-1 if reason is None else LIMIT_ORDER.index(reason) for reason in summary["stop_reason"]])
+    table["stop_code"][rows] = codes
+    return stop - start
+
+
+# ---------- helpers ----------
+class _SharedArrays:
+    """Named float64 arrays packed into one shared-memory block."""
+
+    def __init__(self, shm, layout, writeable):
+        self.shm = shm
+        self.layout = layout
+        self.arrays = {}
+        for name, offset, length in layout:
+            view = np.ndarray((length,), dtype=np.float64, buffer=shm.buf, offset=offset)
+            view.setflags(write=writeable)
+            self.arrays[name] = view
+
+    @property
+    def descriptor(self):
+        return self.shm.name, self.layout
+
+    @classmethod
+    def create(cls, arrays):
+        layout, offset = [], 0
+        for name, values in arrays.items():
+            layout.append((name, offset, len(values)))
+            offset += len(values) * 8
+        shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        block = cls(shm, layout, writeable=True)
+        for name, values in arrays.items():
+            block.arrays[name][:] = values
+        return block
+
+    @classmethod
+    def attach(cls, descriptor, writeable):
+        name, layout = descriptor
+        return cls(shared_memory.SharedMemory(name=name), layout, writeable)
+
+    def close(self, unlink=False):
+        self.arrays = {}
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
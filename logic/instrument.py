@@ -0,0 +1,132 @@
+# logic/instrument.py
+#
+# Optional per-stage instrumentation. Code marks its stages with
+#
+#     with stage("compute_soc", df):
+#         ...
+#
+# which costs one context-variable lookup while no profile is being recorded.
+# Inside `with profiling() as profile:` every stage records its wall time,
+# the memory it allocated (tracemalloc) and the number of columns it added
+# to `df`; stages opened inside other stages are recorded with their path.
+
+import contextlib
+import contextvars
+import json
+import time
+import tracemalloc
+
+import pandas as pd
+
+_active = contextvars.ContextVar("ev_simulator_profile", default=None)
+_disabled = contextlib.nullcontext()
+
+
+class Profile:
+    """
+    Report of one instrumented run.
+
+    Attributes:
+        records (list[dict]): One entry per finished stage, in finishing order:
+            name, path ("outer/inner"), depth, seconds, allocated_bytes
+            (peak extra memory while the stage ran), retained_bytes (memory
+            still held when it ended) and columns_added
+        track_memory (bool): Whether allocations were traced
+    """
+
+    def __init__(self, track_memory=True):
+        self.records = []
+        self.track_memory = track_memory
+        self._stack = []
+
+    def as_frame(self):
+        """Records as a DataFrame, ordered as the stages started."""
+        return pd.DataFrame(self.to_dict()["stages"], columns=["path", "name", "depth", "seconds", "allocated_bytes",
+                                                               "retained_bytes", "columns_added"])
+
+    def to_dict(self):
+        stages = sorted(self.records, key=lambda record: record["started"])
+        return {"track_memory": self.track_memory,
+                "stages": [{k: v for k, v in record.items() if k != "started"} for record in stages]}
+
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), indent=indent)
+
+    # ---------- recording ----------
+    @contextlib.contextmanager
+    def _stage(self, name, df):
+        path = "/".join([frame["name"] for frame in self._stack] + [name])
+        frame = {"name": name, "peak": 0, "start_memory": 0}
+        columns_before = len(df.columns) if df is not None else None
+
+        if self.track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            self._fold_peak(peak)
+            tracemalloc.reset_peak()
+            frame["start_memory"] = current
+        self._stack.append(frame)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            self._stack.pop()
+
+            allocated = retained = None
+            if self.track_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, frame["peak"])
+                self._fold_peak(peak)
+                allocated = peak - frame["start_memory"]
+                retained = current - frame["start_memory"]
+
+            self.records.append({
+                "path": path,
+                "name": name,
+                "depth": len(self._stack),
+                "seconds": seconds,
+                "allocated_bytes": allocated,
+                "retained_bytes": retained,
+                "columns_added": len(df.columns) - columns_before if df is not None else None,
+                "started": started,
+            })
+
+    def _fold_peak(self, peak):
+        # tracemalloc has a single peak; keep it for every open stage before a reset
+        for frame in self._stack:
+            frame["peak"] = max(frame["peak"], peak)
+
+
+def stage(name, df=None):
+    """
+    Context manager marking one stage of work on `df` (a DataFrame or None).
+    Does nothing unless a profile is being recorded.
+    """
+    profile = _active.get()
+    if profile is None:
+        return _disabled
+    return profile._stage(name, df)
+
+
+@contextlib.contextmanager
+def profiling(track_memory=True):
+    """
+    Record every stage run inside the block.
+
+    Parameters:
+        track_memory (bool): Trace allocations (tracemalloc, slows the run down)
+
+    Yields:
+        Profile
+    """
+    profile = Profile(track_memory)
+    started_tracing = track_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    token = _active.set(profile)
+    try:
+        yield profile
+    finally:
+        _active.reset(token)
+        if started_tracing:
+            tracemalloc.stop()
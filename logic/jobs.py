@@ -0,0 +1,462 @@
+# logic/jobs.py
+#
+# Local simulation job service, shared by every session on one machine.
+#
+#     python -m logic.jobs serve --workers 8
+#     EV_SIMULATOR_JOBS=127.0.0.1:8765 streamlit run streamlit_app.py
+#     python -m logic.batch configs.jsonl --service 127.0.0.1:8765
+#     python -m logic.jobs metrics
+#
+# An asyncio front end listens on the loopback interface only and speaks
+# JSON lines; a process pool runs the simulations (through the result
+# cache, so the disk tier is shared too). A job is one config on one drive
+# cycle (a registered name or a path, see logic.cycles).
+#
+# Identical jobs in flight are coalesced: the second request follows the
+# first one's run instead of queueing its own. Interactive jobs (UI runs)
+# are dispatched before bulk jobs (sweeps, batches); an interactive request
+# for a queued bulk job promotes it. At most `max_queued` bulk jobs wait;
+# beyond that the service stops reading the submitting connection until
+# one is dispatched, which throttles the sender through TCP.
+#
+# Every request gets "queued", "running" and then "done" (or "error")
+# replies carrying its id. Time series are not sent over the socket: the
+# worker stores them as a cycle directory in the spool (logic.cycle_store)
+# and the reply names it, so the client memory-maps them.
+#
+# Requests:  {"op": "submit", "id": ..., "cycle": ..., "config": {...},
+#             "priority": "interactive" | "bulk", "series": true}
+#            {"op": "metrics"}
+
+import argparse
+import asyncio
+import collections
+import heapq
+import itertools
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from logic.cycle_store import is_cycle_dir, load_cycle_columns, write_cycle
+from logic.cycles import CYCLE_DIRECTORY, CycleRegistry
+from logic.engine import SimulationResult
+from logic.events import LimitEvent
+from logic.result_cache import result_key, simulate_cached
+
+ADDRESS_ENV = "EV_SIMULATOR_JOBS"
+HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Dispatch order, most urgent first
+PRIORITIES = {"interactive": 0, "bulk": 1}
+
+MAX_QUEUED = 1024
+# Result directories kept in the spool, and latencies kept for the metrics
+SPOOL_RESULTS = 256
+LATENCY_WINDOW = 1000
+
+
+class JobService:
+    """
+    The asyncio side of the service.
+
+    Parameters:
+        workers (int): Simulation processes (default: all cores)
+        max_queued (int): Bulk jobs waiting before submitters are held back
+        spool (str): Directory for result series (default: in the temp dir)
+        cycle_directory (str): Directory of the cycle registry
+    """
+
+    def __init__(self, workers=None, max_queued=MAX_QUEUED, spool=None, cycle_directory=CYCLE_DIRECTORY):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queued = max_queued
+        self.spool = spool or os.path.join(tempfile.gettempdir(), "ev_simulator_jobs")
+        self.registry = CycleRegistry(cycle_directory) if os.path.isdir(cycle_directory) else None
+
+        self._heap = []
+        self._sequence = itertools.count()
+        self._inflight = {}
+        self._counts = collections.Counter()
+        self._waits = collections.deque(maxlen=LATENCY_WINDOW)
+        self._runs = collections.deque(maxlen=LATENCY_WINDOW)
+        self._ready = None
+        self._bulk_slots = None
+        self._pool = None
+
+    async def serve(self, port=DEFAULT_PORT, started=None):
+        """Run until cancelled. `started` (threading.Event) is set once listening."""
+        os.makedirs(self.spool, exist_ok=True)
+        self._ready = asyncio.Condition()
+        self._bulk_slots = asyncio.Semaphore(self.max_queued)
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        server = await asyncio.start_server(self._handle, HOST, port, limit=2**24)
+        dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+        if started is not None:
+            started.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in dispatchers:
+                task.cancel()
+            self._pool.shutdown(cancel_futures=True)
+
+    async def submit(self, cycle, config, priority="bulk", series=False):
+        """
+        Queue a job, or join the identical one in flight.
+
+        Returns:
+            _Job
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"unknown priority [{priority}], expected one of {list(PRIORITIES)}")
+        path = self._cycle_path(cycle)
+        key = result_key("job", f"{os.path.abspath(path)}:{_cycle_mtime(path)}", config) + ("s" if series else "")
+        self._counts["submitted"] += 1
+
+        job = self._inflight.get(key)
+        if job is not None:
+            self._counts["coalesced"] += 1
+            if job.state == "queued" and PRIORITIES[priority] < job.priority:
+                await self._push(job, PRIORITIES[priority])
+            return job
+
+        if PRIORITIES[priority] == PRIORITIES["bulk"]:
+            # Backpressure: wait here (not reading the connection) while the bulk queue is full
+            await self._bulk_slots.acquire()
+            job = self._inflight.get(key)
+            if job is not None:
+                # The same job was queued while this request waited
+                self._bulk_slots.release()
+                self._counts["coalesced"] += 1
+                return job
+        job = self._inflight[key] = _Job(key, path, config, series, PRIORITIES[priority])
+        job.holds_slot = PRIORITIES[priority] == PRIORITIES["bulk"]
+        await self._push(job, job.priority)
+        return job
+
+    def metrics(self):
+        """Queue depth per priority, jobs running, counters and latency percentiles [s]."""
+        queued = collections.Counter(job.priority for job in self._inflight.values() if job.state == "queued")
+        return {
+            "queued": {name: queued[level] for name, level in PRIORITIES.items()},
+            "running": sum(job.state == "running" for job in self._inflight.values()),
+            "workers": self.workers,
+            **{name: self._counts[name] for name in ("submitted", "coalesced", "completed", "failed")},
+            "wait_s": _percentiles(self._waits),
+            "run_s": _percentiles(self._runs),
+        }
+
+    # ---------- queue ----------
+    async def _push(self, job, priority):
+        # A promoted job gets a second heap entry; the stale one is skipped
+        job.priority = priority
+        async with self._ready:
+            heapq.heappush(self._heap, (priority, next(self._sequence), job))
+            self._ready.notify()
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            async with self._ready:
+                await self._ready.wait_for(lambda: self._heap)
+                _, _, job = heapq.heappop(self._heap)
+            if job.state != "queued":
+                continue
+
+            job.state = "running"
+            job.started = time.perf_counter()
+            self._waits.append(job.started - job.submitted)
+            if job.holds_slot:
+                self._bulk_slots.release()
+            job.running.set()
+
+            try:
+                reply = await loop.run_in_executor(self._pool, _run_job, job.key, job.path, job.config,
+                                                   self.spool if job.series else None)
+                reply["status"] = "done"
+                self._counts["completed"] += 1
+            except Exception as e:  # reported to the clients, the service carries on
+                reply = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+                self._counts["failed"] += 1
+            self._runs.append(time.perf_counter() - job.started)
+            job.state = "done"
+            del self._inflight[job.key]
+            job.done.set_result(reply)
+            if job.series:
+                _trim_spool(self.spool)
+
+    # ---------- connections ----------
+    async def _handle(self, reader, writer):
+        followers = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if request.get("op") == "metrics":
+                        await _send(writer, {"id": request.get("id"), "status": "metrics", "metrics": self.metrics()})
+                        continue
+                    if request.get("op") != "submit":
+                        raise ValueError(f"unknown op [{request.get('op')}], expected submit or metrics")
+                    job = await self.submit(request["cycle"], request["config"], request.get("priority", "bulk"),
+                                            bool(request.get("series", False)))
+                except (ValueError, KeyError, TypeError, AttributeError, OSError) as e:
+                    await _send(writer, {"id": _request_id(line), "status": "error", "error": str(e)})
+                    continue
+                follower = asyncio.create_task(self._follow(job, request.get("id"), writer))
+                followers.add(follower)
+                follower.add_done_callback(followers.discard)
+            if followers:
+                await asyncio.wait(followers)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for follower in followers:
+                follower.cancel()
+            writer.close()
+
+    async def _follow(self, job, request_id, writer):
+        # Stream the job's progress to one requester
+        if job.state == "queued":
+            await _send(writer, {"id": request_id, "status": "queued", "queued": len(self._heap)})
+        await job.running.wait()
+        if job.state == "running":
+            await _send(writer, {"id": request_id, "status": "running"})
+        reply = await asyncio.shield(job.done)
+        await _send(writer, {"id": request_id, **reply})
+
+    def _cycle_path(self, cycle):
+        if self.registry is not None and cycle in self.registry:
+            return self.registry.info(cycle).path
+        if os.path.exists(cycle):
+            return cycle
+        names = self.registry.names() if self.registry is not None else []
+        raise ValueError(f"unknown cycle [{cycle}], expected a cycle path or one of {names}")
+
+
+class JobClient:
+    """
+    Blocking client of a running JobService (for Streamlit and batch runs).
+
+    Parameters:
+        address (str): "host:port" (default: EV_SIMULATOR_JOBS, else the local default)
+        timeout (float): Seconds to wait for the connection
+    """
+
+    def __init__(self, address=None, timeout=2.0):
+        self.address = address or service_address() or f"{HOST}:{DEFAULT_PORT}"
+        host, port = self.address.rsplit(":", 1)
+        self._socket = socket.create_connection((host, int(port)), timeout=timeout)
+        self._socket.settimeout(None)
+        self._reader = self._socket.makefile("r", encoding="utf-8")
+        self._next_id = 0
+
+    def close(self):
+        self._reader.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def simulate(self, cycle, config, priority="interactive", on_status=None):
+        """
+        One config on one cycle through the service.
+
+        Returns:
+            SimulationResult (series memory-mapped from the spool)
+        """
+        reply = self.run_many([(cycle, config)], priority, series=True, on_status=on_status)[0]
+        if reply["status"] != "done":
+            raise RuntimeError(reply["error"])
+        series = load_cycle_columns(reply["series"])
+        events = [LimitEvent(**event) for event in reply["events"]]
+        return SimulationResult.restore(series, events, reply["summary"])
+
+    def run_many(self, jobs, priority="bulk", series=False, on_status=None):
+        """
+        Submit (cycle, config) jobs and wait for all of them. Requests are
+        written from a second thread, so a throttled service never blocks
+        the replies.
+
+        Parameters:
+            on_status (callable): on_status(index, reply) for every reply
+
+        Returns:
+            list[dict]: Final reply per job, in order ("status" is "done",
+            with "summary", "events" and "series", or "error")
+        """
+        jobs = list(jobs)
+        first, self._next_id = self._next_id, self._next_id + len(jobs)
+        requests = [{"op": "submit", "id": first + n, "cycle": cycle, "config": config, "priority": priority,
+                     "series": series} for n, (cycle, config) in enumerate(jobs)]
+
+        sender = threading.Thread(target=self._send_all, args=(requests,), daemon=True)
+        sender.start()
+        replies = [None] * len(jobs)
+        pending = len(jobs)
+        while pending:
+            reply = json.loads(self._next_line())
+            n = reply["id"] - first
+            if on_status is not None:
+                on_status(n, reply)
+            if reply["status"] in ("done", "error"):
+                replies[n] = reply
+                pending -= 1
+        sender.join()
+        return replies
+
+    def metrics(self):
+        self._next_id += 1
+        self._socket.sendall((json.dumps({"op": "metrics", "id": self._next_id - 1}) + "\n").encode("utf-8"))
+        return json.loads(self._next_line())["metrics"]
+
+    def _send_all(self, requests):
+        for request in requests:
+            self._socket.sendall((json.dumps(request, default=_json_default) + "\n").encode("utf-8"))
+
+    def _next_line(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError(f"job service at {self.address} closed the connection")
+        return line
+
+
+def service_address():
+    """The "host:port" in EV_SIMULATOR_JOBS, or None when no service is configured."""
+    return os.environ.get(ADDRESS_ENV) or None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local simulation job service.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="Run the service (loopback interface only)")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port (default: %(default)s)")
+    serve.add_argument("--workers", type=int, help="Simulation processes (default: all cores)")
+    serve.add_argument("--max-queued", type=int, default=MAX_QUEUED,
+                       help="Bulk jobs waiting before submitters are held back (default: %(default)s)")
+    metrics = commands.add_parser("metrics", help="Print the queue and latency metrics of a running service")
+    metrics.add_argument("--address", help=f"host:port (default: ${ADDRESS_ENV} or {HOST}:{DEFAULT_PORT})")
+    args = parser.parse_args(argv)
+
+    if args.command == "metrics":
+        try:
+            with JobClient(args.address) as client:
+                print(json.dumps(client.metrics(), indent=2))
+        except OSError as e:
+            print(f"no job service: {e}", file=sys.stderr)
+            return 1
+        return 0
+
+    service = JobService(args.workers, args.max_queued)
+    print(f"job service on {HOST}:{args.port} with {service.workers} workers", file=sys.stderr)
+    try:
+        asyncio.run(service.serve(args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+# ---------- worker side ----------
+_worker_cycles = {}     # (path, mtime) -> cycle columns
+
+def _run_job(key, path, config, spool):
+    # Keyed by modification time as the job key is, so a rewritten cycle
+    # file is reloaded (and its old version dropped)
+    stamp = (path, _cycle_mtime(path))
+    cycle = _worker_cycles.get(stamp)
+    if cycle is None:
+        for old in [old for old in _worker_cycles if old[0] == path]:
+            del _worker_cycles[old]
+        cycle = _worker_cycles[stamp] = load_cycle_columns(path)
+    with np.errstate(all="ignore"):
+        result = simulate_cached(cycle, config)
+    reply = {"summary": result.summary(), "events": [event.as_dict() for event in result.events]}
+
+    if spool is not None:
+        target = os.path.join(spool, key)
+        if not is_cycle_dir(target):
+            # Written aside and renamed, so readers never see a partial directory
+            staging = tempfile.mkdtemp(dir=spool)
+            write_cycle(result.series, staging, source=os.path.basename(path))
+            try:
+                os.rename(staging, target)
+            except OSError:
+                shutil.rmtree(staging, ignore_errors=True)
+        reply["series"] = target
+    return reply
+
+
+# ---------- helpers ----------
+class _Job:
+    def __init__(self, key, path, config, series, priority):
+        self.key = key
+        self.path = path
+        self.config = config
+        self.series = series
+        self.priority = priority
+        self.state = "queued"
+        self.holds_slot = False
+        self.submitted = time.perf_counter()
+        self.started = None
+        self.running = asyncio.Event()
+        self.done = asyncio.get_running_loop().create_future()
+
+async def _send(writer, message):
+    writer.write((json.dumps(message, default=_json_default) + "\n").encode("utf-8"))
+    await writer.drain()
+
+def _cycle_mtime(path):
+    # write_cycle rewrites a cycle directory's files in place, which leaves
+    # the directory's own mtime alone: a directory counts as its newest file
+    if os.path.isdir(path):
+        return max((entry.stat().st_mtime_ns for entry in os.scandir(path) if entry.is_file()),
+                   default=os.stat(path).st_mtime_ns)
+    return os.stat(path).st_mtime_ns
+
+def _request_id(line):
+    try:
+        return json.loads(line).get("id")
+    except (ValueError, AttributeError):
+        return None
+
+def _percentiles(values):
+    if not values:
+        return {"mean": None, "p50": None, "p95": None}
+    values = np.asarray(values)
+    return {"mean": float(values.mean()), "p50": float(np.percentile(values, 50)),
+            "p95": float(np.percentile(values, 95))}
+
+def _trim_spool(spool):
+    # Newest SPOOL_RESULTS result directories stay
+    entries = []
+    for name in os.listdir(spool):
+        path = os.path.join(spool, name)
+        try:
+            entries.append((os.stat(path).st_mtime, path))
+        except OSError:
+            continue
+    for _, path in sorted(entries)[:-SPOOL_RESULTS]:
+        shutil.rmtree(path, ignore_errors=True)
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialise {type(value).__name__}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,354 @@
+# logic/kernel.py
+#
+# Batched version of the physics in logic/physics.py: K configurations are
+# packed into (K,) parameter arrays and evaluated against one drive cycle in
+# a single NumPy broadcast pass, giving (K x T) results. The terms that only
+# depend on the cycle come from logic.kinematics and are shared by every
+# configuration.
+
+import numpy as np
+
+from config.parameters import motor_specs, transmission_models, regen_specs, cooling_params
+from logic.engine import INITIAL_SOC, USABLE_SOC_WINDOW
+from logic.events import LIMIT_ORDER, first_true
+from logic.kinematics import cycle_kinematics, G
+from logic.motor_calculations import efficiency_table
+from logic.thermal import thermal_network, simulate_temperatures, AMBIENT_TEMP, TEMPERATURE_COLUMNS
+from logic.battery import pack_arrays, solve_pack
+
+AIR_DENSITY = 1.225
+TYRE_CRR = {"Eco": 0.008, "Standard": 0.010, "Performance": 0.014}
+
+# Elements per (K x T) block, bounds the working memory of one pass
+BLOCK_ELEMENTS = 2**17
+
+
+def config_arrays(configs):
+    """
+    Pack a list of config dicts into (K,) parameter arrays.
+    """
+    def column(values, dtype=float):
+        return np.array(values, dtype=dtype)
+
+    motors = [motor_specs[c["motor_type"]] for c in configs]
+    transmissions = [transmission_models[c["transmission_type"]] for c in configs]
+    regens = [regen_specs[c["regen_mode"]] if c["regen_mode"] is not None else None for c in configs]
+    coolants = [cooling_params[c["coolant_flow"]] for c in configs]
+
+    params = {
+        "vehicle_mass": column([c["vehicle_mass"] for c in configs]),
+        "drag_coefficient": column([c["drag_coefficient"] for c in configs]),
+        "frontal_area": column([c["frontal_area"] for c in configs]),
+        "c_rr": column([TYRE_CRR[c["tyre_type"]] for c in configs]),
+        "wheel_radius": column([c["wheel_radius"] for c in configs]),
+        "gear_ratio": column([t["Gear Ratio"] for t in transmissions]),
+        "drivetrain_efficiency": column([t["Efficiency"] for t in transmissions]),
+        "motor_efficiency": column([m["efficiency"] for m in motors]),
+        "motor_code": column([m["code"] for m in motors], dtype=object),
+        "efficiency_map": column([c.get("efficiency_model", "scalar") == "map" for c in configs], dtype=bool),
+        "inverter_efficiency": column([c["inverter_efficiency"] for c in configs]),
+        "system_efficiency": column([c["system_efficiency"] for c in configs]),
+        "hvac_efficiency": column([c["hvac_efficiency"] for c in configs]),
+        "auxiliary_load": column([c["auxiliary_load"] for c in configs]),
+        "coolant_power": column([c["coolant_power"] for c in configs]),
+        "motor_mass": column([m["mass"] for m in motors]),
+        "motor_cp": column([m["specific_heat"] for m in motors]),
+        "coolant_flow": column([s["approx_L_per_min"] for s in coolants]),
+        "coolant_cp": column([s["coolant_cp"] for s in coolants]),
+        "srm": column([m["code"] == "SRM" for m in motors], dtype=bool),
+        "system_voltage": column([c["system_voltage"] for c in configs]),
+        "regen": column([r is not None for r in regens], dtype=bool),
+        "regen_efficiency": column([r["efficiency"] if r else 0.0 for r in regens]),
+        "regen_max_power": column([r["Max. Recovery"] if r else 0.0 for r in regens]),
+        "battery_capacity": column([c["battery_capacity"] for c in configs]),
+        "battery_max_current": column([c["battery_max_current"] for c in configs]),
+        "max_motor_torque": column([m["torque_nm"] for m in motors]),
+        "max_transmission_torque": column([t["Max Torque Capacity [Nm]"] for t in transmissions]),
+        "vehicle_cost": column([c["vehicle_cost"] for c in configs]),
+        "initial_soc": column([c.get("initial_soc", INITIAL_SOC) for c in configs]),
+    }
+    params.update(pack_arrays(configs))
+    return params
+
+
+def compute_batch(terms, params, full=False):
+    """
+    Evaluate the physics for every configuration in `params` over the cycle
+    `terms` (see logic.kinematics.compute_kinematics).
+
+    Per-configuration constants are folded into (K, 1) coefficients so each
+    (K x T) quantity costs one or two array operations. By default only the
+    columns needed for the summary are returned; `full=True` adds the rest of
+    the calculate_parameters columns.
+
+    Returns:
+        dict of (K x T) arrays named like the calculate_parameters columns
+    """
+    p = {name: value[:, None] for name, value in params.items()}
+    speed = terms["Speed [m/s]"]
+    mass = p["vehicle_mass"]
+
+    # Resistive forces: rolling + drag + acceleration + gradient
+    total_force = mass * terms["inertial_grade"]
+    total_force += (0.5 * AIR_DENSITY * p["frontal_area"] * p["drag_coefficient"]) * terms["speed_squared"]
+    total_force += p["c_rr"] * mass * G
+
+    # Torque at the motor, motor speed and electrical speed (4 pole pairs)
+    torque = total_force * (p["wheel_radius"] / (p["gear_ratio"] * p["drivetrain_efficiency"]))
+    rpm = (speed * 60 / (2 * np.pi * p["wheel_radius"])) * p["gear_ratio"]
+    omega_e = speed * (4 * p["gear_ratio"] / p["wheel_radius"])
+
+    # Power draw
+    motor_efficiency = _motor_efficiency(torque, rpm, params)
+    power = total_force * speed
+    power *= 1 / (1000 * motor_efficiency * p["inverter_efficiency"] * p["system_efficiency"])
+    power += (p["auxiliary_load"] / p["hvac_efficiency"] + p["coolant_power"]) * terms["moving"]
+
+    motor_current, motor_voltage = motor_electrical(torque, omega_e, params["srm"])
+    inverter_current = motor_voltage * motor_current
+    inverter_current /= p["system_voltage"]
+
+    # Regenerative braking
+    recovered_kwh = np.minimum(mass * terms["energy_change"], 0)
+    np.negative(recovered_kwh, out=recovered_kwh)
+    np.minimum(recovered_kwh, p["regen_max_power"] * terms["dt"], out=recovered_kwh)
+    recovered_kwh *= p["regen_efficiency"] / 3_600_000.0
+    recovered_kwh[~params["regen"]] = 0.0
+
+    # Energy and SOC
+    energy_used = power * terms["dt_hours"]
+    energy_used -= recovered_kwh
+    soc = _cumsum_skipna(energy_used, axis=1)
+    soc *= -100 / p["battery_capacity"]
+    soc += p["initial_soc"]
+    np.maximum(soc, 0, out=soc)
+
+    # Equivalent-circuit packs (see physics.compute_battery_circuit)
+    battery_current = np.full_like(power, np.nan) if full else None
+    battery_voltage = np.full_like(power, np.nan) if full else None
+    ecm = params["ecm"]
+    if ecm.any():
+        pack = {name: params[name][ecm] for name in ["chemistry", "pack_series", "pack_capacity_ah",
+                                                      "pack_r0", "pack_r1", "pack_tau"]}
+        recovered_w = np.divide(recovered_kwh[ecm] * 3_600_000.0, terms["dt"],
+                                out=np.zeros((ecm.sum(), len(speed))), where=terms["dt"] > 0)
+        demand = power[ecm] * 1000 - recovered_w
+        solved = solve_pack(demand, terms["dt"], pack, params["initial_soc"][ecm])
+
+        energy_used[ecm] = solved["voltage"] * solved["current"] * terms["dt"] / 3_600_000.0
+        soc[ecm] = np.maximum(solved["soc"], 0)
+        inverter_current[ecm] *= p["system_voltage"][ecm] / solved["voltage"]
+
+        if full:
+            battery_current[ecm] = solved["current"]
+            battery_voltage[ecm] = solved["voltage"]
+
+    series = {
+        "Power Drawn [kW]": power,
+        "Motor Torque [Nm]": torque,
+        "Invertor Current [A]": inverter_current,
+        "Recovered_kWh": recovered_kwh,
+        "Energy Used [kWh]": energy_used,
+        "SOC [%]": soc,
+    }
+    if not full:
+        return series
+
+    # Motor temperatures (thermal network, see physics.motor_temperature)
+    p_loss = np.abs(total_force * speed)
+    p_loss *= (1 - motor_efficiency) / motor_efficiency
+    network = thermal_network(params["motor_mass"], params["motor_cp"],
+                              params["coolant_flow"], params["coolant_cp"])
+    temperatures = simulate_temperatures(p_loss, terms["dt"], network)
+
+    series.update({
+        "force_gradient": mass * G * terms["Slope"],
+        "Total Force [N]": total_force,
+        "Motor Speed [rpm]": rpm,
+        "Motor Temp Rise [K]": temperatures[:, 0] - AMBIENT_TEMP,
+        "Motor Voltage [V]": motor_voltage,
+        "Motor Current [A]": motor_current,
+    })
+    series.update(zip(TEMPERATURE_COLUMNS, temperatures.transpose(1, 0, 2)))
+    series["Battery Current [A]"] = battery_current
+    series["Battery Voltage [V]"] = battery_voltage
+    return series
+
+
+def summarize_batch(terms, series, params):
+    """
+    Stop point and summary metrics per configuration, matching
+    logic.engine.SimulationResult (see logic.events).
+    Returns a dict of (K,) arrays.
+    """
+    K, T = series["SOC [%]"].shape
+    rows = np.arange(K)
+    torque = series["Motor Torque [Nm]"]
+
+    # First crossing of every limit (T when never crossed), in LIMIT_ORDER
+    first = np.stack([
+        first_true(series["SOC [%]"] <= 0),
+        first_true(torque > params["max_motor_torque"][:, None]),
+        first_true(series["Invertor Current [A]"] > params["battery_max_current"][:, None]),
+        first_true(torque > params["max_transmission_torque"][:, None]),
+    ])
+
+    # The earliest event stops the vehicle
+    reason_code = np.argmin(first, axis=0)
+    stop = first[reason_code, rows]
+    stopped = stop < T
+    stop_index = np.where(stopped, stop, T - 1)
+
+    distance = terms["Distance Travelled [km]"][stop_index]
+    final_soc = series["SOC [%]"][rows, stop_index]
+
+    # Sums over the samples before the stop point (NaN treated as 0)
+    energy_used = _sum_before(series["Energy Used [kWh]"], stop_index)
+    energy_recovered = _sum_before(series["Recovered_kWh"], stop_index)
+
+    soc_used = params["initial_soc"] - final_soc
+    range_km = np.where(soc_used > 0, distance / soc_used * USABLE_SOC_WINDOW, np.nan)
+    cost_to_range = params["vehicle_cost"] / range_km
+
+    reached = np.arange(T) <= stop_index[:, None]
+    peak_torque = _masked_max(torque, reached)
+    peak_current = _masked_max(series["Invertor Current [A]"], reached)
+
+    stop_reason = np.array([LIMIT_ORDER[code] for code in reason_code], dtype=object)
+    stop_reason[~stopped] = None
+
+    return {
+        "stop_index": stop_index,
+        "stop_reason": stop_reason,
+        "distance_km": distance,
+        "final_soc": final_soc,
+        "energy_used_kwh": energy_used,
+        "energy_recovered_kwh": energy_recovered,
+        "range_km": range_km,
+        "vehicle_cost": params["vehicle_cost"],
+        "cost_to_range": cost_to_range,
+        "peak_torque_nm": peak_torque,
+        "peak_current_a": peak_current,
+    }
+
+
+def simulate_batch(cycle, configs, keep_series=False, block_elements=BLOCK_ELEMENTS, spec=None):
+    """
+    Simulate many configurations against one drive cycle.
+
+    Configurations are processed in blocks so the (K x T) working set stays
+    below `block_elements` values per array.
+
+    Measured on the bundled 36k-sample cycle (200 configurations, one core):
+    about 1.8 ms per configuration with the ideal battery model, 8.5x a
+    simulate() loop; 9 ms with "r0" (2.5x) and 13 ms with "rc" (2x), where
+    the fixed-point pack solve of logic.battery dominates.
+
+    Parameters:
+        cycle (pd.DataFrame | dict): Drive cycle
+        configs (list[dict]): EV configurations
+        keep_series (bool): Also return the (K x T) result arrays
+        spec (logic.outputs.ResultSpec): Which of them to keep, and their precision
+
+    Returns:
+        (summary, series) - summary is a dict of (K,) arrays (see summarize_batch),
+        series a dict of (K x T) arrays or None
+    """
+    return simulate_terms(cycle_kinematics(cycle), configs, keep_series, block_elements, spec)
+
+
+def simulate_terms(terms, configs, keep_series=False, block_elements=BLOCK_ELEMENTS, spec=None):
+    """
+    simulate_batch on cycle terms computed beforehand (see
+    logic.kinematics.compute_kinematics), e.g. terms shared between processes.
+    """
+    params = config_arrays(configs)
+    K, T = len(configs), len(terms["Time [s]"])
+    block = max(1, block_elements // max(T, 1))
+
+    # Group SRM and PMSM-type motors so blocks use a single electrical model
+    order = np.argsort(params["srm"], kind="stable")
+    params = {name: value[order] for name, value in params.items()}
+
+    summaries, blocks = [], []
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for start in range(0, K, block):
+            part = {name: value[start:start + block] for name, value in params.items()}
+            series = compute_batch(terms, part, full=keep_series)
+            summaries.append(summarize_batch(terms, series, part))
+            if keep_series:
+                blocks.append(series if spec is None else spec.stored(series))
+
+    # Back to the caller's order
+    restore = np.argsort(order)
+    summary, series = {}, None
+    if summaries:
+        summary = {name: np.concatenate([s[name] for s in summaries])[restore] for name in summaries[0]}
+    if keep_series and blocks:
+        series = {name: np.concatenate([b[name] for b in blocks])[restore] for name in blocks[0]}
+    return summary, series
+
+
+def motor_electrical(torque, omega_e, srm):
+    """Motor phase current/voltage for PMSM-type (default) and SRM rows."""
+    if not srm.any():
+        return _pmsm_electrical(torque, omega_e)
+    if srm.all():
+        return _srm_electrical(torque, omega_e)
+
+    current = np.empty_like(torque)
+    voltage = np.empty_like(torque)
+    current[~srm], voltage[~srm] = _pmsm_electrical(torque[~srm], omega_e[~srm])
+    current[srm], voltage[srm] = _srm_electrical(torque[srm], omega_e[srm])
+    return current, voltage
+
+
+# ---------- helpers ----------
+def _motor_efficiency(torque, rpm, params):
+    """
+    (K, 1) scalar motor efficiencies, or (K x T) operating-point efficiencies
+    when some rows use the efficiency map (see physics.motor_efficiency_for).
+    """
+    scalar = params["motor_efficiency"][:, None]
+    mapped = params["efficiency_map"]
+    if not mapped.any():
+        return scalar
+
+    efficiency = np.broadcast_to(scalar, torque.shape).copy()
+    for code in np.unique(params["motor_code"][mapped]):
+        rows = mapped & (params["motor_code"] == code)
+        efficiency[rows] = efficiency_table(code)(torque[rows], rpm[rows])
+    return efficiency
+
+def _pmsm_electrical(torque, omega_e):
+    # Surface PMSM, i_d = 0 (see calculate_pmsm_electrical)
+    Rs, Lq, lam, p = 0.05, 0.0002, 0.06, 4
+    iq = torque * ((2.0/3.0) / (p * lam))
+    voltage = np.hypot(omega_e * Lq * iq, Rs * iq + omega_e * lam)
+    return np.abs(iq), voltage
+
+def _srm_electrical(torque, omega_e):
+    # Inductance-slope model (see calculate_srm_electrical)
+    Rs, Lmin, Lmax, p = 0.05, 0.0001, 0.0010, 4
+    dL_dtheta = (Lmax - Lmin) / (np.pi / p)
+    Lavg = 0.5 * (Lmin + Lmax)
+    current = np.sqrt(torque * (2 / dL_dtheta))
+    voltage = current * (Rs + omega_e * Lavg)
+    return current, voltage
+
+def _cumsum_skipna(values, axis=-1):
+    # pandas cumsum semantics: NaN contributes nothing but stays NaN in place
+    missing = np.isnan(values)
+    out = np.cumsum(np.where(missing, 0.0, values), axis=axis)
+    out[missing] = np.nan
+    return out
+
+def _sum_before(values, stop_index):
+    totals = np.cumsum(np.nan_to_num(values), axis=1)
+    before = np.where(stop_index > 0, stop_index - 1, 0)
+    return np.where(stop_index > 0, totals[np.arange(len(values)), before], 0.0)
+
+def _masked_max(values, mask):
+    peak = np.fmax.reduce(values, axis=1, where=mask, initial=-np.inf)
+    peak[np.isneginf(peak)] = np.nan
+    return peak
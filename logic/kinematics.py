@@ -0,0 +1,162 @@
+# logic/kinematics.py
+#
+# Drive-cycle terms that depend only on the cycle, never on the EV
+# configuration (speed, acceleration, distance, slope, ...). They are derived
+# once per cycle, keyed by a content hash of the time/velocity/elevation
+# columns, and shared read-only by every simulation, sweep and UI rerun.
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+G = 9.81
+
+# Columns a cycle is identified by, and the columns derived from them that
+# calculate_parameters adds to the frame
+CYCLE_COLUMNS = ["Time [s]", "Velocity [km/h]", "Elevation [m]"]
+KINEMATIC_COLUMNS = ["Speed [m/s]", "Acceleration [m/s²]", "Distance Travelled [km]", "Slope"]
+
+# Number of cycles kept
+CACHE_SIZE = 16
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def cycle_fingerprint(cycle):
+    """
+    Content hash of a drive cycle (time, velocity and elevation columns).
+    Equal cycles give equal fingerprints whatever container they come in.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for column in CYCLE_COLUMNS:
+        values = np.ascontiguousarray(cycle[column], dtype=np.float64)
+        digest.update(column.encode("utf-8"))
+        digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+def cycle_kinematics(cycle):
+    """
+    Config-independent terms of a drive cycle, computed once per cycle.
+
+    Parameters:
+        cycle (pd.DataFrame | dict): Drive cycle with the CYCLE_COLUMNS
+
+    Returns:
+        dict: Name -> read-only (T,) np.ndarray (see compute_kinematics)
+    """
+    key = cycle_fingerprint(cycle)
+    with _lock:
+        terms = _cache.get(key)
+        if terms is not None:
+            _cache.move_to_end(key)
+            return terms
+
+    terms = compute_kinematics(*(cycle[column] for column in CYCLE_COLUMNS))
+    for values in terms.values():
+        values.setflags(write=False)
+
+    with _lock:
+        _cache[key] = terms
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return terms
+
+
+def continue_kinematics(segment, state):
+    """
+    Kinematics of one segment of a longer cycle (not cached).
+
+    The first row of `segment` must be the last row of the previous segment;
+    state["distance_m"] is the distance travelled at that row and is updated
+    to the distance at the last row of this segment.
+    """
+    terms = compute_kinematics(*(segment[column] for column in CYCLE_COLUMNS),
+                               initial_distance=state.get("distance_m"))
+    state["distance_m"] = float(terms["distance_m"][-1])
+    return terms
+
+
+def clear_kinematics_cache():
+    with _lock:
+        _cache.clear()
+
+
+def compute_kinematics(time, velocity, elevation, initial_distance=None):
+    """
+    Derive the cycle terms. Same definitions (and NaN at the first sample)
+    as the pandas helpers in logic.physics.
+
+    Parameters:
+        time, velocity, elevation (array-like): Cycle columns
+        initial_distance (float): Distance [m] already travelled at the first
+                                  sample, when continuing an earlier segment
+
+    Returns:
+        dict: The CYCLE_COLUMNS and KINEMATIC_COLUMNS plus helper terms
+        (distance_m, and dt, dt_hours, speed_squared, moving, inertial_grade,
+        energy_change used by the batched kernel)
+    """
+    time = np.array(time, dtype=float)
+    velocity = np.array(velocity, dtype=float)
+    elevation = np.array(elevation, dtype=float)
+
+    speed = velocity / 3.6
+    dt = _diff(time)
+    average_speed = (speed + _shift(speed)) / 2
+
+    # Distance travelled using trapezoidal integration (see calculate_distance)
+    delta_distance = average_speed * dt
+    if initial_distance is not None:
+        delta_distance[0] = initial_distance
+    distance = _cumsum_skipna(delta_distance)
+    distance[np.isnan(distance)] = 0
+
+    # Road slope, clamped to +-20% (see compute_slope)
+    slope = _diff(elevation) / np.maximum(average_speed * dt, 1.0)
+    slope = np.clip(slope, -0.2, 0.2)
+    slope[np.isnan(slope)] = 0
+
+    acceleration = _diff(speed) / dt
+
+    return {
+        "Time [s]": time,
+        "Velocity [km/h]": velocity,
+        "Elevation [m]": elevation,
+        "Speed [m/s]": speed,
+        "Acceleration [m/s²]": acceleration,
+        "Distance Travelled [km]": distance / 1000,
+        "Slope": slope,
+        "distance_m": distance,
+        "dt": dt,
+        "dt_hours": np.nan_to_num(dt, nan=0.0) / 3600,
+        "speed_squared": speed**2,
+        "moving": (velocity > 0).astype(float),
+        # Per unit of vehicle mass: accel + gradient force, braking energy
+        "inertial_grade": acceleration + G * slope,
+        "energy_change": 0.5 * _diff(speed**2) + G * _diff(elevation),
+    }
+
+
+# ---------- helpers ----------
+def _diff(values):
+    out = np.empty_like(values)
+    out[:1] = np.nan
+    np.subtract(values[1:], values[:-1], out=out[1:])
+    return out
+
+def _shift(values):
+    out = np.empty_like(values)
+    out[:1] = np.nan
+    out[1:] = values[:-1]
+    return out
+
+def _cumsum_skipna(values):
+    # pandas cumsum semantics: NaN contributes nothing but stays NaN in place
+    missing = np.isnan(values)
+    out = np.cumsum(np.where(missing, 0.0, values))
+    out[missing] = np.nan
+    return out
@@ -1,5 +1,6 @@
 import numpy as np
 import pandas as pd
+from functools import lru_cache
 
 # ---------- helper to create a smooth, compact efficiency map ----------
 def make_eff_map(eta_max, t_ref, n_ref, a=0.6, b=0.5, eta_min=0.6):
@@ -119,6 +120,65 @@ MOTOR_CONSTANTS = {
     }
 }
 
+# ---------- precomputed efficiency tables (built lazily, one per motor) ----------
+class EfficiencyTable:
+    """
+    Motor efficiency sampled once on a uniform torque x rpm grid, with
+    vectorized bilinear lookup. Torque is taken as |torque|; inputs outside
+    the grid are clamped to its edge.
+    """
+
+    def __init__(self, eff_map, torque_max, rpm_max, n_torque=121, n_rpm=121):
+        self.torque_axis = np.linspace(0.0, torque_max, n_torque)
+        self.rpm_axis = np.linspace(0.0, rpm_max, n_rpm)
+        T, N = np.meshgrid(self.torque_axis, self.rpm_axis, indexing="ij")
+        self.grid = eff_map(T, N)
+
+    def __call__(self, torque, rpm):
+        T = np.abs(np.asarray(torque, dtype=float))
+        N = np.asarray(rpm, dtype=float)
+        shape = np.broadcast_shapes(T.shape, N.shape)
+        T, N = np.broadcast_to(T, shape).ravel(), np.broadcast_to(N, shape).ravel()
+
+        # NaN inputs give NaN fractions, so they come out as NaN efficiency
+        i, ft = self._locate(T, self.torque_axis)
+        j, fn = self._locate(N, self.rpm_axis)
+
+        # corners of the cell, gathered from the flattened grid
+        g = self.grid.ravel()
+        k = i * len(self.rpm_axis) + j
+        row = len(self.rpm_axis)
+        low = g.take(k, mode="clip")
+        low += (g.take(k + row, mode="clip") - low) * ft
+        high = g.take(k + 1, mode="clip")
+        high += (g.take(k + row + 1, mode="clip") - high) * ft
+        high -= low
+        high *= fn
+        high += low
+        return high.reshape(shape) if shape else high[0]
+
+    @staticmethod
+    def _locate(values, axis):
+        # cell index and fractional position inside the cell (uniform axis)
+        position = values * (1.0 / (axis[1] - axis[0]))
+        np.clip(position, 0.0, len(axis) - 1, out=position)
+        # NaN positions take cell 0 (casting NaN to int is undefined); their
+        # fraction stays NaN, so the efficiency still comes out NaN
+        index = np.minimum(np.where(np.isfinite(position), position, 0.0).astype(np.intp), len(axis) - 2)
+        position -= index
+        return index, position
+
+
+@lru_cache(maxsize=None)
+def efficiency_table(motor_type):
+    """
+    Efficiency table of a motor in MOTOR_CONSTANTS (built on first use and
+    cached). The grid spans 3x the reference torque and speed.
+    """
+    m = MOTOR_CONSTANTS[motor_type]
+    return EfficiencyTable(m["eff_map"], torque_max=3 * m["t_ref"], rpm_max=3 * m["n_ref"])
+
+
 # ---------- small utility to obtain efficiency (uses eff_map if present) ----------
 def get_efficiency_for(motor_type, torque, rpm):
     """
@@ -132,6 +192,17 @@ def get_efficiency_for(motor_type, torque, rpm):
         # fallback scalar (broadcast)
         return np.full_like(np.asarray(torque, dtype=float), fill_value=m.get("efficiency", 0.9), dtype=float)
 
+def get_tabulated_efficiency_for(motor_type, torque, rpm):
+    """
+    As get_efficiency_for, but looked up in the precomputed efficiency table
+    (bilinear, clamped to 3x the reference torque and speed): much faster on
+    long arrays, within the table's interpolation error of eff_map.
+    """
+    m = MOTOR_CONSTANTS[motor_type]
+    if m.get("eff_map", None) is not None:
+        return efficiency_table(motor_type)(torque, rpm)
+    return get_efficiency_for(motor_type, torque, rpm)
+
 def calculate_pmsm_electrical(df, Vdc):
 
     # Known motor params
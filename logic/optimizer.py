@@ -0,0 +1,547 @@
+# logic/optimizer.py
+#
+# Cheapest design that meets a range target on a drive cycle.
+#
+# The catalog choices (CATALOG_AXES without the modelling options) are
+# searched best-first by branch-and-bound. A node fixes some of the choices;
+# its lower bound is the vehicle cost (same formula as total_cost) with every
+# open choice at its cheapest option, plus the cheapest pack that could
+# reach the target. Nodes bounded above the cost ceiling or the best design
+# found so far are never expanded.
+#
+# The pack bound comes from a per-sample lower bound on the energy drawn:
+# one kernel run of a "proxy" vehicle per node at its lightest and heaviest
+# mass, with the lowest drag and rolling resistance of the open choices,
+# unit efficiencies and the strongest regen. Traction samples are divided by
+# the best open drivetrain efficiency, braking samples by the worst, and the
+# smaller of the two masses is taken per sample, so the bound holds for every
+# completion of the node (the energy drawn in a sample is concave in mass,
+# regen grows with it). The proxy's torque also bounds the peak motor torque, which
+# prunes motor / transmission branches too weak to drive the target range,
+# and, with the lowest motor speed, the peak battery current: a pack must
+# have enough parallel cells for it, which sizes the pack on short targets.
+# The pack a node needs has a mass of its own, so the lightest proxy is run
+# again with it until the bound settles.
+#
+# A fully fixed node is a leaf: its battery (parallel cell strings, or
+# Solid-State energy) is sized by narrowing a bracket with batched kernel
+# runs (logic.sweep.evaluate_designs, so results are cached) to the smallest
+# pack that meets the range without a torque, current or transmission limit
+# event. Larger packs only add mass, so a torque limit at one size rules out
+# every larger one.
+#
+# The bounds are derived for the ideal battery. With an equivalent-circuit
+# model (base battery_model) the pack voltage moves with SOC and load, so
+# they become close estimates rather than guarantees.
+
+import heapq
+import itertools
+import time
+
+import numpy as np
+
+from config.parameters import style_cd_map, style_cost_factor, battery_data, motor_specs
+from config.parameters import wheel_size_map, cooling_params, regen_specs, transmission_models, inverter_specs, hvac_specs
+from logic.engine import INITIAL_SOC, USABLE_SOC_WINDOW
+from logic.events import BATTERY_DEPLETED, TORQUE_LIMIT, TRANSMISSION_LIMIT
+from logic.kernel import TYRE_CRR, config_arrays, compute_batch, motor_electrical
+from logic.kinematics import cycle_kinematics
+from logic.motor_calculations import efficiency_table
+from logic.design import body_mass
+from logic.sweep import CATALOG_AXES, DEFAULT_DESIGN, design_config, evaluate_designs
+
+# Branching order: the choices with the widest cost spread first, so bounds tighten early
+SEARCH_AXES = ["vehicle_style", "battery_chemistry", "system_voltage", "motor_type", "inverter_type",
+               "transmission_type", "regen_type", "hvac_type", "tyre_size", "tyre_type", "coolant_flow"]
+
+# Same values as design_config
+VOLTAGE_WINDOWS = {"400V": (300, 450), "800V": (660, 820)}
+SYSTEM_EFFICIENCY = {"400V": 1.0, "800V": 1.1}
+SYSTEM_COST_FACTOR = {"400V": 1, "800V": 1.2}
+
+# Nominal voltage of a Solid-State pack (sized in kWh, not cells)
+SOLID_STATE_PACK_VOLTAGE = {"400V": 400, "800V": 800}
+SOLID_STATE_RESOLUTION = 0.1    # kWh
+SOLID_STATE_MAX_KWH = 1000.0
+MAX_PARALLEL_STRINGS = 4096
+
+# Pack sizes simulated per refinement pass of a leaf
+SIZE_STEPS = 8
+
+# Bound a node again with the mass of its smallest pack while that adds more
+# than this fraction of the body mass to its lightest vehicle
+MASS_REFINEMENT = 0.02
+
+
+class OptimizationResult:
+    """
+    Outcome of optimize().
+
+    Attributes:
+        design (dict | None): Cheapest design meeting the targets (None if there is none)
+        config (dict | None): Its simulation config (see logic.sweep.design_config)
+        row (dict | None): Its result row (see logic.sweep.evaluate_designs)
+        cost (float): Its vehicle cost (NaN if there is none)
+        stats (dict): Search statistics
+    """
+
+    def __init__(self, design, config, row, stats):
+        self.design = design
+        self.config = config
+        self.row = row
+        self.cost = config["vehicle_cost"] if config is not None else float("nan")
+        self.stats = stats
+
+    @property
+    def found(self):
+        return self.design is not None
+
+
+def optimize(cycle, target_range_km, max_cost=None, axes=None, base=None):
+    """
+    Find the cheapest design whose estimated range on `cycle` reaches
+    `target_range_km` without a torque, current or transmission limit event.
+
+    Parameters:
+        cycle (pd.DataFrame | dict): Drive cycle
+        target_range_km (float): Minimum estimated range
+        max_cost (float): Optional cost ceiling
+        axes (dict): Catalog choices to search, name -> options (default: every
+                     SEARCH_AXES entry with all its CATALOG_AXES options)
+        base (dict): Fixed design inputs (default DEFAULT_DESIGN); the pack
+                     size inputs are chosen by the search
+
+    Returns:
+        OptimizationResult
+    """
+    started = time.perf_counter()
+    base = DEFAULT_DESIGN if base is None else {**DEFAULT_DESIGN, **base}
+    if axes is None:
+        axes = {name: CATALOG_AXES[name] for name in SEARCH_AXES}
+    unknown = [name for name in axes if name not in SEARCH_AXES]
+    if unknown:
+        raise ValueError(f"cannot search {unknown}, expected axes of SEARCH_AXES")
+    # Choices that are not searched keep their base value
+    options = {name: list(axes.get(name, [base[name]])) for name in SEARCH_AXES}
+
+    search = _Search(cycle, target_range_km, max_cost, options, base)
+    search.run()
+
+    stats = dict(search.stats)
+    stats["catalog_combinations"] = int(np.prod([len(values) for values in options.values()]))
+    stats["seconds"] = time.perf_counter() - started
+    if search.best is None:
+        return OptimizationResult(None, None, None, stats)
+    return OptimizationResult(*search.best, stats)
+
+
+class _Search:
+
+    def __init__(self, cycle, target, max_cost, options, base):
+        self.cycle = cycle
+        self.target = target
+        self.max_cost = float("inf") if max_cost is None else max_cost
+        self.options = options
+        self.base = base
+        self.terms = cycle_kinematics(cycle)
+        self.distance = self.terms["Distance Travelled [km]"]
+
+        # A pack that runs flat mid-cycle reports distance * initial SOC / 85
+        # short of its range, so any design meeting the target drives at least
+        # this far without a limit event (the whole cycle for longer targets)
+        self.initial_soc = base.get("initial_soc", INITIAL_SOC)
+        self.flat_distance = target * self.initial_soc / USABLE_SOC_WINDOW
+        self.driven = self.distance < self.flat_distance
+
+        # Pack size range of every chemistry / voltage pairing (None if no pack fits)
+        self.packs = {(chemistry, voltage): _pack_sizes({**base, "battery_chemistry": chemistry,
+                                                         "system_voltage": voltage})
+                      for chemistry in options["battery_chemistry"] for voltage in options["system_voltage"]}
+
+        self.best = None
+        self.best_cost = float("inf")
+        self.stats = {"nodes_expanded": 0, "pruned_by_cost": 0, "pruned_infeasible": 0,
+                      "leaves_evaluated": 0, "leaves_feasible": 0,
+                      "proxy_simulations": 0, "sizing_simulations": 0}
+
+    def run(self):
+        heap = []
+        counter = itertools.count()
+        node, packs = {}, None
+        while True:
+            if len(node) == len(SEARCH_AXES):
+                self._evaluate_leaf(node, packs[(node["battery_chemistry"], node["system_voltage"])])
+            else:
+                self.stats["nodes_expanded"] += 1
+                for child, bound, child_packs in self._children(node):
+                    heapq.heappush(heap, (bound, next(counter), child, child_packs))
+
+            if not heap:
+                return
+            bound, _, node, packs = heapq.heappop(heap)
+            if bound >= self.best_cost:
+                # Everything left is bounded above the best design
+                self.stats["pruned_by_cost"] += 1 + len(heap)
+                return
+
+    # ---------- bounds ----------
+    def _children(self, node):
+        """(child, cost bound, pack energy bounds) for each option of the next axis."""
+        axis = SEARCH_AXES[len(node)]
+        children = []
+        for value in self.options[axis]:
+            child = {**node, axis: value}
+            if self._infeasible(child):
+                self.stats["pruned_infeasible"] += 1
+            else:
+                children.append(child)
+        if not children:
+            return []
+
+        bounds = [self._pack_bounds(child, *proxy) for child, proxy in zip(children, self._proxy_bounds(children))]
+
+        # The smallest pack adds its mass to the lightest vehicle, which
+        # raises the bound: repeat while that moves the mass noticeably
+        lightest = [self._body_mass_range(child)[0] for child in children]
+        while True:
+            heavier = {}
+            for i, (child, (packs, _)) in enumerate(zip(children, bounds)):
+                body = self._body_mass_range(child)[0]
+                if packs and body + self._pack_mass(packs) > lightest[i] + MASS_REFINEMENT * body:
+                    heavier[i] = lightest[i] = body + self._pack_mass(packs)
+            if not heavier:
+                break
+            proxies = self._proxy_bounds([children[i] for i in heavier], [lightest[i] for i in heavier])
+            for i, proxy in zip(heavier, proxies):
+                packs, peak_torque = self._pack_bounds(children[i], *proxy)
+                bounds[i] = ({pair: max(kwh, bounds[i][0][pair]) for pair, kwh in packs.items()},
+                             max(peak_torque, bounds[i][1]))
+
+        kept = []
+        for child, (packs, peak_torque) in zip(children, bounds):
+            if peak_torque > self._torque_capacity(child) or not packs:
+                # Too weak to drive the target range, or needs more than the largest pack that fits
+                self.stats["pruned_infeasible"] += 1
+                continue
+            bound = _cost_bound(child, self.options, packs)
+            if bound > self.max_cost or bound >= self.best_cost:
+                self.stats["pruned_by_cost"] += 1
+                continue
+            kept.append((child, bound, packs))
+        return kept
+
+    def _infeasible(self, node):
+        # Inverter / voltage pairing, and chemistries without a pack that fits
+        if "inverter_type" in node and "system_voltage" in node:
+            flag = "supports_400V" if node["system_voltage"] == "400V" else "supports_800V"
+            if not inverter_specs[node["inverter_type"]][flag]:
+                return True
+        return all(self.packs[pair] is None for pair in self._pairs(node))
+
+    def _pairs(self, node):
+        return [(chemistry, voltage) for chemistry in _open(node, self.options, "battery_chemistry")
+                for voltage in _open(node, self.options, "system_voltage")]
+
+    def _torque_capacity(self, node):
+        return min(max(motor_specs[m]["torque_nm"] for m in _open(node, self.options, "motor_type")),
+                   max(transmission_models[t]["Max Torque Capacity [Nm]"]
+                       for t in _open(node, self.options, "transmission_type")))
+
+    def _pack_bounds(self, node, used, peak_power, peak_torque):
+        """
+        ((chemistry, voltage) -> smallest pack energy [kWh] that could reach
+        the target, peak motor torque bound); pairings whose pack would not
+        fit are left out.
+        """
+        energy_kwh = self._pack_kwh_bound(used)
+        packs = {}
+        for pair in self._pairs(node):
+            kwh = max(energy_kwh, _current_kwh(*pair, peak_power))
+            if self.packs[pair] is not None and kwh <= self.packs[pair][3]:
+                packs[pair] = kwh
+        return packs, peak_torque
+
+    def _pack_mass(self, packs):
+        return min(kwh * 1000 / battery_data[chemistry]["energy_density"] for (chemistry, _), kwh in packs.items())
+
+    def _body_mass_range(self, node):
+        masses = [self._body_mass(style) for style in _open(node, self.options, "vehicle_style")]
+        return min(masses), max(masses)
+
+    def _proxy_bounds(self, nodes, lightest=None):
+        """
+        Lower bounds per node: (cumulative energy used [kWh] per sample, peak
+        motor electrical power [W] and peak motor torque [Nm] over the driven
+        samples), for vehicles from `lightest` (default: the body alone) to
+        the heaviest body with the largest pack.
+        """
+        configs, masses = [], []
+        for i, node in enumerate(nodes):
+            template = self._template(node)
+            light, heavy = self._body_mass_range(node)
+            heavy += max(self.packs[pair][4] for pair in self._pairs(node) if self.packs[pair] is not None)
+            configs += [template, template]
+            masses += [light if lightest is None else lightest[i], heavy]
+
+        params = config_arrays(configs)
+        for name, values in [("vehicle_mass", masses)] + _proxy_overrides(nodes, self.options):
+            params[name] = np.array(values, dtype=params[name].dtype)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            series = compute_batch(self.terms, params)
+        self.stats["proxy_simulations"] += len(configs)
+
+        # Rows 2i / 2i+1: node i at its lightest / heaviest
+        traction = series["Power Drawn [kW]"]
+        recovered = np.fmax(series["Recovered_kWh"][0::2], series["Recovered_kWh"][1::2])
+        torque = np.fmin(series["Motor Torque [Nm]"][0::2], series["Motor Torque [Nm]"][1::2])
+        moving_hours = self.terms["moving"] * self.terms["dt_hours"]
+
+        bounds = []
+        for i, node in enumerate(nodes):
+            low, high = _efficiency_range(node, self.options, self.base)
+            drawn = [np.where(power > 0, power / high, power / low) for power in traction[2 * i:2 * i + 2]]
+            energy = np.fmin(*drawn) * self.terms["dt_hours"]
+            energy += _auxiliary_power(node, self.options) * moving_hours
+            energy -= recovered[i]
+
+            # Motor voltage * current grows with torque and speed: the proxy
+            # torque with the slowest motor speed of the open choices
+            driven_torque = np.maximum(torque[i][self.driven], 0.0)
+            omega_e = self.terms["Speed [m/s]"][self.driven] * (4 * _gear_ratio_range(node, self.options)[0]
+                                                                / _wheel_radius_range(node, self.options)[1])
+            power = np.inf
+            for srm in {motor_specs[m]["code"] == "SRM" for m in _open(node, self.options, "motor_type")}:
+                current, voltage = motor_electrical(driven_torque[None], omega_e[None], np.array([srm]))
+                power = np.fmin(power, np.nanmax(current * voltage, initial=0.0))
+
+            bounds.append((np.nancumsum(energy), power, np.nanmax(driven_torque, initial=0.0)))
+        return bounds
+
+    def _pack_kwh_bound(self, used):
+        """Smallest pack energy [kWh] that could reach the target, given a lower bound on the energy used so far."""
+        # Finishing the cycle: range = usable fraction * capacity * distance / energy used
+        needed = self.target * used[-1] / (USABLE_SOC_WINDOW / 100 * self.distance[-1])
+        # Running flat past flat_distance: the pack holds everything used before that point
+        if self.flat_distance <= self.distance[-1]:
+            needed = min(needed, used[self.driven].max(initial=0.0) / (self.initial_soc / 100))
+        return max(needed, 0.0)
+
+    def _template(self, node):
+        # Any completion of the node; the proxy overrides what matters
+        design = dict(self.base)
+        design.update((name, node.get(name, self.options[name][0])) for name in SEARCH_AXES)
+        design["battery_model"] = "ideal"
+        design["efficiency_model"] = "scalar"
+        return design_config(design)[0]
+
+    def _body_mass(self, style):
+        return body_mass({**self.base, "vehicle_style": style})
+
+    # ---------- leaves ----------
+    def _evaluate_leaf(self, node, pack_kwh):
+        self.stats["leaves_evaluated"] += 1
+        design = {**self.base, **node}
+        low, high, step, _, _ = self.packs[(design["battery_chemistry"], design["system_voltage"])]
+        low = max(low, min(high, _size_for(design, pack_kwh, step)))
+
+        rows = {}
+
+        def status(size):
+            row = rows[size]
+            if not row["valid"] or row["stop_reason"] in (TORQUE_LIMIT, TRANSMISSION_LIMIT):
+                return "fail"
+            if row["stop_reason"] not in ("", BATTERY_DEPLETED) or not row["range_km"] >= self.target:
+                return "short"
+            return "ok"
+
+        # Bracket (largest size known short, smallest size known not short),
+        # narrowed with SIZE_STEPS sizes per batched pass
+        below, above = None, None
+        while True:
+            grid = _grid(low if below is None else below, high if above is None else above, step)
+            todo = [size for size in grid if size not in rows]
+            for size, row in zip(todo, evaluate_designs(self.cycle, [_sized(design, size) for size in todo])):
+                rows[size] = row
+            self.stats["sizing_simulations"] += len(todo)
+
+            first = next((size for size in grid if status(size) != "short"), None)
+            if first is None:
+                return      # even the largest pack falls short
+            above = first
+            shorter = [size for size in grid if size < first]
+            below = shorter[-1] if shorter else below
+            if below is None or above - below <= step * 1.5:
+                break
+
+        if status(above) != "ok":
+            return
+        sized = _sized(design, above)
+        config, _ = design_config(sized)
+        if config["vehicle_cost"] > self.max_cost:
+            return
+        self.stats["leaves_feasible"] += 1
+        if config["vehicle_cost"] < self.best_cost:
+            self.best_cost = config["vehicle_cost"]
+            self.best = (sized, config, rows[above])
+
+
+# ---------- helpers ----------
+def _open(node, options, axis):
+    return [node[axis]] if axis in node else options[axis]
+
+def _cost_bound(node, options, packs):
+    # total_cost with every open choice at its cheapest, and the cheapest of
+    # the packs (chemistry, voltage) -> kWh
+    def cheapest(axis, cost):
+        return min(cost(value) for value in _open(node, options, axis))
+
+    electronics = (cheapest("motor_type", lambda m: motor_specs[m]["cost_inr"])
+                   + cheapest("regen_type", lambda r: regen_specs[r]["cost_inr"] if r is not None else 0)
+                   + cheapest("inverter_type", lambda i: inverter_specs[i]["cost_inr"]))
+    return (electronics * cheapest("system_voltage", lambda v: SYSTEM_COST_FACTOR[v])
+            + min(kwh * battery_data[chemistry]["cost_kW"] for (chemistry, _), kwh in packs.items())
+            + cheapest("transmission_type", lambda t: transmission_models[t]["Cost"])
+            + cheapest("tyre_size", lambda s: wheel_size_map[s]["cost_inr"])
+            + cheapest("vehicle_style", lambda s: 350000 * style_cost_factor[s])
+            + cheapest("hvac_type", lambda h: hvac_specs[h]["cost_inr"]))
+
+def _proxy_overrides(nodes, options):
+    # Per node (twice, for both masses): the most favourable open choices,
+    # unit efficiencies and no auxiliary load (both applied by _proxy_bounds),
+    # no limits and a pack that never runs flat
+    def per_node(value):
+        return [value(node) for node in nodes for _ in range(2)]
+
+    def regens(node):
+        return [r for r in _open(node, options, "regen_type") if r is not None]
+
+    return [
+        ("drag_coefficient", per_node(lambda n: min(style_cd_map[s] for s in _open(n, options, "vehicle_style")))),
+        ("c_rr", per_node(lambda n: min(TYRE_CRR[t] for t in _open(n, options, "tyre_type")))),
+        ("wheel_radius", per_node(lambda n: _wheel_radius_range(n, options)[0])),
+        ("gear_ratio", per_node(lambda n: max(transmission_models[t]["Gear Ratio"] * transmission_models[t]["Efficiency"]
+                                              for t in _open(n, options, "transmission_type")))),
+        ("drivetrain_efficiency", per_node(lambda n: 1.0)),
+        ("motor_efficiency", per_node(lambda n: 1.0)),
+        ("efficiency_map", per_node(lambda n: False)),
+        ("inverter_efficiency", per_node(lambda n: 1.0)),
+        ("system_efficiency", per_node(lambda n: 1.0)),
+        ("auxiliary_load", per_node(lambda n: 0.0)),
+        ("hvac_efficiency", per_node(lambda n: 1.0)),
+        ("coolant_power", per_node(lambda n: 0.0)),
+        ("regen", per_node(lambda n: bool(regens(n)))),
+        ("regen_efficiency", per_node(lambda n: max((regen_specs[r]["efficiency"] for r in regens(n)), default=0.0))),
+        ("regen_max_power", per_node(lambda n: max((regen_specs[r]["Max. Recovery"] for r in regens(n)), default=0.0))),
+        ("battery_capacity", per_node(lambda n: np.inf)),
+        ("battery_max_current", per_node(lambda n: np.inf)),
+        ("max_motor_torque", per_node(lambda n: np.inf)),
+        ("max_transmission_torque", per_node(lambda n: np.inf)),
+        ("ecm", per_node(lambda n: False)),
+    ]
+
+def _wheel_radius_range(node, options):
+    radii = [wheel_size_map[s]["wheel_radius"] for s in _open(node, options, "tyre_size")]
+    return min(radii), max(radii)
+
+def _gear_ratio_range(node, options):
+    ratios = [transmission_models[t]["Gear Ratio"] for t in _open(node, options, "transmission_type")]
+    return min(ratios), max(ratios)
+
+def _efficiency_range(node, options, base):
+    # Lowest and highest motor * inverter * system efficiency of the open choices
+    motors = []
+    for motor in _open(node, options, "motor_type"):
+        if base.get("efficiency_model", "scalar") == "map":
+            grid = efficiency_table(motor_specs[motor]["code"]).grid
+            motors.append((grid.min(), grid.max()))
+        else:
+            motors.append((motor_specs[motor]["efficiency"],) * 2)
+    inverters = [inverter_specs[i]["efficiency"] for i in _open(node, options, "inverter_type")]
+    systems = [SYSTEM_EFFICIENCY[v] for v in _open(node, options, "system_voltage")]
+    return (min(low for low, _ in motors) * min(inverters) * min(systems),
+            max(high for _, high in motors) * max(inverters) * max(systems))
+
+def _auxiliary_power(node, options):
+    # HVAC and coolant pump draw while moving [kW]
+    return (min(hvac_specs[h]["power_kw"] / hvac_specs[h]["efficiency"] for h in _open(node, options, "hvac_type"))
+            + min(cooling_params[c]["typical_pump_power_W"] for c in _open(node, options, "coolant_flow")) / 1000)
+
+def _current_kwh(chemistry, system_voltage, peak_power):
+    # Smallest pack [kWh] whose current limit (C-rate * capacity) carries the
+    # peak motor power; capacity [Ah] = energy / pack voltage
+    volts = 400 if system_voltage == "400V" else 800
+    if chemistry == "Solid-State":
+        pack_voltage = SOLID_STATE_PACK_VOLTAGE[system_voltage]
+    else:
+        pack_voltage = _series_cells(chemistry, system_voltage) * battery_data[chemistry]["voltage"]
+    return peak_power / volts * pack_voltage / battery_data[chemistry]["max_c_rate"] / 1000
+
+def _series_cells(chemistry, system_voltage):
+    # Fewest series cells inside the voltage window (finest energy steps), None if none fits
+    low, high = VOLTAGE_WINDOWS[system_voltage]
+    cell = battery_data[chemistry]["voltage"]
+    series = int(np.ceil(low / cell))
+    return series if series * cell <= high else None
+
+def _sized(design, size):
+    """The design with its pack set to `size` (parallel strings, or kWh for Solid-State)."""
+    design = dict(design)
+    if design["battery_chemistry"] == "Solid-State":
+        design["pack_capacity_kwh"] = float(size)
+        design["pack_voltage"] = SOLID_STATE_PACK_VOLTAGE[design["system_voltage"]]
+    else:
+        series = _series_cells(design["battery_chemistry"], design["system_voltage"])
+        design["cells_series"] = series
+        design["total_cells"] = series * int(size)
+    return design
+
+def _size_for(design, pack_kwh, step):
+    # Largest size on the step holding at most pack_kwh
+    if design["battery_chemistry"] == "Solid-State":
+        return np.floor(pack_kwh / step + 1e-9) * step
+    spec = battery_data[design["battery_chemistry"]]
+    series = _series_cells(design["battery_chemistry"], design["system_voltage"])
+    string_kwh = series * spec["voltage"] * spec["capacity_mAh"] / 1e6
+    return int(pack_kwh // string_kwh)
+
+def _pack_sizes(design):
+    """
+    (smallest, largest, step, largest energy [kWh], largest mass [kg]) of the
+    pack sizes that fit the vehicle, None if none does.
+    """
+    solid = design["battery_chemistry"] == "Solid-State"
+    if not solid and _series_cells(design["battery_chemistry"], design["system_voltage"]) is None:
+        return None
+    step = SOLID_STATE_RESOLUTION if solid else 1
+
+    def fits(size):
+        # Only the pack's own problems: any inverter of the right voltage will do
+        return not [problem for problem in design_config(_sized(design, size))[1] if "inverter" not in problem]
+
+    if not fits(step):
+        return None
+    # Packs only grow with size: bisect the largest that still fits
+    high = SOLID_STATE_MAX_KWH if solid else MAX_PARALLEL_STRINGS
+    if not fits(high):
+        good, bad = step, high
+        while bad - good > step:
+            middle = round((good + bad) / 2 / step) * step if solid else (good + bad) // 2
+            if middle in (good, bad):
+                break
+            good, bad = (middle, bad) if fits(middle) else (good, middle)
+        high = good
+
+    sized = _sized(design, high)
+    if solid:
+        energy_wh = sized["pack_capacity_kwh"] * 1000
+    else:
+        spec = battery_data[design["battery_chemistry"]]
+        energy_wh = spec["voltage"] * sized["cells_series"] * spec["capacity_mAh"] / 1000 * int(high)
+    return step, high, step, energy_wh / 1000, energy_wh / battery_data[design["battery_chemistry"]]["energy_density"]
+
+def _grid(low, high, step):
+    # Up to SIZE_STEPS sizes from low to high (both included), on the step
+    sizes = np.round(np.linspace(low, high, SIZE_STEPS) / step) * step
+    if step < 1:
+        return sorted({round(float(size), 6) for size in sizes})
+    return sorted({int(size) for size in sizes})
@@ -0,0 +1,204 @@
+# logic/outputs.py
+#
+# Which result columns a run materializes, at what precision, and where they
+# are stored.
+#
+# calculate_parameters derives about twenty columns from a drive cycle. A
+# ResultSpec names the ones the caller wants: every other column is dropped
+# as soon as the last stage that reads it has run, and the kept ones can be
+# stored as float32. The stages themselves always compute and accumulate in
+# float64; a column is only converted once no later stage reads it.
+#
+# The stages write into a ResultColumns store instead of the cycle frame:
+# the cycle columns are read-only views of the caller's data, and the kept
+# outputs are rows of one preallocated block, so a run neither copies its
+# input nor pays for pandas column insertion.
+
+import numpy as np
+import pandas as pd
+
+from logic.kinematics import KINEMATIC_COLUMNS
+from logic.thermal import TEMPERATURE_COLUMNS
+from logic.battery import battery_model
+
+PRECISIONS = {"float64": np.float64, "float32": np.float32}
+
+# Columns added by physics.calculate_parameters (the battery columns only
+# with an equivalent-circuit battery model)
+OUTPUT_COLUMNS = KINEMATIC_COLUMNS + [
+    "force_gradient", "Total Force [N]", "Motor Torque [Nm]", "Motor Speed [rpm]",
+    "Power Drawn [kW]", "Motor Temp Rise [K]", *TEMPERATURE_COLUMNS,
+    "Invertor Current [A]", "Motor Voltage [V]", "Motor Current [A]",
+    "Recovered_kWh", "Energy Used [kWh]", "SOC [%]",
+    "Battery Current [A]", "Battery Voltage [V]",
+]
+
+# Stages of calculate_parameters in order, with the added columns each reads
+STAGE_READS = [
+    ("kinematics", []),
+    ("compute_resistive_forces", ["Speed [m/s]", "Acceleration [m/s²]", "Slope"]),
+    ("compute_required_torque", ["Total Force [N]", "Speed [m/s]"]),
+    ("compute_power_draw", ["Total Force [N]", "Speed [m/s]", "Motor Torque [Nm]", "Motor Speed [rpm]"]),
+    ("motor_temperature", ["Total Force [N]", "Speed [m/s]", "Motor Torque [Nm]", "Motor Speed [rpm]"]),
+    ("compute_voltage_current", ["Motor Torque [Nm]", "Motor Speed [rpm]"]),
+    ("regen_energy_kwh", ["Speed [m/s]"]),
+    ("compute_soc", ["Power Drawn [kW]", "Recovered_kWh", "Invertor Current [A]"]),
+]
+
+_OUTPUTS = frozenset(OUTPUT_COLUMNS)
+_BATTERY_COLUMNS = ["Battery Current [A]", "Battery Voltage [V]"]
+
+# Columns still read after each stage
+_READ_AFTER = {name: frozenset(c for _, reads in STAGE_READS[i + 1:] for c in reads)
+               for i, (name, _) in enumerate(STAGE_READS)}
+
+
+class ResultSpec:
+    """
+    Outputs of a run and their storage precision.
+
+    Parameters:
+        outputs (iterable of str | None): Columns of OUTPUT_COLUMNS to keep
+                                          (None keeps all of them)
+        precision (str): "float64" or "float32" storage of the kept columns
+
+    Columns that are not outputs (the drive cycle itself) are always kept as they are.
+    """
+
+    def __init__(self, outputs=None, precision="float64"):
+        if precision not in PRECISIONS:
+            raise ValueError(f"unknown precision {precision!r}, expected one of {list(PRECISIONS)}")
+        if outputs is not None:
+            outputs = list(dict.fromkeys(outputs))
+            unknown = [column for column in outputs if column not in _OUTPUTS]
+            if unknown:
+                raise ValueError(f"unknown outputs {unknown}, expected columns of OUTPUT_COLUMNS")
+        self.outputs = outputs
+        self.precision = precision
+        self.dtype = PRECISIONS[precision]
+
+    def __repr__(self):
+        return f"ResultSpec(outputs={self.outputs!r}, precision={self.precision!r})"
+
+    def keeps(self, column):
+        return self.outputs is None or column in self.outputs or column not in _OUTPUTS
+
+    def including(self, columns, precision=None):
+        """Spec that also keeps `columns` (optionally at another precision)."""
+        outputs = None if self.outputs is None else self.outputs + list(columns)
+        return ResultSpec(outputs, precision or self.precision)
+
+    def stored(self, series):
+        """The kept arrays of a column -> array dict, converted to the storage precision."""
+        return {name: _convert(values, self.dtype) if name in _OUTPUTS else values
+                for name, values in series.items() if self.keeps(name)}
+
+
+def output_columns(config):
+    """Output columns calculate_parameters produces for a configuration."""
+    if battery_model(config) == "ideal":
+        return [column for column in OUTPUT_COLUMNS if column not in _BATTERY_COLUMNS]
+    return list(OUTPUT_COLUMNS)
+
+
+class ResultColumns:
+    """
+    Column store the calculate_parameters stages read from and write to.
+
+    Reading a column gives a pd.Series view (drive-cycle columns are
+    read-only views of the input); assigning one copies the values into the
+    column's output array. Kept outputs live in one preallocated block of the
+    spec's precision, intermediates (and, for float32, kept columns that a
+    later stage still reads) in float64 scratch arrays until release().
+
+    Parameters:
+        cycle (pd.DataFrame | dict): Drive cycle, never modified
+        spec (ResultSpec): Outputs to keep (default: all, float64)
+        columns (list[str]): Outputs the run will produce (see output_columns)
+    """
+
+    def __init__(self, cycle, spec=None, columns=OUTPUT_COLUMNS):
+        self.spec = spec or ResultSpec()
+        self._inputs = {name: _read_only(cycle[name]) for name in cycle}
+        if isinstance(cycle, pd.DataFrame):
+            self.index = cycle.index
+        else:
+            self.index = pd.RangeIndex(len(next(iter(self._inputs.values()), ())))
+
+        kept = [name for name in columns if self.spec.keeps(name) and name not in self._inputs]
+        self._block = np.empty((len(kept), len(self.index)), dtype=self.spec.dtype)
+        self._rows = dict(zip(kept, self._block))
+        self._scratch = {}
+        self._written = {}      # written output -> None, in order
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, name):
+        return name in self._inputs or name in self._written
+
+    @property
+    def columns(self):
+        return list(self._inputs) + list(self._written)
+
+    def __getitem__(self, name):
+        return pd.Series(self._array(name), index=self.index, name=name, copy=False)
+
+    def __setitem__(self, name, values):
+        if name in self._inputs:
+            raise ValueError(f"{name!r} is a drive-cycle column and read-only")
+        values = np.asarray(values, dtype=float)
+        row = self._rows.get(name)
+        if row is not None and row.dtype == np.float64:
+            np.copyto(row, values)
+        else:
+            out = self._scratch.get(name)
+            if out is None:
+                out = self._scratch[name] = np.empty(len(self.index))
+            np.copyto(out, values)
+        self._written[name] = None
+
+    def __delitem__(self, name):
+        del self._written[name]
+        self._scratch.pop(name, None)
+
+    def release(self, stage):
+        """
+        After `stage`: drop the unwanted outputs no later stage reads and
+        move the wanted ones into their storage rows.
+        """
+        later = _READ_AFTER[stage]
+        for name in [name for name in self._written if name not in later]:
+            if not self.spec.keeps(name):
+                del self[name]
+            elif name in self._scratch and name in self._rows:
+                np.copyto(self._rows[name], self._scratch.pop(name))
+
+    def arrays(self):
+        """Column name -> np.ndarray of every input and written output."""
+        return {name: self._array(name) for name in self.columns}
+
+    def to_frame(self):
+        """DataFrame view of the inputs and outputs (no copy)."""
+        return pd.DataFrame(self.arrays(), index=self.index, copy=False)
+
+    def _array(self, name):
+        if name in self._inputs:
+            return self._inputs[name]
+        if name not in self._written:
+            raise KeyError(name)
+        out = self._scratch.get(name)
+        return out if out is not None else self._rows[name]
+
+
+# ---------- helpers ----------
+def _read_only(values):
+    view = np.asarray(values).view()
+    view.setflags(write=False)
+    return view
+
+def _convert(values, dtype):
+    values = np.asarray(values)
+    if values.dtype.kind == "f" and values.dtype != dtype:
+        return values.astype(dtype)
+    return values
@@ -0,0 +1,168 @@
+# logic/packs.py
+#
+# Feasible cell-pack layouts, enumerated once per chemistry and system voltage.
+#
+# A layout is (total_cells, cells_series, layer_count) as picked in
+# ui.layout.render_configuration_panel. Only layouts that pass the checks not
+# depending on the vehicle are kept: the cells split evenly into series
+# strings and the pack voltage lies in the system's window. The figures of
+# every layout come from logic.design.cell_pack, so they match
+# derive_configs exactly.
+#
+# Layouts are sorted by energy. Within a chemistry the pack mass and battery
+# cost are proportional to the energy, so the same order serves all three and
+# a mass or cost limit is just an upper energy bound: a query is a binary
+# search for the energy range followed by the wheelbase / width check on that
+# slice only.
+#
+#     packs = find_packs("Li-ion (NMC)", "400V", 40, 60, wheelbase=2.6, vehicle_width=1.8)
+#     designs = sweep_designs({"pack": packs.layouts(), "motor_type": CATALOG_AXES["motor_type"]})
+#
+# Solid-State packs are sized by energy and voltage directly and have no
+# layouts to enumerate.
+
+import numpy as np
+
+from config.parameters import battery_data
+from logic.design import SOLID_STATE, SYSTEM_VOLTAGES, cell_pack
+
+# Widget limits of the configuration panel
+MAX_CELLS = 5000
+MAX_LAYERS = 4
+
+# Columns of a pack table
+PACK_FIELDS = ["total_cells", "cells_series", "cells_parallel", "layer_count", "pack_voltage", "energy_kwh",
+               "pack_mass_kg", "battery_cost", "max_current_a", "pack_length_m", "pack_width_m"]
+
+_indexes = {}
+
+
+class PackTable:
+    """
+    Pack layouts of one chemistry and system voltage as columns, by energy.
+
+    Attributes:
+        chemistry (str): Cell chemistry (key of battery_data)
+        system_voltage (str): "400V" or "800V"
+        columns (dict): PACK_FIELDS name -> (N,) array
+    """
+
+    def __init__(self, chemistry, system_voltage, columns):
+        self.chemistry = chemistry
+        self.system_voltage = system_voltage
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns["energy_kwh"])
+
+    def find(self, min_kwh=0.0, max_kwh=np.inf, wheelbase=None, vehicle_width=None, max_mass_kg=None,
+             max_cost=None):
+        """
+        Layouts between two pack energies that fit a vehicle envelope.
+
+        Parameters:
+            min_kwh, max_kwh (float): Pack energy range [kWh], inclusive
+            wheelbase (float): Pack length at most 70% of it [m]
+            vehicle_width (float): Pack width at most 80% of it [m]
+            max_mass_kg (float): Pack mass limit [kg]
+            max_cost (float): Battery cost limit [INR]
+
+        Returns:
+            PackTable: The matching layouts, still sorted by energy
+        """
+        spec = battery_data[self.chemistry]
+        if max_mass_kg is not None:
+            max_kwh = min(max_kwh, max_mass_kg * spec["energy_density"] / 1000)
+        if max_cost is not None:
+            max_kwh = min(max_kwh, max_cost / spec["cost_kW"])
+
+        energy = self.columns["energy_kwh"]
+        start = np.searchsorted(energy, min_kwh, side="left")
+        stop = np.searchsorted(energy, max_kwh, side="right")
+        columns = {name: values[start:stop] for name, values in self.columns.items()}
+
+        fits = None
+        if wheelbase is not None:
+            fits = columns["pack_length_m"] <= 0.7 * wheelbase
+        if vehicle_width is not None:
+            width_fits = columns["pack_width_m"] <= 0.8 * vehicle_width
+            fits = width_fits if fits is None else fits & width_fits
+        if fits is not None:
+            # One index array shared by every column (faster than a mask per column)
+            rows = np.flatnonzero(fits)
+            columns = {name: values.take(rows) for name, values in columns.items()}
+        return PackTable(self.chemistry, self.system_voltage, columns)
+
+    def layouts(self):
+        """Design inputs of every layout (a joint axis for logic.sweep.sweep_designs)."""
+        return [{"battery_chemistry": self.chemistry, "system_voltage": self.system_voltage,
+                 "total_cells": int(total), "cells_series": int(series), "layer_count": int(layers)}
+                for total, series, layers in zip(self.columns["total_cells"], self.columns["cells_series"],
+                                                 self.columns["layer_count"])]
+
+    def row(self, i):
+        """Figures of layout i, with plain Python values."""
+        return {name: values[i].item() for name, values in self.columns.items()}
+
+
+def pack_index(chemistry, system_voltage):
+    """
+    Every feasible layout of a cell chemistry on a system voltage (built on
+    first use, then kept).
+
+    Returns:
+        PackTable
+    """
+    if chemistry == SOLID_STATE or chemistry not in battery_data:
+        cells = [name for name in battery_data if name != SOLID_STATE]
+        raise ValueError(f"unknown cell chemistry [{chemistry}], expected one of {cells}")
+    if system_voltage not in SYSTEM_VOLTAGES:
+        raise ValueError(f"unknown system voltage [{system_voltage}], expected one of {list(SYSTEM_VOLTAGES)}")
+
+    key = (chemistry, system_voltage)
+    index = _indexes.get(key)
+    if index is None:
+        index = _indexes[key] = PackTable(chemistry, system_voltage, _enumerate(chemistry, system_voltage))
+    return index
+
+
+def find_packs(chemistry, system_voltage, min_kwh=0.0, max_kwh=np.inf, **envelope):
+    """pack_index(chemistry, system_voltage).find(min_kwh, max_kwh, **envelope), see PackTable.find."""
+    return pack_index(chemistry, system_voltage).find(min_kwh, max_kwh, **envelope)
+
+
+# ---------- helpers ----------
+def _enumerate(chemistry, system_voltage):
+    # Series counts inside the voltage window (same product as derive_configs)
+    window = SYSTEM_VOLTAGES[system_voltage]
+    cell_voltage = battery_data[chemistry]["voltage"]
+    series = np.arange(1, int(window["window_high"] / cell_voltage) + 2)
+    series = series[(window["window_low"] <= cell_voltage * series) & (cell_voltage * series <= window["window_high"])]
+
+    # Every parallel count up to the cell limit, for every layer count
+    counts = MAX_CELLS // series
+    cells_series = np.repeat(series, counts)
+    cells_parallel = np.arange(len(cells_series)) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+    layer_count = np.repeat(np.arange(1, MAX_LAYERS + 1), len(cells_series))
+    cells_series = np.tile(cells_series, MAX_LAYERS)
+    cells_parallel = np.tile(cells_parallel, MAX_LAYERS)
+
+    pack = cell_pack(np.full(len(cells_series), chemistry, dtype=object), cells_series.astype(float),
+                     cells_parallel.astype(float), layer_count.astype(float))
+    spec = battery_data[chemistry]
+    energy_wh = pack["pack_energy_wh"]
+    columns = {
+        "total_cells": cells_series * cells_parallel,
+        "cells_series": cells_series,
+        "cells_parallel": cells_parallel,
+        "layer_count": layer_count,
+        "pack_voltage": pack["pack_voltage"],
+        "energy_kwh": energy_wh / 1000,
+        "pack_mass_kg": energy_wh / spec["energy_density"],
+        "battery_cost": energy_wh * spec["cost_kW"] / 1000,
+        "max_current_a": pack["max_current_a"],
+        "pack_length_m": pack["pack_length_m"],
+        "pack_width_m": pack["pack_width_m"],
+    }
+    order = np.lexsort((layer_count, cells_series, energy_wh))
+    return {name: columns[name][order] for name in PACK_FIELDS}
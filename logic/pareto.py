@@ -0,0 +1,316 @@
+# logic/pareto.py
+#
+# Cost-versus-range trade-off of a set of designs: the designs no other
+# design beats on every objective (cost, range and optionally peak motor
+# temperature or pack mass).
+#
+# The frontier is kept sorted by cost. A design is dominated when some
+# frontier point is at least as good in every objective; with two
+# objectives the ranges of the frontier rise with cost, so the check is a
+# bisection on cost and one comparison. New points evict the points they
+# dominate.
+#
+# Designs are evaluated in batches, cheapest first, in two steps:
+#
+# 1. Partial: cost and pack mass come from derive_configs exactly, and the
+#    range is bounded from above without simulating. The energy a design
+#    draws over the cycle is linear in its mass, drag area and rolling
+#    resistance, so it is bounded below from a handful of cycle integrals
+#    (the highest drivetrain efficiency for traction, the lowest for
+#    braking, regen without its power cap). The peak motor temperature is
+#    at least the ambient temperature.
+# 2. Full: designs whose bound is not dominated by the frontier found so
+#    far are simulated (logic.sweep.evaluate_designs, so results are
+#    cached) and added to the frontier.
+#
+# Designs stopped by a torque, current or transmission limit event are not
+# candidates. The range bound holds for the ideal battery; designs with an
+# equivalent-circuit battery model are always simulated.
+
+import bisect
+import time
+
+import numpy as np
+
+from config.parameters import motor_specs
+from logic.battery import battery_model
+from logic.engine import USABLE_SOC_WINDOW
+from logic.events import BATTERY_DEPLETED
+from logic.kernel import AIR_DENSITY, config_arrays, simulate_batch
+from logic.kinematics import G, cycle_kinematics
+from logic.motor_calculations import efficiency_table
+from logic.outputs import ResultSpec
+from logic.result_cache import cached_rows
+from logic.design import derive_configs
+from logic.sweep import design_columns, evaluate_designs
+from logic.thermal import AMBIENT_TEMP
+
+# Objective -> (sense, axis label)
+OBJECTIVES = {
+    "vehicle_cost": ("min", "Vehicle Cost [INR]"),
+    "range_km": ("max", "Estimated Range [km]"),
+    "peak_motor_temp_k": ("min", "Peak Winding Temp [K]"),
+    "pack_mass_kg": ("min", "Pack Mass [kg]"),
+}
+
+DEFAULT_OBJECTIVES = ("vehicle_cost", "range_km")
+
+# Designs simulated per kernel batch
+BATCH_SIZE = 64
+
+
+class FrontierPoint:
+    """
+    A non-dominated design.
+
+    Attributes:
+        values (dict): Objective -> value
+        design (dict): Design inputs (see logic.design.derive_configs)
+        config (dict): Its simulation config
+        row (dict): Its result row (see logic.sweep.evaluate_designs)
+    """
+
+    def __init__(self, values, design, config, row):
+        self.values = values
+        self.design = design
+        self.config = config
+        self.row = row
+
+
+class ParetoFrontier:
+    """
+    Non-dominated set over `objectives`, kept sorted by the first one.
+
+    Attributes:
+        objectives (tuple[str]): Names of OBJECTIVES
+        points (list[FrontierPoint]): The frontier, in order of the first objective
+        evaluated (list[dict]): Objective values of every simulated candidate
+        stats (dict): Evaluation statistics (see iter_frontier)
+    """
+
+    def __init__(self, objectives=DEFAULT_OBJECTIVES):
+        objectives = tuple(dict.fromkeys(objectives))
+        unknown = [name for name in objectives if name not in OBJECTIVES]
+        if unknown:
+            raise ValueError(f"unknown objectives {unknown}, expected names of OBJECTIVES")
+        if len(objectives) < 2:
+            raise ValueError("a frontier needs at least two objectives")
+        self.objectives = objectives
+        self.points = []
+        self.evaluated = []
+        self.stats = {}
+        self._signs = [1.0 if OBJECTIVES[name][0] == "min" else -1.0 for name in objectives]
+        self._keys = []     # Objective values as minimised, same order as points
+
+    def __len__(self):
+        return len(self.points)
+
+    def __iter__(self):
+        return iter(self.points)
+
+    def dominates(self, values):
+        """True when a frontier point is at least as good as `values` in every objective."""
+        return self._dominated(self._key(values))
+
+    def add(self, values, design=None, config=None, row=None):
+        """
+        Add a point unless it is dominated, evicting the points it dominates.
+        Returns True when it joined the frontier.
+        """
+        key = self._key(values)
+        if self._dominated(key):
+            return False
+        start = bisect.bisect_left(self._keys, key)
+        # Only points at or after `key` in the first objective can be dominated by it
+        keep = [i for i in range(start, len(self._keys)) if not _weakly_better(key, self._keys[i])]
+        self._keys[start:] = [key] + [self._keys[i] for i in keep]
+        self.points[start:] = [FrontierPoint(dict(values), design, config, row)] + [self.points[i] for i in keep]
+        return True
+
+    def table(self):
+        """Frontier as a list of rows: objective values followed by the design inputs."""
+        return [{**point.values, **point.design} for point in self.points]
+
+    def _key(self, values):
+        return tuple(sign * values[name] for sign, name in zip(self._signs, self.objectives))
+
+    def _dominated(self, key):
+        end = bisect.bisect_right(self._keys, (key[0],) + (np.inf,) * (len(key) - 1))
+        if end == 0:
+            return False
+        if len(key) == 2:
+            # The second objective falls along the frontier: the last point is the best one
+            return self._keys[end - 1][1] <= key[1]
+        return any(_weakly_better(other, key) for other in self._keys[:end])
+
+
+def pareto_frontier(cycle, designs, objectives=DEFAULT_OBJECTIVES, batch_size=BATCH_SIZE):
+    """
+    Non-dominated designs of `designs` on `cycle`.
+
+    Parameters:
+        cycle (pd.DataFrame | dict): Drive cycle
+        designs (iterable of dict): Design inputs (e.g. logic.sweep.sweep_designs)
+        objectives (tuple[str]): Names of OBJECTIVES
+        batch_size (int): Designs simulated per kernel batch
+
+    Returns:
+        ParetoFrontier
+    """
+    frontier = None
+    for frontier in iter_frontier(cycle, designs, objectives, batch_size):
+        pass
+    return frontier
+
+
+def iter_frontier(cycle, designs, objectives=DEFAULT_OBJECTIVES, batch_size=BATCH_SIZE):
+    """
+    Build the frontier batch by batch, cheapest designs first.
+
+    Yields the same ParetoFrontier after every batch. Its `stats` count the
+    designs, the invalid ones, those pruned by their bounds, those simulated,
+    those stopped by a limit event, and the batches done out of the total.
+    """
+    started = time.perf_counter()
+    frontier = ParetoFrontier(objectives)
+    designs = list(designs)
+    stats = frontier.stats
+    stats.update(designs=len(designs), invalid=0, pruned=0, simulated=0, infeasible=0,
+                 batches=0, total_batches=0, seconds=0.0)
+
+    valid, pack_mass, configs = [], [], []
+    if designs:
+        derived = derive_configs(design_columns(designs))
+        valid = np.flatnonzero(derived.valid)
+        pack_mass = derived.details["pack_mass_kg"][valid]
+        configs = [derived.config_at(i) for i in valid]
+    stats["invalid"] = len(designs) - len(valid)
+    candidates = [designs[i] for i in valid]
+
+    bounds = _bounds(cycle, configs, pack_mass, frontier.objectives)
+    order = sorted(range(len(candidates)), key=lambda i: frontier._key(bounds[i]))
+    batches = [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+    stats["total_batches"] = len(batches)
+
+    for batch in batches:
+        todo = [i for i in batch if not frontier.dominates(bounds[i])]
+        stats["pruned"] += len(batch) - len(todo)
+        stats["simulated"] += len(todo)
+
+        rows = evaluate_designs(cycle, [candidates[i] for i in todo])
+        feasible = [(i, row) for i, row in zip(todo, rows)
+                    if row["stop_reason"] in ("", BATTERY_DEPLETED) and np.isfinite(row["range_km"])]
+        stats["infeasible"] += len(todo) - len(feasible)
+
+        temperatures = None
+        if "peak_motor_temp_k" in frontier.objectives:
+            temperatures = _peak_temperatures(cycle, [configs[i] for i, _ in feasible])
+
+        for n, (i, row) in enumerate(feasible):
+            values = {name: bounds[i][name] for name in frontier.objectives}
+            values["range_km"] = row["range_km"]
+            if temperatures is not None:
+                values["peak_motor_temp_k"] = temperatures[n]["peak_motor_temp_k"]
+            frontier.evaluated.append(values)
+            frontier.add(values, candidates[i], configs[i], row)
+
+        stats["batches"] += 1
+        stats["seconds"] = time.perf_counter() - started
+        yield frontier
+
+    if not batches:
+        yield frontier
+
+
+# ---------- bounds ----------
+def _bounds(cycle, configs, pack_mass, objectives):
+    """Per design, the objective values (cost, pack mass) or their most favourable bounds."""
+    if not configs:
+        return []
+    range_bound = _range_bound(cycle, configs)
+    bounds = []
+    for config, mass, range_km in zip(configs, pack_mass, range_bound):
+        values = {"vehicle_cost": config["vehicle_cost"], "range_km": float(range_km)}
+        if "pack_mass_kg" in objectives:
+            values["pack_mass_kg"] = float(mass)
+        if "peak_motor_temp_k" in objectives:
+            values["peak_motor_temp_k"] = AMBIENT_TEMP
+        bounds.append(values)
+    return bounds
+
+def _range_bound(cycle, configs):
+    """
+    (K,) upper bounds on the range of every config that is not stopped by
+    a limit event (inf where there is none).
+
+    Per sample the kernel draws F v / (1000 eta) + auxiliary power, less the
+    recovered energy, with F = m (a + g sin) + k v^2 + c_rr m g. Summed over
+    the cycle that is linear in m, k and c_rr m, so the cycle integrals are
+    taken once and every config costs a few multiplications.
+    """
+    terms = cycle_kinematics(cycle)
+    speed = terms["Speed [m/s]"]
+    dt_hours = terms["dt_hours"]
+    # Samples whose energy the kernel counts (it skips NaN samples)
+    counted = np.isfinite(terms["inertial_grade"]) & np.isfinite(terms["energy_change"])
+
+    def integral(values):
+        return np.sum(np.where(counted, values * dt_hours, 0.0))
+
+    inertial_power = terms["inertial_grade"] * speed
+    inertial = integral(inertial_power)                     # per kg
+    braking = integral(np.minimum(inertial_power, 0.0))     # per kg, <= 0
+    drag = integral(speed**3)
+    rolling = integral(speed) * G
+    moving = integral(terms["moving"])
+    recoverable = np.sum(np.where(counted, np.maximum(-terms["energy_change"], 0.0), 0.0))     # J per kg
+
+    p = config_arrays(configs)
+    mass = p["vehicle_mass"]
+    low, high = _efficiency_range(configs, p)
+
+    # Traction power divided by the highest efficiency; the braking power
+    # (at least m * braking) by the lowest
+    wheel = mass * inertial + 0.5 * AIR_DENSITY * p["frontal_area"] * p["drag_coefficient"] * drag + p["c_rr"] * mass * rolling
+    with np.errstate(divide="ignore", invalid="ignore"):
+        energy = (wheel / high + mass * braking * (1 / low - 1 / high)) / 1000
+        energy += (p["auxiliary_load"] / p["hvac_efficiency"] + p["coolant_power"]) * moving
+        energy -= np.where(p["regen"], mass * recoverable * p["regen_efficiency"] / 3_600_000.0, 0.0)
+
+        # Completing the cycle: range = distance * usable window / SOC used;
+        # running flat before the end: at most distance * usable window / initial SOC
+        soc_used = np.minimum(energy * 100 / p["battery_capacity"], p["initial_soc"])
+        distance = terms["Distance Travelled [km]"][-1]
+        bound = np.where(soc_used > 0, distance * USABLE_SOC_WINDOW / soc_used, np.inf)
+
+    ideal = np.array([battery_model(config) == "ideal" for config in configs])
+    return np.where(ideal, bound, np.inf)
+
+def _efficiency_range(configs, params):
+    # (K,) lowest and highest motor * inverter * system efficiency
+    low = params["motor_efficiency"].copy()
+    high = params["motor_efficiency"].copy()
+    for k, config in enumerate(configs):
+        if config.get("efficiency_model", "scalar") == "map":
+            grid = efficiency_table(motor_specs[config["motor_type"]]["code"]).grid
+            low[k], high[k] = grid.min(), grid.max()
+    electrical = params["inverter_efficiency"] * params["system_efficiency"]
+    return low * electrical, high * electrical
+
+def _peak_temperatures(cycle, configs):
+    # Peak winding temperature up to the stop point, cached per config
+    def compute(missing):
+        summary, series = simulate_batch(cycle, missing, keep_series=True,
+                                         spec=ResultSpec(["Winding Temp [K]"], "float32"))
+        rows = []
+        for k, stop in enumerate(summary["stop_index"]):
+            rows.append({"peak_motor_temp_k": float(np.nanmax(series["Winding Temp [K]"][k, :stop + 1]))})
+        return rows
+
+    return cached_rows("peak-motor-temp", cycle, configs, compute)
+
+
+# ---------- helpers ----------
+def _weakly_better(a, b):
+    # a is at least as good as b in every (minimised) objective
+    return all(x <= y for x, y in zip(a, b))
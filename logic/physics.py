@@ -3,34 +3,85 @@ from config.parameters import motor_specs, transmission_models, regen_specs,cool
 import math
 import pandas as pd
 import numpy as np
-from logic.motor_calculations import calculate_pmsm_electrical, calculate_srm_electrical
+from logic.motor_calculations import calculate_pmsm_electrical, calculate_srm_electrical, efficiency_table
+from logic.kinematics import cycle_kinematics, continue_kinematics, KINEMATIC_COLUMNS
+from logic.thermal import thermal_network, simulate_temperatures, AMBIENT_TEMP, TEMPERATURE_COLUMNS
+from logic.battery import battery_model, pack_arrays, solve_pack
+from logic.instrument import stage
+from logic.outputs import ResultColumns, output_columns
 
+# Bump whenever a change alters simulation results: cached results of other
+# versions are discarded (see logic.result_cache)
+PHYSICS_VERSION = 3
 
-def calculate_parameters(df, config):
-    
-    df["Speed [m/s]"] = df["Velocity [km/h]"] / 3.6   # Convert speed to m/s
-
-    df["Acceleration [m/s²]"] = df["Speed [m/s]"].diff() / df["Time [s]"].diff()
-
-    df["Distance Travelled [km]"] = calculate_distance(df)
-
-    df["Slope"] = compute_slope(df["Elevation [m]"], df["Speed [m/s]"], df["Time [s]"])
+# SOC [%] the pack starts from unless the config sets "initial_soc"
+INITIAL_SOC = 90
 
-    compute_resistive_forces(df, config)
 
-    compute_power_draw(df, config)
-
-    compute_required_torque(df, config)
-
-    motor_temperature(df, config)
-
-    compute_voltage_current(df, config)
+def calculate_parameters(cycle, config, state=None, spec=None):
+    """
+    Vehicle dynamics over a drive cycle.
 
-    regen_energy_kwh(df, config)
+    Parameters:
+        cycle (pd.DataFrame | dict): Drive cycle (Time [s], Velocity [km/h],
+                                     Elevation [m]); read, never modified
+        config (dict): EV configuration
+        state (dict): Carried state when the cycle continues an earlier segment of a
+                      cycle (see logic.streaming). The first row of the cycle
+                      is then the last row of the previous segment; the state
+                      is updated to describe its last row.
+        spec (logic.outputs.ResultSpec): Outputs to keep and their precision
+                                         (default: every column in float64)
 
-    compute_soc(df, config)
+    Returns:
+        pd.DataFrame: The cycle columns and the outputs, a view of the arrays
+                      the stages wrote (see logic.outputs.ResultColumns)
 
-    return df
+    Every stage is timed when run inside logic.instrument.profiling().
+    """
+    df = ResultColumns(cycle, spec, output_columns(config))
+
+    # Speed [m/s], Acceleration [m/s²], Distance Travelled [km] and Slope only
+    # depend on the drive cycle, they are computed once per cycle and reused
+    with stage("kinematics", df):
+        if state is None:
+            kinematics = cycle_kinematics(df)
+        else:
+            kinematics = continue_kinematics(df, state)
+        for column in KINEMATIC_COLUMNS:
+            df[column] = kinematics[column]
+        df.release("kinematics")
+
+    with stage("compute_resistive_forces", df):
+        compute_resistive_forces(df, config)
+        df.release("compute_resistive_forces")
+
+    # Torque and speed first: the power draw may use the motor's operating point
+    with stage("compute_required_torque", df):
+        compute_required_torque(df, config)
+        df.release("compute_required_torque")
+
+    with stage("compute_power_draw", df):
+        compute_power_draw(df, config)
+        df.release("compute_power_draw")
+
+    with stage("motor_temperature", df):
+        motor_temperature(df, config, state)
+        df.release("motor_temperature")
+
+    with stage("compute_voltage_current", df):
+        compute_voltage_current(df, config)
+        df.release("compute_voltage_current")
+
+    with stage("regen_energy_kwh", df):
+        regen_energy_kwh(df, config)
+        df.release("regen_energy_kwh")
+
+    with stage("compute_soc", df):
+        compute_soc(df, config, state)
+        df.release("compute_soc")
+
+    return df.to_frame()
 
 def calculate_distance(df):
 
@@ -96,11 +147,22 @@ def compute_resistive_forces(df, config):
 
     return
 
+def motor_efficiency_for(df, config):
+    """
+    Motor efficiency used for the power draw and thermal losses: the scalar
+    rating from motor_specs, or with config["efficiency_model"] == "map" the
+    operating-point efficiency from the motor's precomputed efficiency table.
+    """
+    motor_data = motor_specs[config["motor_type"]]
+    if config.get("efficiency_model", "scalar") == "map":
+        table = efficiency_table(motor_data["code"])
+        return table(df["Motor Torque [Nm]"].to_numpy(), df["Motor Speed [rpm]"].to_numpy())
+    return motor_data["efficiency"]
+
 def compute_power_draw(df, config):
 
     # Motor efficiency lookup
-    motor_data = motor_specs[config["motor_type"]]
-    motor_efficiency = motor_data["efficiency"]
+    motor_efficiency = motor_efficiency_for(df, config)
     inverter_eff = config["inverter_efficiency"] 
     hvac_eff = config["hvac_efficiency"] 
     sys_efficiency = config["system_efficiency"]
@@ -123,33 +185,34 @@ def compute_power_draw(df, config):
     df["Power Drawn [kW]"] = Power_Draw + auxiliary_load + coolant_load
 
     return
-def motor_temperature(df, config):
+def motor_temperature(df, config, state=None):
+    """
+    Winding, stator and coolant temperatures from the lumped thermal network
+    in logic.thermal, starting at ambient. When continuing an earlier segment
+    state["thermal"] carries the network's filter state from it; it is
+    updated to the last row.
+    """
 
     # Motor efficiency lookup
     motor_data = motor_specs[config["motor_type"]]
-    motor_efficiency = motor_data["efficiency"]
+    motor_efficiency = motor_efficiency_for(df, config)
 
         # --- Thermal modeling ---
-    P_in = df["Power Drawn [kW]"] * 1000  # convert to W
-    P_loss = P_in * (1 - motor_efficiency)
-
-    # Motor parameters
-    motor_mass = motor_data["mass"]           # kg
-    motor_cp = motor_data["specific_heat"]    # J/(kg*K)
-
-    timestep = df["Time [s]"].diff()
-    # Temperature rise without cooling
-    df["Motor Temp Rise [K]"] = (P_loss * timestep) / (motor_mass * motor_cp) 
-
-    # Cooling effect
+    # Motor losses from the shaft power, motoring or regenerating
+    shaft_power = (df["Total Force [N]"] * df["Speed [m/s]"]).abs()
+    P_loss = shaft_power * (1 - motor_efficiency) / motor_efficiency
 
     coolant_spec = cooling_params[config["coolant_flow"]]
-    coolant_flow = coolant_spec['approx_L_per_min']   # kg/s
-    coolant_cp = coolant_spec['coolant_cp']          # J/(kg*K) water
+    network = thermal_network(motor_data["mass"], motor_data["specific_heat"],
+                              coolant_spec["approx_L_per_min"], coolant_spec["coolant_cp"])
 
-    Q_cool = coolant_flow * coolant_cp * (df["Motor Temp Rise [K]"]) 
+    carry = state.setdefault("thermal", {}) if state is not None else None
+    timestep = df["Time [s]"].diff()
+    temperatures = simulate_temperatures(P_loss.to_numpy(), timestep.to_numpy(), network, carry=carry)[0]
 
-    df["Motor Net Temp Rise [K]"] = 300 + ((P_loss - Q_cool) * timestep / (motor_mass * motor_cp))*100
+    df["Motor Temp Rise [K]"] = temperatures[0] - AMBIENT_TEMP
+    for column, values in zip(TEMPERATURE_COLUMNS, temperatures):
+        df[column] = values
 
 
 def compute_required_torque(df, config, drivetrain_eff = 0.9):
@@ -179,14 +242,24 @@ def compute_voltage_current(df, config):
     else:
          calculate_pmsm_electrical (df, Vdc)
 
-def compute_soc(df, config):
+def compute_soc(df, config, state=None):
     """
     Computes SOC [%] over time based on power draw and battery capacity.
     Assumes:
     - df["Power Drawn [kW]"] exists
     - df["Time [s]"] is cumulative time
     - config["battery_capacity"] is in kWh
+    - config["initial_soc"], if present, is the SOC [%] at the first row (default INITIAL_SOC)
+    - state["soc_drop"], if present, is the cumulative SOC drop at the first row
+      (continuing an earlier segment); it is updated to the drop at the last row
+
+    With config["battery_model"] "r0" or "rc" the pack is simulated as an
+    equivalent circuit instead (see compute_battery_circuit).
     """
+    if battery_model(config) != "ideal":
+        compute_battery_circuit(df, config, state)
+        return
+
     battery_capacity_kwh = config["battery_capacity"]
 
     # Time step (dt) in seconds
@@ -201,12 +274,47 @@ def compute_soc(df, config):
     # SOC drop per step
     delta_soc = (df["Energy Used [kWh]"] / battery_capacity_kwh) * 100
 
+    # Continue from the drop carried over from the previous segment
+    if state is not None and "soc_drop" in state:
+        delta_soc.iloc[0] = state["soc_drop"]
+
     # Cumulative SOC drop
-    df["SOC [%]"] = 90 - delta_soc.cumsum()
+    soc_drop = delta_soc.cumsum()
+    df["SOC [%]"] = config.get("initial_soc", INITIAL_SOC) - soc_drop
     df["SOC [%]"] = df["SOC [%]"].clip(lower=0)
 
+    if state is not None:
+        state["soc_drop"] = soc_drop.ffill().iloc[-1]
+
     return
 
+def compute_battery_circuit(df, config, state=None):
+    """
+    Pack current, terminal voltage and SOC from the equivalent-circuit model
+    in logic.battery. The battery supplies Power Drawn [kW] less what the
+    regenerative braking returns; the inverter current is drawn at the
+    sagging terminal voltage instead of the nominal system voltage.
+    state["battery"], if present, is the solver state (cumulative SOC drop,
+    RC filter block) at the first row and is updated to the last row.
+    """
+    time_diff = df["Time [s]"].diff()
+
+    # Battery power demand [W]
+    step = time_diff.to_numpy()
+    recovered_w = np.divide(df["Recovered_kWh"].to_numpy() * 3_600_000.0, step,
+                            out=np.zeros(len(df)), where=step > 0)
+    power = df["Power Drawn [kW]"].to_numpy() * 1000 - recovered_w
+
+    carry = state.setdefault("battery", {}) if state is not None else None
+    pack = solve_pack(power[None, :], step, pack_arrays([config]), config.get("initial_soc", INITIAL_SOC), carry)
+    current, voltage, soc = pack["current"][0], pack["voltage"][0], pack["soc"][0]
+
+    df["Battery Current [A]"] = current
+    df["Battery Voltage [V]"] = voltage
+    df["Energy Used [kWh]"] = voltage * current * time_diff / 3_600_000.0
+    df["SOC [%]"] = np.maximum(soc, 0)
+    df["Invertor Current [A]"] *= config["system_voltage"] / voltage
+
 def regen_energy_kwh(df, config):
     """
     df must have columns: 'Speed [m/s]', 'Elevation [m]'
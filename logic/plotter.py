@@ -1,23 +1,36 @@
 # logic/plotter.py
 
+import numpy as np
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 
-def plot_speed_and_elevation(df):
+from logic.downsample import cached_indices, DEFAULT_BUDGET
+from logic.kinematics import cycle_fingerprint
+from logic.pareto import OBJECTIVES
+
+def plot_speed_and_elevation(df, max_points=DEFAULT_BUDGET):
     
     if df.empty:
         return None
     
+    # Each trace is downsampled to the point budget (cached per cycle)
+    fingerprint = cycle_fingerprint(df)
+    time = df["Time [s]"].to_numpy()
+    speed = df["Velocity [km/h]"].to_numpy()
+    elevation = df["Elevation [m]"].to_numpy()
+    speed_index = cached_indices((fingerprint, "Velocity [km/h]"), time, speed, max_points)
+    elevation_index = cached_indices((fingerprint, "Elevation [m]"), time, elevation, max_points)
 
     fig = go.Figure()
     fig.add_trace(go.Scatter(
-        x=df["Time [s]"],
-        y=df["Velocity [km/h]"],
+        x=time[speed_index],
+        y=speed[speed_index],
         name="Speed (km/h)", 
         line=dict(color="blue")
     ))
     fig.add_trace(go.Scatter(
-        x=df["Time [s]"],
-        y=df["Elevation [m]"],
+        x=time[elevation_index],
+        y=elevation[elevation_index],
         name="Elevation (m)",
         line=dict(color="green", dash="dot"),
         yaxis="y2"
@@ -39,3 +52,136 @@ def plot_speed_and_elevation(df):
         legend=dict(x=0.01, y=0.99)
     )
     return fig
+
+
+# Panels of the simulation playback figure, in grid order:
+# (column, title, axis label, colour, downsampling method). Spiky traces keep
+# their min/max envelope, smooth ones use LTTB.
+PLAYBACK_PANELS = [
+    ("Velocity [km/h]", "Vehicle Speed", "Speed (km/h)", "blue", "lttb"),
+    ("Distance Travelled [km]", "Distance Travelled", "Distance (km)", "green", "lttb"),
+    ("Elevation [m]", "Altitude (m)", "Altitude (m)", "purple", "lttb"),
+    ("Motor Torque [Nm]", "Motor Torque [Nm]", "Motor Torque [Nm]", "orange", "minmax"),
+    ("Motor Current [A]", "Motor Current [A]", "Motor Current [A]", "green", "minmax"),
+    ("Motor Voltage [V]", "Motor Voltage [V]", "Motor Voltage [V]", "red", "lttb"),
+    ("SOC [%]", "State of Charge [%]", "State of Charge [%]", "red", "lttb"),
+    ("Invertor Current [A]", "Battery Current [A]", "Battery Current [A]", "green", "minmax"),
+    ("Winding Temp [K]", "Motor Winding Temp [K]", "Winding Temp [K]", "red", "lttb"),
+]
+
+def plot_simulation_playback(result, max_points=DEFAULT_BUDGET, frame_count=100, frame_duration=100):
+    """
+    Build one 3x3 figure that animates a finished simulation in the browser.
+
+    Every trace is sent once, downsampled to at most `max_points` samples
+    (see logic.downsample); the animation frames only move the x-axis
+    window, so the payload stays the same whatever the cycle length.
+
+    Parameters:
+        result (SimulationResult): Output of logic.engine.simulate
+        max_points (int): Point budget per trace
+        frame_count (int): Number of animation frames
+        frame_duration (int): Milliseconds per frame
+    """
+    series = result.series
+    end = result.stop_index + 1
+    time = series["Time [s]"][:end]
+
+    fig = make_subplots(rows=3, cols=3, subplot_titles=[panel[1] for panel in PLAYBACK_PANELS],
+                        vertical_spacing=0.08, horizontal_spacing=0.06)
+
+    for n, (column, title, label, color, method) in enumerate(PLAYBACK_PANELS):
+        row, col = n // 3 + 1, n % 3 + 1
+        index = result.chart_indices(column, max_points, method)
+        fig.add_trace(go.Scatter(x=time[index], y=series[column][index], name=label,
+                                 line=dict(color=color)), row=row, col=col)
+        fig.update_yaxes(title_text=label, row=row, col=col)
+        if row == 3:
+            fig.update_xaxes(title_text="Time (s)", row=row, col=col)
+
+    # Each frame widens the visible time window of all nine panels
+    axes = ["xaxis"] + [f"xaxis{n}" for n in range(2, len(PLAYBACK_PANELS) + 1)]
+    start = float(time[0])
+    window_ends = np.linspace(float(time[min(1, len(time) - 1)]), float(time[-1]), max(1, frame_count))
+
+    frames = []
+    for k, window_end in enumerate(window_ends):
+        window = [start, float(window_end)]
+        frames.append(go.Frame(name=str(k), layout={axis: {"range": window} for axis in axes}))
+    fig.frames = frames
+
+    # Start on the first frame
+    for axis in axes:
+        fig.layout[axis].range = frames[0].layout[axis].range
+
+    play_args = {"frame": {"duration": frame_duration, "redraw": False},
+                 "transition": {"duration": 0}, "fromcurrent": True, "mode": "immediate"}
+    pause_args = {"frame": {"duration": 0, "redraw": False}, "mode": "immediate"}
+
+    fig.update_layout(
+        height=900,
+        showlegend=False,
+        updatemenus=[dict(
+            type="buttons", direction="left", x=0, y=-0.08, xanchor="left", yanchor="top",
+            buttons=[dict(label="▶ Play", method="animate", args=[None, play_args]),
+                     dict(label="⏸ Pause", method="animate", args=[[None], pause_args])],
+        )],
+        sliders=[dict(
+            x=0.12, y=-0.05, len=0.88, currentvalue=dict(prefix="Time (s): "),
+            steps=[dict(label=f"{window_end:.0f}", method="animate",
+                        args=[[str(k)], pause_args]) for k, window_end in enumerate(window_ends)],
+        )],
+    )
+    return fig
+
+
+# Design inputs shown when hovering a frontier point
+FRONTIER_HOVER = ["vehicle_style", "battery_chemistry", "total_cells", "pack_capacity_kwh",
+                  "system_voltage", "motor_type", "transmission_type", "regen_type"]
+
+def plot_pareto_frontier(frontier):
+    """
+    Cost (x) against range (y) of a logic.pareto.ParetoFrontier: the
+    frontier as a staircase, coloured by its third objective if any, over
+    every candidate that was simulated. The frontier is trace 1 and point
+    n of it is frontier.points[n].
+    """
+    points = frontier.points
+    extra = frontier.objectives[2] if len(frontier.objectives) > 2 else None
+
+    def hover(point):
+        design = point.design
+        return "<br>".join(f"{name}: {design[name]}" for name in FRONTIER_HOVER if name in design)
+
+    marker = dict(size=9, color="green")
+    if extra is not None:
+        marker = dict(size=9, color=[point.values[extra] for point in points], colorscale="Viridis",
+                      showscale=True, colorbar=dict(title=OBJECTIVES[extra][1]))
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=[values["vehicle_cost"] for values in frontier.evaluated],
+        y=[values["range_km"] for values in frontier.evaluated],
+        mode="markers",
+        marker=dict(size=5, color="lightgrey"),
+        hoverinfo="skip",
+        name="Simulated",
+    ))
+    fig.add_trace(go.Scatter(
+        x=[point.values["vehicle_cost"] for point in points],
+        y=[point.values["range_km"] for point in points],
+        mode="markers" if extra is not None else "lines+markers",
+        line=dict(color="green", shape="hv"),
+        marker=marker,
+        text=[hover(point) for point in points],
+        hovertemplate="₹%{x:,.0f}<br>%{y:.1f} km<br>%{text}<extra></extra>",
+        name="Frontier",
+    ))
+    fig.update_layout(
+        title="Cost vs Range Frontier",
+        xaxis_title=OBJECTIVES["vehicle_cost"][1],
+        yaxis_title=OBJECTIVES["range_km"][1],
+        legend=dict(x=0.01, y=0.99),
+        clickmode="event+select",
+    )
+    return fig
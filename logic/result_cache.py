@@ -0,0 +1,343 @@
+# logic/result_cache.py
+#
+# Content-addressed cache of simulation results.
+#
+# A result is identified by the physics version, the cycle fingerprint, a
+# canonical hash of the configuration and the result spec, so the same
+# inputs hit the cache however they were produced (a widget switched back,
+# a sweep revisiting a configuration, another process). Entries live in a
+# bounded in-memory LRU in front of an on-disk store of compressed .npz
+# files, evicted least-recently-used once the store exceeds its size.
+# Results of another PHYSICS_VERSION are never read and are deleted when a
+# cache opens its directory.
+#
+# The disk store is ~/.cache/ev_simulator unless the EV_SIMULATOR_CACHE
+# environment variable names another directory ("off" keeps results in
+# memory only). Disk writes happen on a background thread, so a miss costs
+# the simulation and not the compression.
+#
+# Summary rows of bulk runs (cached_rows: sweeps, Pareto searches) are small
+# and numerous (a file each would flood the store), so they are kept in a
+# memory-only cache of their own unless the caller passes a disk cache.
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from logic.engine import simulate, SimulationResult
+from logic.events import LimitEvent
+from logic.kinematics import cycle_fingerprint
+from logic.physics import PHYSICS_VERSION
+
+CACHE_ENV = "EV_SIMULATOR_CACHE"
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "ev_simulator")
+MEMORY_BYTES = 256 * 2**20
+DISK_BYTES = 2 * 2**30
+ROW_MEMORY_BYTES = 64 * 2**20
+
+# Bytes charged per entry on top of its arrays (meta, bookkeeping)
+ENTRY_OVERHEAD = 1024
+
+# Simulation results are float noise to zlib: the fastest level compresses
+# them nearly as well as the default at half the cost
+COMPRESS_LEVEL = 1
+
+_default = None
+_rows = None
+_default_lock = threading.Lock()
+
+
+class ResultCache:
+    """
+    Two-tier store of result entries: (arrays, meta) where arrays is a dict
+    of np.ndarray and meta a JSON-serialisable dict.
+
+    Parameters:
+        directory (str | None): Disk store (None keeps entries in memory only)
+        memory_bytes (int): Size of the in-memory LRU
+        disk_bytes (int): Size of the disk store before eviction
+        version: Physics version the entries belong to
+    """
+
+    def __init__(self, directory=None, memory_bytes=MEMORY_BYTES, disk_bytes=DISK_BYTES,
+                 version=PHYSICS_VERSION):
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._disk_size = None
+        self._lock = threading.Lock()
+        self._writer = None
+        self._pending = []
+
+        self.root = None
+        if directory is not None:
+            self.root = os.path.join(directory, f"physics-{version}")
+            os.makedirs(self.root, exist_ok=True)
+            _remove_other_versions(directory, os.path.basename(self.root))
+
+    def get(self, key):
+        """(arrays, meta) stored under `key`, or None."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry[:2]
+
+        entry = self._read(key)
+        with self._lock:
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["disk_hits"] += 1
+        self._remember(key, *entry)
+        return entry
+
+    def put(self, key, arrays, meta):
+        """Store an entry in memory and on disk (arrays become read-only)."""
+        arrays = {name: _read_only(values) for name, values in arrays.items()}
+        self._remember(key, arrays, meta)
+        if self.root is not None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="result-cache")
+                self._pending = [f for f in self._pending if not f.done()]
+                self._pending.append(self._writer.submit(self._write, key, arrays, meta))
+
+    def flush(self):
+        """Wait until every entry put so far is on disk."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            self._disk_size = None
+        if self.root is not None:
+            shutil.rmtree(self.root, ignore_errors=True)
+            os.makedirs(self.root, exist_ok=True)
+
+    # ---------- memory tier ----------
+    def _remember(self, key, arrays, meta):
+        size = ENTRY_OVERHEAD + sum(values.nbytes for values in arrays.values())
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            if key in self._memory:
+                return
+            self._memory[key] = (arrays, meta, size)
+            self._memory_size += size
+            while self._memory_size > self.memory_bytes:
+                _, (_, _, evicted) = self._memory.popitem(last=False)
+                self._memory_size -= evicted
+
+    # ---------- disk tier ----------
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + ".npz")
+
+    def _read(self, key):
+        if self.root is None:
+            return None
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as stored:
+                meta = json.loads(str(stored["meta"]))
+                arrays = {name: _read_only(stored[f"a{i}"]) for i, name in enumerate(meta.pop("arrays"))}
+            os.utime(path)      # recently used
+        except (OSError, KeyError, ValueError):
+            return None
+        return arrays, meta
+
+    def _write(self, key, arrays, meta):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        names = list(arrays)
+        header = json.dumps({**meta, "arrays": names})
+
+        # Write then rename, so readers in other processes never see a partial file
+        fd, tmp = tempfile.mkstemp(suffix=".npz", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f, zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED,
+                                                            compresslevel=COMPRESS_LEVEL) as archive:
+                members = {"meta": np.array(header)}
+                members.update((f"a{i}", arrays[name]) for i, name in enumerate(names))
+                for member, values in members.items():
+                    # The same layout np.savez writes, so np.load reads it back
+                    with archive.open(member + ".npy", "w", force_zip64=True) as out:
+                        np.lib.format.write_array(out, np.asarray(values), allow_pickle=False)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+        size = os.path.getsize(path)
+        with self._lock:
+            if self._disk_size is None:
+                self._disk_size = _directory_size(self.root)
+            else:
+                self._disk_size += size
+            full = self._disk_size > self.disk_bytes
+        if full:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        # Least recently used first, until the store is back under budget
+        files = sorted(_entry_files(self.root), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in files)
+        for path, _, size in files:
+            if total <= self.disk_bytes:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_size = total
+
+
+def default_cache():
+    """Process-wide cache (see EV_SIMULATOR_CACHE above)."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            directory = os.environ.get(CACHE_ENV, DEFAULT_DIRECTORY)
+            _default = ResultCache(None if directory.lower() == "off" else directory)
+        return _default
+
+
+def row_cache():
+    """Process-wide memory-only cache of summary rows (see cached_rows)."""
+    global _rows
+    with _default_lock:
+        if _rows is None:
+            _rows = ResultCache(None, memory_bytes=ROW_MEMORY_BYTES)
+        return _rows
+
+
+def config_digest(config):
+    """Canonical hash of a configuration dict (independent of key order)."""
+    text = json.dumps(config, sort_keys=True, default=_json_default)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def result_key(kind, fingerprint, config, spec=None):
+    """
+    Cache key of one result.
+
+    Parameters:
+        kind (str): What is cached ("result", "summary", ...)
+        fingerprint (str): Cycle fingerprint (logic.kinematics.cycle_fingerprint)
+        config (dict): EV configuration
+        spec (logic.outputs.ResultSpec): Result spec, if any
+    """
+    spec_text = None if spec is None else [spec.outputs, spec.precision]
+    text = json.dumps([kind, PHYSICS_VERSION, fingerprint, config_digest(config), spec_text])
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=20).hexdigest()
+
+
+def simulate_cached(cycle, config, spec=None, cache=None):
+    """
+    logic.engine.simulate, answered from the cache when the same cycle,
+    configuration and spec were simulated before.
+    """
+    cache = cache or default_cache()
+    key = result_key("result", cycle_fingerprint(cycle), config, spec)
+    entry = cache.get(key)
+    if entry is not None:
+        outputs, meta = entry
+        # Only the outputs are stored, the cycle columns come from the caller
+        series = {name: _read_only(cycle[name]) for name in meta["inputs"]}
+        series.update(outputs)
+        events = [LimitEvent(**event) for event in meta["events"]]
+        return SimulationResult.restore(series, events, meta["summary"])
+
+    result = simulate(cycle, config, spec)
+    inputs = [name for name in result.series if name in cycle]
+    cache.put(key, {name: values for name, values in result.series.items() if name not in inputs},
+              {"inputs": inputs, "summary": result.summary(),
+               "events": [event.as_dict() for event in result.events]})
+    return result
+
+
+def cached_rows(kind, cycle, configs, compute, cache=None):
+    """
+    One JSON-serialisable row per configuration, computing only those not
+    in the cache.
+
+    Parameters:
+        kind (str): Name of what compute returns (part of the cache key)
+        cycle (pd.DataFrame | dict): Drive cycle
+        configs (list[dict]): EV configurations
+        compute (callable): compute(configs) -> list of rows for those configs
+        cache (ResultCache): Where rows are kept (default row_cache(), in
+                             memory only; pass a disk cache such as
+                             default_cache() to keep them across runs, at one
+                             file per row)
+
+    Returns:
+        list[dict]: Rows in the order of configs
+    """
+    cache = cache or row_cache()
+    fingerprint = cycle_fingerprint(cycle)
+    keys = [result_key(kind, fingerprint, config) for config in configs]
+
+    rows = []
+    for key in keys:
+        entry = cache.get(key)
+        rows.append(None if entry is None else entry[1])
+
+    missing = [i for i, row in enumerate(rows) if row is None]
+    if missing:
+        for i, row in zip(missing, compute([configs[i] for i in missing])):
+            cache.put(keys[i], {}, row)
+            rows[i] = row
+    return rows
+
+
+# ---------- helpers ----------
+def _read_only(values):
+    values = np.asarray(values)
+    if values.flags.writeable:
+        values = values.view()
+        values.setflags(write=False)
+    return values
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Cannot serialise {type(value).__name__}")
+
+def _entry_files(root):
+    for folder, _, names in os.walk(root):
+        for name in names:
+            if name.endswith(".npz"):
+                path = os.path.join(folder, name)
+                try:
+                    info = os.stat(path)
+                except OSError:
+                    continue
+                yield path, info.st_mtime, info.st_size
+
+def _directory_size(root):
+    return sum(size for _, _, size in _entry_files(root))
+
+def _remove_other_versions(directory, current):
+    for name in os.listdir(directory):
+        if name.startswith("physics-") and name != current:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
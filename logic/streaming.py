@@ -0,0 +1,74 @@
+# logic/streaming.py
+#
+# Chunked simulation for cycles too long to hold in memory (e.g. multi-day
+# fleet logs). The cycle is consumed as an iterator of chunks; the boundary
+# state (last input row, cumulative distance, cumulative SOC drop, RC branch
+# voltage, thermal filter state) is carried from one chunk to the next so
+# every output chunk matches the same rows of a whole-cycle
+# calculate_parameters run bit for bit.
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from logic.physics import calculate_parameters
+from logic.cycle_store import load_cycle_columns, normalize_column_name
+
+DEFAULT_CHUNK_ROWS = 100_000
+
+
+def simulate_stream(chunks, config, spec=None):
+    """
+    Simulate a drive cycle chunk by chunk.
+
+    Parameters:
+        chunks (iterable): pd.DataFrame (or dict of columns) pieces of the
+                           cycle, in time order
+        config (dict): EV configuration
+        spec (logic.outputs.ResultSpec): Output columns and precision of every chunk
+
+    Yields:
+        pd.DataFrame: calculate_parameters output for each input chunk,
+                      indexed by the global row number
+    """
+    state = {}
+    previous = None   # last input row of the previous chunk
+    offset = 0
+
+    for chunk in chunks:
+        chunk = pd.DataFrame(chunk).reset_index(drop=True)
+        if chunk.empty:
+            continue
+
+        if previous is None:
+            result = calculate_parameters(chunk, config, state=state, spec=spec)
+        else:
+            # Prepend the previous row so diff-based terms see across the boundary
+            frame = pd.concat([previous, chunk], ignore_index=True)
+            result = calculate_parameters(frame, config, state=state, spec=spec).iloc[1:]
+
+        previous = chunk.iloc[[-1]]
+        result.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        yield result
+
+
+def iter_cycle_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Read a drive cycle in chunks of `chunk_rows` rows, from a CSV file or a
+    memory-mapped cycle directory (see logic.cycle_store), without loading
+    the whole cycle.
+    """
+    if os.path.isdir(path):
+        columns = load_cycle_columns(path)
+        length = len(next(iter(columns.values())))
+        for start in range(0, length, chunk_rows):
+            yield pd.DataFrame({name: np.asarray(values[start:start + chunk_rows])
+                                for name, values in columns.items()})
+        return
+
+    with pd.read_csv(path, encoding="ISO-8859-1", chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            chunk.columns = [normalize_column_name(column) for column in chunk.columns]
+            yield chunk
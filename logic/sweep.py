@@ -0,0 +1,314 @@
+# logic/sweep.py
+
+import csv
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from config.parameters import style_cd_map, battery_data, motor_specs, wheel_size_map, cooling_params
+from config.parameters import regen_specs, transmission_models, inverter_specs, hvac_specs
+from logic.kernel import simulate_batch
+from logic.kinematics import cycle_fingerprint
+from logic.battery import BATTERY_MODELS
+from logic.design import derive_configs
+from logic.result_cache import cached_rows
+
+# Design inputs as picked in ui.layout.render_configuration_panel (widget defaults)
+DEFAULT_DESIGN = {
+    "vehicle_width": 1.8,
+    "vehicle_height": 1.45,
+    "vehicle_length": 4.2,
+    "wheelbase": 2.6,
+    "ground_clearance": 0.15,
+    "vehicle_style": "Aerodynamic",
+    "tyre_size": "15",
+    "tyre_type": "Eco",
+    "system_voltage": "400V",
+    "battery_chemistry": "Li-ion (NMC)",
+    "total_cells": 400,
+    "cells_series": 100,
+    "layer_count": 2,
+    "pack_capacity_kwh": 45.0,      # Solid-State only
+    "pack_voltage": 360,            # Solid-State only
+    "battery_model": "ideal",
+    "motor_type": "Permanent Magnet Synchronous Motor (PMSM / PSM)",
+    "efficiency_model": "scalar",
+    "transmission_type": "eGearDrive",
+    "hvac_type": "HVAC Resistive",
+    "coolant_flow": "0.80_kg_per_s",
+    "regen_type": None,
+    "inverter_type": "2-Level IGBT VSI",
+}
+
+# Catalog axes a sweep can range over, with every option they offer
+CATALOG_AXES = {
+    "vehicle_style": list(style_cd_map.keys()),
+    "tyre_size": list(wheel_size_map.keys()),
+    "tyre_type": ["Eco", "Standard", "Performance"],
+    "system_voltage": ["400V", "800V"],
+    "battery_chemistry": list(battery_data.keys()),
+    "battery_model": BATTERY_MODELS,
+    "motor_type": list(motor_specs.keys()),
+    "efficiency_model": ["scalar", "map"],
+    "transmission_type": list(transmission_models.keys()),
+    "hvac_type": list(hvac_specs.keys()),
+    "coolant_flow": list(cooling_params.keys()),
+    "regen_type": [None] + list(regen_specs.keys()),
+    "inverter_type": list(inverter_specs.keys()),
+}
+
+# Fields of a result row taken from the kernel summary
+SUMMARY_FIELDS = ["range_km", "cost_to_range", "distance_km", "final_soc",
+                  "stop_index", "peak_torque_nm", "peak_current_a"]
+
+RESULT_FIELDS = ["key", "valid", "reason", "range_km", "vehicle_cost", "cost_to_range",
+                 "distance_km", "final_soc", "stop_reason", "stop_index",
+                 "peak_torque_nm", "peak_current_a"]
+
+
+def design_config(design):
+    """
+    Derive the simulation config from raw design inputs (see
+    logic.design.derive_configs, which derives many designs at once).
+
+    Returns:
+        (config, problems) - problems is a list of reasons the design is not
+        buildable (empty when valid)
+    """
+    derived = derive_configs(design)
+    return derived.config_at(0), derived.reasons(0)
+
+
+def design_columns(designs):
+    """Design dicts (with the same keys) as design input -> array columns for derive_configs."""
+    designs = list(designs)
+    if not designs:
+        return {}
+    return {name: _column([design[name] for design in designs]) for name in designs[0]}
+
+
+def sweep_columns(axes, base=None):
+    """
+    Every combination of the sweep axes as design input -> (N,) columns, in
+    the order of sweep_designs, without building a dict per design.
+    """
+    base = DEFAULT_DESIGN if base is None else {**DEFAULT_DESIGN, **base}
+    names = list(axes.keys())
+    values = [list(axes[name]) for name in names]
+    grid = np.meshgrid(*(np.arange(len(v)) for v in values), indexing="ij")
+    columns = dict(base)
+    for name, v, index in zip(names, values, grid):
+        if v and isinstance(v[0], dict):
+            # Joint axis: one column per input it sets
+            for field in v[0]:
+                columns[field] = _column([_plain(value[field]) for value in v])[index.ravel()]
+        else:
+            columns[name] = _column([_plain(value) for value in v])[index.ravel()]
+    return columns
+
+
+def design_key(design, fingerprint=None):
+    """
+    Stable short key identifying a design (independent of dict order), or
+    with a cycle fingerprint (logic.kinematics.cycle_fingerprint) a design
+    run on that cycle.
+    """
+    text = json.dumps(design if fingerprint is None else [fingerprint, design], sort_keys=True,
+                      default=_json_default)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def sweep_designs(axes, base=None):
+    """
+    Expand sweep axes into designs.
+
+    Parameters:
+        axes (dict): Design input -> list of values (catalog keys or numbers,
+                     e.g. CATALOG_AXES["motor_type"] or np.arange(300, 600, 20)).
+                     An axis of dicts sets several inputs together, under any
+                     name (e.g. {"pack": logic.packs.find_packs(...).layouts()})
+        base (dict): Values for inputs that are not swept (default DEFAULT_DESIGN)
+
+    Yields:
+        dict: One complete design per combination
+    """
+    base = DEFAULT_DESIGN if base is None else {**DEFAULT_DESIGN, **base}
+    names = list(axes.keys())
+    for values in itertools.product(*(list(axes[name]) for name in names)):
+        design = dict(base)
+        for name, value in zip(names, values):
+            if isinstance(value, dict):
+                design.update((field, _plain(v)) for field, v in value.items())
+            else:
+                design[name] = _plain(value)
+        yield design
+
+
+def evaluate_designs(cycle, designs):
+    """
+    Simulate a list of designs with the batched kernel.
+
+    Returns:
+        list[dict]: One row of the results table per design, in order; the
+        row key identifies the design and the cycle
+    """
+    designs = list(designs)
+    if not designs:
+        return []
+    fingerprint = cycle_fingerprint(cycle)
+    derived = derive_configs(design_columns(designs))
+    rows = []
+    configs = []
+    for i, design in enumerate(designs):
+        valid = bool(derived.valid[i])
+        row = {field: None for field in RESULT_FIELDS}
+        row.update(key=design_key(design, fingerprint), valid=valid, reason="" if valid else "; ".join(derived.reasons(i)),
+                   vehicle_cost=derived.config["vehicle_cost"][i].item())
+        rows.append(row)
+        if valid:
+            configs.append(derived.config_at(i))
+
+    # Configurations simulated before (by any design) come from the result cache
+    summaries = cached_rows("batch-summary", cycle, configs,
+                            lambda missing: _batch_summaries(cycle, missing))
+
+    valid_rows = [row for row in rows if row["valid"]]
+    for row, summary in zip(valid_rows, summaries):
+        for field in SUMMARY_FIELDS:
+            row[field] = summary[field]
+        row["stop_reason"] = summary["stop_reason"] or ""
+    return rows
+
+
+def run_sweep(cycle, axes, base=None, results_path=None, workers=None, chunk_size=256):
+    """
+    Evaluate every combination of the sweep axes across a process pool.
+
+    Rows are yielded as soon as their chunk finishes (in completion order).
+    With `results_path` every row is also appended to a CSV file, and designs
+    already recorded there for the same cycle are skipped, so an interrupted
+    sweep resumes where it stopped (rows of other cycles do not count). The
+    file must hold the columns of this sweep (same axes and base inputs).
+
+    Parameters:
+        cycle (pd.DataFrame | dict): Drive cycle
+        axes (dict): See sweep_designs
+        base (dict): Fixed design inputs
+        results_path (str): Optional CSV file for streaming/resuming results
+        workers (int): Worker processes (default: all cores)
+        chunk_size (int): Designs per task sent to a worker
+
+    Yields:
+        dict: Result row (RESULT_FIELDS followed by the design inputs)
+    """
+    done = _completed_keys(results_path)
+    fingerprint = cycle_fingerprint(cycle)
+    pending = (design for design in sweep_designs(axes, base) if design_key(design, fingerprint) not in done)
+
+    # Each worker receives the cycle once, not once per task
+    columns = {name: np.asarray(cycle[name]) for name in ("Time [s]", "Velocity [km/h]", "Elevation [m]")}
+
+    workers = workers or os.cpu_count() or 1
+    writer = None
+    out = None
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(columns,)) as pool:
+            futures = set()
+            for chunk in _chunks(pending, chunk_size):
+                futures.add(pool.submit(_evaluate_chunk, chunk))
+                # Keep a bounded number of tasks in flight
+                if len(futures) >= 4 * workers:
+                    finished = next(as_completed(futures))
+                    futures.remove(finished)
+                    for row in finished.result():
+                        writer, out = _record(row, results_path, writer, out)
+                        yield row
+            for finished in as_completed(futures):
+                for row in finished.result():
+                    writer, out = _record(row, results_path, writer, out)
+                    yield row
+    finally:
+        if out is not None:
+            out.close()
+
+
+# ---------- worker side ----------
+_worker_cycle = None
+
+def _init_worker(columns):
+    global _worker_cycle
+    _worker_cycle = columns
+
+def _evaluate_chunk(designs):
+    rows = evaluate_designs(_worker_cycle, designs)
+    for row, design in zip(rows, designs):
+        row.update(design)
+    return rows
+
+
+# ---------- helpers ----------
+def _batch_summaries(cycle, configs):
+    summary, _ = simulate_batch(cycle, configs)
+    rows = []
+    for k in range(len(configs)):
+        row = {field: summary[field][k].item() for field in SUMMARY_FIELDS}
+        row["stop_reason"] = summary["stop_reason"][k]
+        rows.append(row)
+    return rows
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _completed_keys(results_path):
+    if results_path is None or not os.path.exists(results_path):
+        return set()
+    with open(results_path, newline="", encoding="utf-8") as f:
+        return {row["key"] for row in csv.DictReader(f)}
+
+def _csv_header(results_path):
+    if not os.path.exists(results_path) or os.path.getsize(results_path) == 0:
+        return None
+    with open(results_path, newline="", encoding="utf-8") as f:
+        return next(csv.reader(f), None)
+
+def _record(row, results_path, writer, out):
+    if results_path is None:
+        return writer, out
+    if writer is None:
+        # Rows appended to an earlier sweep's file follow its header
+        header = _csv_header(results_path)
+        if header is not None and set(header) != set(row):
+            raise ValueError(f"{results_path} holds another sweep's columns: this sweep adds "
+                             f"{[name for name in row if name not in header]} and lacks "
+                             f"{[name for name in header if name not in row]}")
+        out = open(results_path, "a", newline="", encoding="utf-8")
+        writer = csv.DictWriter(out, fieldnames=header or list(row.keys()))
+        if header is None:
+            writer.writeheader()
+    writer.writerow(row)
+    out.flush()
+    return writer, out
+
+def _plain(value):
+    # numpy scalars -> python, so designs hash and serialise the same way
+    return value.item() if isinstance(value, np.generic) else value
+
+def _column(values):
+    # Strings and None as an object array, numbers as a numeric one
+    if any(value is None or isinstance(value, str) for value in values):
+        return np.array(values, dtype=object)
+    return np.array(values)
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialise {type(value).__name__}")
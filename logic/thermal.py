@@ -0,0 +1,227 @@
+# logic/thermal.py
+#
+# Lumped thermal network of the motor: winding -> stator -> coolant -> radiator.
+#
+#     C_w dT_w/dt = P_loss - G_ws (T_w - T_s)
+#     C_s dT_s/dt = G_ws (T_w - T_s) - G_sc (T_s - T_c)
+#     C_c dT_c/dt = G_sc (T_s - T_c) - m_dot c_p (T_c - T_amb)
+#
+# The losses are held constant over each time step and the network is
+# integrated exactly (matrix exponential), so it is stable for any step size.
+# The network is diagonalised once per configuration; each mode is then a
+# first-order recursive filter evaluated with cumulative sums instead of a
+# Python loop over samples. The filter rounds the same however a cycle is
+# split into segments, so streamed runs reproduce whole-cycle runs exactly.
+
+import numpy as np
+
+AMBIENT_TEMP = 300.0            # K
+WINDING_FRACTION = 0.3          # share of the motor heat capacity in the winding
+G_WINDING_STATOR = 60.0         # W/K
+G_STATOR_COOLANT = 250.0        # W/K
+COOLANT_MASS = 6.0              # kg of coolant in the loop
+COOLANT_DENSITY = 1.0           # kg/L (cooling_params flows are given in L/min)
+
+TEMPERATURE_COLUMNS = ["Winding Temp [K]", "Stator Temp [K]", "Coolant Temp [K]"]
+
+# Largest decay (in e-folds) inside one filter block, keeps exp() finite
+_BLOCK_DECAY = 500.0
+
+# Samples scanned for the end of the first filter block (grown as needed)
+_BLOCK_SCAN = 256
+
+
+def thermal_network(motor_mass, motor_cp, coolant_L_per_min, coolant_cp):
+    """
+    Modal form of the network for one or more configurations.
+
+    Parameters:
+        motor_mass, motor_cp, coolant_L_per_min, coolant_cp: scalars or (K,) arrays
+
+    Returns:
+        dict: "rates" (K x 3) mode eigenvalues [1/s], "input" (K x 3) loss
+              gain of each mode, "output" (K x 3 x 3) mode -> node temperatures
+              and "to_modes" (K x 3 x 3) node temperatures -> modes
+    """
+    motor_heat = np.atleast_1d(np.asarray(motor_mass, dtype=float) * np.asarray(motor_cp, dtype=float))
+    coolant_flow = np.atleast_1d(np.asarray(coolant_L_per_min, dtype=float)) / 60.0 * COOLANT_DENSITY
+    coolant_cp = np.atleast_1d(np.asarray(coolant_cp, dtype=float))
+    K = max(len(motor_heat), len(coolant_flow), len(coolant_cp))
+
+    capacity = np.empty((K, 3))
+    capacity[:, 0] = WINDING_FRACTION * motor_heat
+    capacity[:, 1] = (1 - WINDING_FRACTION) * motor_heat
+    capacity[:, 2] = COOLANT_MASS * coolant_cp
+
+    # Conductance matrix (symmetric), the radiator ties the coolant to ambient
+    conductance = np.zeros((K, 3, 3))
+    conductance[:, 0, 0] = G_WINDING_STATOR
+    conductance[:, 0, 1] = conductance[:, 1, 0] = -G_WINDING_STATOR
+    conductance[:, 1, 1] = G_WINDING_STATOR + G_STATOR_COOLANT
+    conductance[:, 1, 2] = conductance[:, 2, 1] = -G_STATOR_COOLANT
+    conductance[:, 2, 2] = G_STATOR_COOLANT + coolant_flow * coolant_cp
+
+    # dT/dt = -C^-1 G T is similar to the symmetric -C^-1/2 G C^-1/2
+    scale = 1 / np.sqrt(capacity)
+    symmetric = conductance * scale[:, :, None] * scale[:, None, :]
+    decay, Q = np.linalg.eigh(symmetric)
+
+    return {
+        "rates": -decay,
+        "input": Q[:, 0, :] * scale[:, :1],
+        "output": Q * scale[:, :, None],
+        "to_modes": np.swapaxes(Q, 1, 2) / scale[:, None, :],
+    }
+
+
+def simulate_temperatures(p_loss, dt, network, initial=None, carry=None):
+    """
+    Node temperatures of the network over a drive cycle.
+
+    Parameters:
+        p_loss ((K x T) or (T,) array): Motor losses [W], NaN treated as 0
+        dt ((T,) array): Step ending at each sample [s], NaN treated as 0
+        network (dict): Output of thermal_network (K configurations)
+        initial ((K x 3) array): Node temperatures [K] at the first sample
+                                 (default: everything at AMBIENT_TEMP)
+        carry (dict): Filter state when continuing an earlier segment of the
+                      cycle, see recursive_filter (initial is then ignored)
+
+    Returns:
+        (K x 3 x T) array of winding, stator and coolant temperatures [K]
+    """
+    rates = network["rates"]
+    K = len(rates)
+    p_loss = np.nan_to_num(np.broadcast_to(p_loss, (K, np.shape(dt)[-1])))
+    dt = np.nan_to_num(np.asarray(dt, dtype=float))
+
+    # Exact zero-order-hold response of every mode to one step of loss
+    step_rates = rates[:, :, None] * dt
+    drive = np.expm1(step_rates)
+    drive /= rates[:, :, None]
+    drive *= network["input"][:, :, None]
+    drive *= p_loss[:, None, :]
+
+    start = np.zeros((K, 3))
+    if initial is not None:
+        rise = np.broadcast_to(np.asarray(initial, dtype=float) - AMBIENT_TEMP, (K, 3))
+        start = np.einsum("kmn,kn->km", network["to_modes"], rise)
+
+    modes = recursive_filter(step_rates, drive, start, carry)
+    temperatures = np.einsum("knm,kmt->knt", network["output"], modes)
+    temperatures += AMBIENT_TEMP
+    return temperatures
+
+
+def filter_blocks(log_gain, shape, carry=None):
+    """
+    Blocks recursive_filter splits a series into, for filtering several drives
+    through the same log gain without recomputing them.
+
+    Parameters:
+        log_gain (np.ndarray): Log gain per sample, broadcast to shape
+        shape (tuple): Shape of the drive
+        carry (dict): Open block left by the previous segment, as for
+                      recursive_filter (not updated here)
+
+    Returns:
+        list: (begin, end, growth, total, continued) per block, with growth =
+              e^-L over the block, total = L at its last sample and continued
+              set when the block continues the carried one
+    """
+    log_gain = np.broadcast_to(log_gain, shape)
+    lead = shape[:-1]
+    axes = tuple(range(len(shape) - 1))
+
+    if carry:
+        total, fresh = carry["log_gain"], False
+    else:
+        total, fresh = np.zeros(lead), True
+
+    blocks = []
+    begin, T = 0, shape[-1]
+    scan = _BLOCK_SCAN
+    while begin < T:
+        # Log gain accumulated in the block (continuing its total), scanned
+        # in growing pieces until the fastest mode has decayed by _BLOCK_DECAY
+        pieces, count, running = [], 0, total
+        while True:
+            stop = min(T, begin + count + scan)
+            piece = np.array(log_gain[..., begin + count:stop], dtype=float)
+            piece[..., 0] += running
+            np.cumsum(piece, axis=-1, out=piece)
+            pieces.append(piece)
+            depth = -piece.min(axis=axes) if axes else -piece
+            inside = int(np.searchsorted(depth, _BLOCK_DECAY, side="right"))
+            if inside < stop - begin - count or stop == T:
+                count += inside
+                break
+            count, running = stop - begin, piece[..., -1]
+            scan *= 2
+        L = pieces[0] if len(pieces) == 1 else np.concatenate(pieces, axis=-1)
+        if count == 0 and not fresh:
+            # The carried block is full: the next one starts here
+            total, fresh = np.zeros(lead), True
+            continue
+        count = max(count, 1)
+        end = begin + count
+        blocks.append((begin, end, np.exp(-L[..., :count]), L[..., count - 1], not fresh))
+
+        begin = end
+        scan = max(_BLOCK_SCAN, 2 * count)
+        # The next sample decays past _BLOCK_DECAY: a new block
+        total, fresh = np.zeros(lead), True
+    return blocks
+
+
+def recursive_filter(log_gain, drive, start, carry=None, blocks=None):
+    """
+    y[t] = exp(log_gain[t]) * y[t-1] + drive[t] along the last axis, with
+    y[-1] = start, for log_gain <= 0.
+
+    Written as y[t] = e^L[t] * (y0 + sum_{s<=t} drive[s] e^-L[s]) with y0 the
+    value before the current block and L the log gain accumulated since; a
+    block ends before the fastest mode has decayed by _BLOCK_DECAY, so e^-L
+    stays finite. Block ends and sums depend only on the samples since the
+    block began, and `carry` holds the open block from one segment of a
+    series to the next, so a series filtered in segments comes out bit for
+    bit as filtered whole. A segment may repeat the last sample of the
+    previous one with zero log gain and drive (as logic.streaming does): the
+    sample then changes nothing.
+
+    Parameters:
+        carry (dict): Open block left by the previous segment (start is then
+                      ignored); updated to the block open after the last
+                      sample. Pass an empty dict for the first segment.
+        blocks (list): filter_blocks(log_gain, drive.shape, carry), if
+                       already computed
+
+    Returns:
+        np.ndarray: y, shaped as drive
+    """
+    if blocks is None:
+        blocks = filter_blocks(log_gain, drive.shape, carry)
+    out = np.empty_like(drive)
+    lead = drive.shape[:-1]
+
+    if carry:
+        y0, acc, last = carry["start"], carry["sum"], carry["last"]
+    else:
+        last = np.broadcast_to(np.asarray(start, dtype=float), lead)
+
+    for begin, end, growth, _, continued in blocks:
+        if not continued:
+            y0, acc = last, np.zeros(lead)
+        block = drive[..., begin:end] * growth
+        block[..., 0] += acc
+        np.cumsum(block, axis=-1, out=block)
+        acc = block[..., -1].copy()
+        block += y0[..., None]
+        block /= growth
+        out[..., begin:end] = block
+        last = block[..., -1]
+
+    if carry is not None and blocks:
+        total = blocks[-1][3]
+        carry.update(start=np.array(y0), log_gain=np.array(total), sum=np.array(acc), last=np.array(last))
+    return out
@@ -2,17 +2,23 @@
 
 import streamlit as st
 from ui.layout import render_configuration_panel
-from logic.simulator import run_simulation
+from logic.simulator import run_simulation, render_frontier
+from logic.pareto import iter_frontier
+from logic.sweep import CATALOG_AXES, sweep_designs
 from logic.plotter import plot_speed_and_elevation
+from logic.cycles import DEFAULT_CYCLE, CycleRegistry, combined_summary, run_cycles
 import pandas as pd
 import os
 
-@st.cache_data
-def load_driving_pattern():
-    file_path = os.path.join("data", "bmw_i3_pattern.csv")
+# Indexed once per process; cycles are loaded on first use and shared between
+# reruns without copying (the simulation never modifies a cycle)
+@st.cache_resource
+def cycle_registry():
+    return CycleRegistry()
+
+def load_driving_pattern(registry, name):
     try:
-        df = pd.read_csv(file_path, encoding='ISO-8859-1')  # or encoding='latin1'
-        return df
+        return registry.load(name)
     except Exception as e:
         st.error(f"Error loading driving pattern: {e}")
         return pd.DataFrame()
@@ -26,9 +32,12 @@ st.markdown(
 )
 
 st.header("Input Load Profile for Simulation")
-pattern = {}  # You can expand this later
-
-df = load_driving_pattern()
+registry = cycle_registry()
+cycle_names = registry.names()
+cycle_name = st.selectbox("Drive Cycle", cycle_names,
+                          index=cycle_names.index(DEFAULT_CYCLE) if DEFAULT_CYCLE in cycle_names else 0,
+                          format_func=lambda name: registry.info(name).title)
+df = load_driving_pattern(registry, cycle_name) if cycle_name else pd.DataFrame()
 
 if not df.empty:
 
@@ -39,7 +48,11 @@ if not df.empty:
         fig = plot_speed_and_elevation(df)
         if fig:
             st.plotly_chart(fig, config={}, use_container_width=True)
-            st.markdown("Ambient temperature: 25°C - 35°C")
+            info = registry.info(cycle_name)
+            st.markdown(f"{info.distance_km:.1f} km in {info.duration_s / 60:.0f} min, "
+                        f"sampled at {info.sample_rate_hz:g} Hz ({info.source})")
+            if info.ambient:
+                st.markdown(f"Ambient temperature: {info.ambient}")
             # st.plotly_chart(fig, width='stretch')
 
     with col2:
@@ -51,7 +64,36 @@ st.header("Configure Your EV System")
 config = render_configuration_panel()
 
 st.header("🔁 Run Simulation")
+profile = st.checkbox("Record stage timings", help="Time every simulation and rendering stage (runs slower)")
 if st.button("Run Simulation"):
-    run_simulation(df, config)
+    result = run_simulation(df, config, profile=profile, cycle=os.path.abspath(registry.info(cycle_name).path))
+    df = result.to_frame()
+
+st.header("🗺️ Run on Several Cycles")
+run_names = st.multiselect("Drive cycles", cycle_names, default=[cycle_name] if cycle_name else [],
+                           format_func=lambda name: registry.info(name).title)
+if st.button("Run on Selected Cycles", disabled=not run_names):
+    results = run_cycles(config, run_names, registry)
+    st.dataframe(pd.DataFrame(combined_summary(results, config)), hide_index=True)
+
+st.header("📈 Cost vs Range Frontier")
+frontier_axes = st.multiselect("Components to vary", list(CATALOG_AXES.keys()),
+                               default=["vehicle_style", "battery_chemistry", "motor_type", "regen_type"])
+cells_low, cells_high = st.slider("Total cells (100 in series)", min_value=500, max_value=8000,
+                                  value=(1000, 6000), step=500)
+frontier_extra = st.selectbox("Third objective", ["None", "Peak motor temperature", "Pack mass"])
+if st.button("Compute Frontier"):
+    axes = {name: CATALOG_AXES[name] for name in frontier_axes}
+    axes["total_cells"] = list(range(cells_low, cells_high + 1, 500))
+    objectives = ("vehicle_cost", "range_km") + {"None": (), "Peak motor temperature": ("peak_motor_temp_k",),
+                                                 "Pack mass": ("pack_mass_kg",)}[frontier_extra]
+    progress = st.progress(0.0, text="Evaluating designs")
+    for frontier in iter_frontier(df, sweep_designs(axes), objectives):
+        progress.progress(frontier.stats["batches"] / max(frontier.stats["total_batches"], 1),
+                          text=f"Evaluating designs ({len(frontier)} on the frontier)")
+    progress.empty()
+    st.session_state["frontier"] = frontier
+if "frontier" in st.session_state:
+    render_frontier(st.session_state["frontier"])
 
 df.to_csv("SimulationData.csv")
\ No newline at end of file
@@ -1,11 +1,23 @@
 # ui/layout.py
 
 import streamlit as st
-from config.parameters import style_cd_map, style_mass_factor, battery_data, motor_specs, wheel_size_map, cooling_params
-from config.parameters import regen_specs, transmission_models, inverter_specs, hvac_specs, style_cost_factor
+from config.parameters import battery_data, motor_specs, wheel_size_map, cooling_params
+from config.parameters import regen_specs, transmission_models, inverter_specs, hvac_specs
+from logic.design import derive_configs
+from logic.packs import find_packs
+
+# Pack finder: most matches listed
+PACK_FINDER_OPTIONS = 200
 
 
 def render_configuration_panel():
+    """
+    Design input widgets. The derived quantities, checks and cost come
+    from logic.design.derive_configs once every input is picked.
+
+    Returns:
+        dict: EV configuration
+    """
     st.subheader("🔧 EV Configuration")
     # Two-column layout
     col1, col2, col3,  col4 = st.columns(4)
@@ -23,25 +35,12 @@ def render_configuration_panel():
         ground_clearance = st.slider("Ground Clearance [m]", min_value=0.1, max_value=0.3, value=0.15, step=0.1)
         vehicle_style = st.selectbox("Vehicle Style", ["Aerodynamic", "Sporty", "Standard", "SUV-like"])
 
-        # Validation check
-        if wheelbase >= 0.63 * vehicle_length or wheelbase <= 0.56 * vehicle_length:
-            st.error("❌ Wheelbase not possible for the selected vehicle length. Please adjust values.")
-            st.stop()  # stops execution until user fixes input
-
-        # Derived parameters
-        frontal_area = vehicle_width * vehicle_height
-        drag_coefficient = style_cd_map[vehicle_style]
-        vehicle_mass = (vehicle_length * vehicle_width * vehicle_height * 90) + (ground_clearance * 1000) + style_mass_factor[vehicle_style]
+        # Validation check and derived values, filled in below
+        wheelbase_message = st.container()
+        vehicle_info = st.container()
 
-        # Display derived values
-        st.markdown(f"**Frontal Area:** {frontal_area:.2f} m²")
-        st.markdown(f"**Drag Coefficient (Cd):** {drag_coefficient:.2f}")
-        st.markdown(f"**Estimated Vehicle Mass (without battery):** {vehicle_mass:.0f} kg")
         tyre_size = st.selectbox("Tyre Size", list(wheel_size_map.keys()))
-        tyre_spec = wheel_size_map[tyre_size]
-        wheel_radius = tyre_spec['wheel_radius']
         tyre_type = st.selectbox("Tyre Type", ["Eco", "Standard", "Performance"])
-        tyre_cost = tyre_spec['cost_inr']
 
     with col2:
 
@@ -49,22 +48,18 @@ def render_configuration_panel():
         st.header("🔋 Electrical Configurator")
         system_voltage = st.selectbox("System Voltage", ["400V", "800V"])
 
-        if system_voltage == "400V":
-            sys_voltage = 400
-            sys_efficiency = 1.0
-            system_cost_factor = 1
-        else:
-            sys_voltage = 800
-            sys_efficiency = 1.1
-            system_cost_factor = 1.2
-
-        
         # 🔋 Battery Configurator
         st.markdown("🔋 Battery Configurator")
         
         battery_chemistry = st.selectbox("Select Cell Chemistry", list(battery_data.keys()))
         battery_spec = battery_data[battery_chemistry]
 
+        battery_model_labels = {"Ideal (energy only)": "ideal",
+                                "Equivalent circuit (OCV + R0)": "r0",
+                                "Equivalent circuit (OCV + R0 + RC)": "rc"}
+        battery_model = st.selectbox("Battery Model", list(battery_model_labels.keys()),
+                                     help="Equivalent-circuit models include voltage sag under load")
+
         if battery_chemistry in ["Li-ion (NMC)", "Li-ion (NCA)", "Li-ion (LFP)", "LTO"]:
             # Display cell note
             st.markdown(f"""
@@ -74,138 +69,40 @@ def render_configuration_panel():
             - Max Discharge Rating: {battery_spec['max_c_rate']}C
             """)
 
+            # Defaults through Session State, so the pack finder can set them
+            st.session_state.setdefault("total_cells", 400)
+            st.session_state.setdefault("cells_series", 100)
+            st.session_state.setdefault("layer_count", 2)
+
             # User input: total cells
-            total_cells = st.number_input("Total Number of Cells", min_value=1, max_value=5000, value=400, step=1)
+            total_cells = st.number_input("Total Number of Cells", min_value=1, max_value=5000, step=1,
+                                          key="total_cells")
 
             # User input: cells in series
-            cells_series = st.number_input("Cells in Series", min_value=1, max_value=total_cells, value=100, step=1)
+            cells_series = st.number_input("Cells in Series", min_value=1, max_value=total_cells, step=1,
+                                           key="cells_series")
 
             # Derived: cells in parallel
-            if total_cells % cells_series != 0:
-                st.error("❌ Total cells must be divisible by series count for valid parallel configuration.")
-                cells_parallel = 0
-            else:
-                cells_parallel = total_cells // cells_series
-                st.success(f"Cells in Parallel: {cells_parallel}")
+            split_message = st.container()
 
             # User input: No of layers
-            layer_count = st.number_input("Cell Layers", min_value=1, max_value=4, value=2, step=1)
-
-            # Capacity per cell in Ah
-            cell_capacity_Ah = battery_spec["capacity_mAh"] / 1000.0
-
-            # Pack capacity = cell capacity × parallel
-            pack_capacity_Ah = cell_capacity_Ah * cells_parallel
-
-            # Pack energy = capacity × voltage × series
-            pack_voltage = battery_spec["voltage"] * cells_series
-
-            pack_energy_Wh = pack_capacity_Ah * pack_voltage
-
-            # Max current = capacity × C-rate × parallel
-            max_current_A = cell_capacity_Ah * battery_spec["max_c_rate"] * cells_parallel
-
-            if system_voltage == "400V":
-                if pack_voltage < 300 or pack_voltage > 450:
-                    st.error("❌For 400V System battery pack voltage should be with in 300V to 450V")
-                    pack_energy_Wh = 0
-            else:
-                if pack_voltage < 660 or pack_voltage > 820:
-                    st.error("❌For 800V System battery pack voltage should be with in 660V to 820V")
-                    pack_energy_Wh = 0
-
-            # Display results
-            st.markdown(f"""
-            **Battery Pack Specs:**
-            - Voltage: {pack_voltage:.1f} V | Capacity: {pack_capacity_Ah:.1f} Ah
-            - Energy: {pack_energy_Wh/1000:.2f} kWh
-            - Max Continuous Current: {max_current_A:.1f} A
-            """)
-
-             # --- Size calculation ---
-            # Cell diameter + 2 mm gap
-            cell_pitch_mm = battery_spec["diameter_mm"] + 2
-
-            # Calculate dimensions
-            pack_length_series   = (cell_pitch_mm * cells_series) / (1000 * layer_count)  # meters
-            pack_length_parallel = (cell_pitch_mm * cells_parallel) / 1000  # meters
-
-            # Assign width = smaller, length = larger
-            if pack_length_series < pack_length_parallel:
-                pack_width_m  = pack_length_series
-                pack_length_m = pack_length_parallel
-            else:
-                pack_width_m  = pack_length_parallel
-                pack_length_m = pack_length_series
+            layer_count = st.number_input("Cell Layers", min_value=1, max_value=4, step=1, key="layer_count")
+            pack_design = {"total_cells": total_cells, "cells_series": cells_series, "layer_count": layer_count}
 
+            pack_info = st.container()
+            render_pack_finder(battery_chemistry, system_voltage, wheelbase, vehicle_width)
 
         # For LTO: direct capacity input
         elif battery_chemistry == "Solid-State":
 
             pack_capacity_kWh = st.number_input("Enter Pack Capacity [kWh]", min_value=1.0, max_value=80.0, value=45.0, step=1.0)
-            pack_energy_Wh = pack_capacity_kWh * 1000
             pack_voltage = st.number_input("Battery Pack Voltage [V]", min_value=300, max_value=720, value=360, step=10)
-            cell_capacity_Ah  = pack_energy_Wh / pack_voltage
-            max_current_A = cell_capacity_Ah * battery_spec["max_c_rate"] 
-
-            if system_voltage == "400V":
-                if pack_voltage < 300 or pack_voltage > 450:
-                    st.error("❌For 400V System battery pack voltage should be with in 300V to 450V")
-                    pack_energy_Wh = 0
-            else:
-                if pack_voltage < 660 or pack_voltage > 820:
-                    st.error("❌For 800V System battery pack voltage should be with in 660V to 820V")
-                    pack_energy_Wh = 0
-
-
-            # Display results
-            st.markdown(f"""
-            **Battery Pack Specs:**
-            - Max Continuous Current: {cell_capacity_Ah:.1f} A
-            - Max Peak Current: {max_current_A:.1f} A
-            """)
-
-            # User input: No of layers
-            layer_count = 3
-
-            # Solid-state uses volumetric density (Wh/L)
-            pack_volume_L = pack_energy_Wh / battery_spec["volumetric_density"]
-            # Volume-based cube root approximation
-            pack_volume_m3 = pack_volume_L / 1000
-            cube_side = pack_volume_m3**(1/3)
-            pack_width_m, pack_length_m = cube_side, cube_side / layer_count
-
-        # --- Weight calculation ---
-        pack_weight_kg = pack_energy_Wh / battery_spec["energy_density"]
-
-        # --- Constraint checks ---
-        max_length = 0.7 * wheelbase
-        max_width = 0.8 * vehicle_width
-        max_volume = 0.7 * wheelbase * 0.8 * vehicle_width * 0.15
-
-        if pack_length_m > max_length:
-            st.error(f"❌ Battery length {pack_length_m:.2f} m exceeds 70% of wheelbase ({max_length:.2f} m).")
-            pack_energy_Wh = 0
-
-        if pack_width_m > max_width:
-            st.error(f"❌ Battery width {pack_width_m:.2f} m exceeds 80% of vehicle width ({max_width:.2f} m).")
-            pack_energy_Wh = 0
-
-        if battery_chemistry in ["Solid-State"]:
-            if pack_volume_m3 > max_volume:
-                st.error(f"❌ Battery volume {pack_volume_m3:.3f} m³ exceeds allowed {max_volume:.3f} m³.")
-                pack_energy_Wh = 0
+            pack_design = {"pack_capacity_kwh": pack_capacity_kWh, "pack_voltage": pack_voltage}
+            split_message = None
+            pack_info = st.container()
 
-         # Display results
-        st.markdown(f"""
-        **Battery Pack Dimensions:**
-        - Pack Weight: {pack_weight_kg:.1f} kg
-        - Pack Length: {pack_length_m:.2f} m | Pack Width: {pack_width_m:.2f} m """)
-
-        total_vehicle_mass = vehicle_mass + pack_weight_kg
-        battery_cost = pack_energy_Wh * battery_spec["cost_kW"] / 1000 
-
-        st.caption(f"Battery adds {pack_weight_kg:.1f} kg to base mass. |Battery pack cost: {battery_cost}")
+        # Size checks and pack dimensions, filled in below
+        pack_checks = st.container()
 
     with col3:
 
@@ -229,9 +126,11 @@ def render_configuration_panel():
         - Approx. Cost: ₹{motor_spec['cost_inr']:,}
         """)
 
+        efficiency_model = st.selectbox("Motor Efficiency", ["Rated (scalar)", "Operating-point map"],
+                                        help="The map looks up efficiency at each sample's torque and speed")
+
         st.markdown("### ⚙️ Transmission")
         transmission_type = st.selectbox("Drive Model", list(transmission_models.keys()))
-        transmission_spec = transmission_models[transmission_type]
 
         if transmission_type:
             for key, value in transmission_models[transmission_type].items():
@@ -243,15 +142,12 @@ def render_configuration_panel():
 
         hvac_type = st.selectbox("Select HVAC", list(hvac_specs.keys()))
         hvac_spec = hvac_specs[hvac_type]
-        auxiliary_load = hvac_spec['power_kw']
-        auxillary_cost = hvac_spec['cost_inr']
-        hvac_efficiency =  hvac_spec['efficiency']
         # Display motor info
         st.markdown(f"""
         **HVAC Specifications:**
-        - Power Rating: {auxiliary_load} kW  
+        - Power Rating: {hvac_spec['power_kw']} kW  
         - Efficiency: {hvac_spec['efficiency']}   
-        - Approx. Cost: ₹{auxillary_cost}
+        - Approx. Cost: ₹{hvac_spec['cost_inr']}
         """)
 
         st.markdown("### 🔄 Coolant")
@@ -259,7 +155,6 @@ def render_configuration_panel():
         # Dropdown for coolant flow rate
         coolant_flow = st.selectbox("Coolant flow:", list(cooling_params.keys()))
         coolant_spec = cooling_params[coolant_flow]
-        coolant_power = coolant_spec['typical_pump_power_W'] / 1000
 
         # Display coolant specs
         st.markdown(f"""
@@ -275,16 +170,14 @@ def render_configuration_panel():
         if regen_enabled == True:
             regen_type = st.selectbox("Select HVAC", list(regen_specs.keys()))
             regen_spec = regen_specs[regen_type]
-            regen_cost = regen_spec['cost_inr']
                     # Display motor info
             st.markdown(f"""
             **Regenerative Braking:**
             - Efficiency: {regen_spec['efficiency']} 
-            - Approx. Cost: ₹{regen_cost}
+            - Approx. Cost: ₹{regen_spec['cost_inr']}
             """)
         else:
             regen_type = None
-            regen_cost = 0
 
         # ⚡ Inverter Configurator
         st.markdown("### ⚡ Power Electronics")
@@ -292,13 +185,6 @@ def render_configuration_panel():
         # User selection
         inverter_type = st.selectbox("Select Inverter Type", list(inverter_specs.keys()))
         invertor_spec = inverter_specs[inverter_type]
-        inverter_efficiency = invertor_spec['efficiency']
-        inverter_cost = invertor_spec['cost_inr']
-
-        # Voltage compatibility check
-        voltage_supported = (
-            invertor_spec["supports_400V"] if sys_voltage == 400 else invertor_spec  ["supports_800V"]
-        )
 
         # Display inverter info
         st.markdown(f"""
@@ -309,45 +195,124 @@ def render_configuration_panel():
         - Cost: ₹{invertor_spec['cost_inr']:,}
         """)
 
-        # Warning if voltage mismatch
-        if not voltage_supported:
-            st.error(f"❌ Selected inverter is not compatible with {sys_voltage} V system.")
-            pack_energy_Wh = 0
-        
-    motor_cost = motor_spec['cost_inr']
+        # Warning if voltage mismatch, filled in below
+        inverter_message = st.container()
+
+    design = {
+        "vehicle_width": vehicle_width,
+        "vehicle_height": vehicle_height,
+        "vehicle_length": vehicle_length,
+        "wheelbase": wheelbase,
+        "ground_clearance": ground_clearance,
+        "vehicle_style": vehicle_style,
+        "tyre_size": tyre_size,
+        "tyre_type": tyre_type,
+        "system_voltage": system_voltage,
+        "battery_chemistry": battery_chemistry,
+        **pack_design,
+        "battery_model": battery_model_labels[battery_model],
+        "motor_type": motor_type,
+        "efficiency_model": "map" if efficiency_model == "Operating-point map" else "scalar",
+        "transmission_type": transmission_type,
+        "hvac_type": hvac_type,
+        "coolant_flow": coolant_flow,
+        "regen_type": regen_type,
+        "inverter_type": inverter_type,
+    }
+    derived = derive_configs(design)
+    config = derived.config_at(0)
+    problems = {flag: bool(values[0]) for flag, values in derived.problems.items()}
+    details = {name: values[0] for name, values in derived.details.items()}
 
-    transmission_cost = transmission_spec["Cost"]
+    with wheelbase_message:
+        if problems["wheelbase"]:
+            st.error("❌ Wheelbase not possible for the selected vehicle length. Please adjust values.")
+            st.stop()  # stops execution until user fixes input
+
+    with vehicle_info:
+        # Display derived values
+        st.markdown(f"**Frontal Area:** {config['frontal_area']:.2f} m²")
+        st.markdown(f"**Drag Coefficient (Cd):** {config['drag_coefficient']:.2f}")
+        st.markdown(f"**Estimated Vehicle Mass (without battery):** {details['body_mass_kg']:.0f} kg")
 
+    if split_message is not None:
+        with split_message:
+            if problems["cell_split"]:
+                st.error("❌ Total cells must be divisible by series count for valid parallel configuration.")
+            else:
+                st.success(f"Cells in Parallel: {details['cells_parallel']:.0f}")
 
-    # Base Cost 2,50,000
-    chassis_cost = 350000 * style_cost_factor[vehicle_style]
+    with pack_info:
+        if problems["pack_voltage"]:
+            st.error(f"❌For {system_voltage} System battery pack voltage should be with in "
+                     f"{details['window_low']:.0f}V to {details['window_high']:.0f}V")
+        pack_energy_Wh = 0 if problems["pack_voltage"] else details["pack_energy_wh"]
+
+        # Display results
+        if battery_chemistry == "Solid-State":
+            st.markdown(f"""
+            **Battery Pack Specs:**
+            - Max Continuous Current: {details['pack_capacity_ah']:.1f} A
+            - Max Peak Current: {config['battery_max_current']:.1f} A
+            """)
+        else:
+            st.markdown(f"""
+            **Battery Pack Specs:**
+            - Voltage: {config['pack_voltage']:.1f} V | Capacity: {details['pack_capacity_ah']:.1f} Ah
+            - Energy: {pack_energy_Wh/1000:.2f} kWh
+            - Max Continuous Current: {config['battery_max_current']:.1f} A
+            """)
+
+    with pack_checks:
+        # --- Constraint checks ---
+        if problems["pack_length"]:
+            st.error(f"❌ Battery length {details['pack_length_m']:.2f} m exceeds 70% of wheelbase ({details['max_pack_length_m']:.2f} m).")
+        if problems["pack_width"]:
+            st.error(f"❌ Battery width {details['pack_width_m']:.2f} m exceeds 80% of vehicle width ({details['max_pack_width_m']:.2f} m).")
+        if problems["pack_volume"]:
+            st.error(f"❌ Battery volume {details['pack_volume_m3']:.3f} m³ exceeds allowed {details['max_pack_volume_m3']:.3f} m³.")
+
+         # Display results
+        st.markdown(f"""
+        **Battery Pack Dimensions:**
+        - Pack Weight: {details['pack_mass_kg']:.1f} kg
+        - Pack Length: {details['pack_length_m']:.2f} m | Pack Width: {details['pack_width_m']:.2f} m """)
+
+        st.caption(f"Battery adds {details['pack_mass_kg']:.1f} kg to base mass. |Battery pack cost: {details['battery_cost']}")
+
+    with inverter_message:
+        if problems["inverter_voltage"]:
+            st.error(f"❌ Selected inverter is not compatible with {config['system_voltage']} V system.")
 
     st.subheader("🔧 Configuration Cost")
-    total_cost = (motor_cost + + regen_cost + inverter_cost)*system_cost_factor + battery_cost   + transmission_cost + tyre_cost + chassis_cost + auxillary_cost 
-    st.markdown(f"**Estimated Vehicle Configuration Cost:** ₹{total_cost:,.0f}")
-
-    return {
-        "system_voltage" : sys_voltage,
-        "system_efficiency": sys_efficiency,
-        "battery_capacity": pack_energy_Wh/1000,
-        "battery_max_current": max_current_A,
-        "battery_chemistry": battery_chemistry,
-        # "cooling_type": cooling_type,
-        "motor_type": motor_type,
-        "motor_power": motor_spec['power_kw'],
-        "inverter_efficiency": inverter_efficiency,
-        "regen_enabled": regen_enabled,
-        "regen_mode": regen_type,
-        "vehicle_mass": total_vehicle_mass,
-        "drag_coefficient": drag_coefficient,
-        "auxiliary_load": auxiliary_load,
-        "hvac_efficiency" : hvac_efficiency,
-        "frontal_area": frontal_area,             # m² (optional, default ~2.2 for compact cars)
-        "tyre_type": tyre_type,               # "Eco", "Standard", "Performance"
-        "wheel_radius": wheel_radius,
-        "transmission_type": transmission_type,
-        "vehicle_cost": total_cost,
-        "coolant_power": coolant_power,
-        "coolant_flow": coolant_flow
-    }
+    st.markdown(f"**Estimated Vehicle Configuration Cost:** ₹{config['vehicle_cost']:,.0f}")
+
+    return config
+
+
+def render_pack_finder(battery_chemistry, system_voltage, wheelbase, vehicle_width):
+    """Cell layouts of an energy range that fit the vehicle; Apply copies one into the pack inputs."""
+    with st.expander("🔎 Find a feasible pack"):
+        low, high = st.slider("Pack Energy [kWh]", min_value=0.0, max_value=70.0, value=(40.0, 60.0), step=1.0)
+        packs = find_packs(battery_chemistry, system_voltage, low, high,
+                           wheelbase=wheelbase, vehicle_width=vehicle_width)
+        if not len(packs):
+            st.info("No layout in this energy range fits the vehicle.")
+            return
+
+        listed = min(len(packs), PACK_FINDER_OPTIONS)
+        st.caption(f"{len(packs)} layouts fit, lightest first" + (f" (first {listed} listed)" if listed < len(packs) else ""))
+        choice = st.selectbox("Layout", range(listed), format_func=lambda i: _pack_label(packs.row(i)))
+        st.button("Apply", on_click=_apply_pack, args=(packs.row(choice),))
+
+
+# ---------- helpers ----------
+def _pack_label(pack):
+    return (f"{pack['energy_kwh']:.1f} kWh · {pack['cells_series']}s{pack['cells_parallel']}p × "
+            f"{pack['layer_count']} layers · {pack['pack_voltage']:.0f} V · {pack['pack_mass_kg']:.0f} kg")
 
+def _apply_pack(pack):
+    # Runs before the rerun, so the number inputs pick the layout up
+    st.session_state["total_cells"] = pack["total_cells"]
+    st.session_state["cells_series"] = pack["cells_series"]
+    st.session_state["layer_count"] = pack["layer_count"]